@@ -0,0 +1 @@
+"""离线基准测试：合成语料 + 本地替身服务器，不访问外网。用法见 python -m benchmarks.run --help。"""
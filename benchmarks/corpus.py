@@ -0,0 +1,52 @@
+"""合成的类 Instagram 个人主页：可控大小，含 ld+json 与 window._sharedData 数据块。"""
+from __future__ import annotations
+
+import json
+import random
+from typing import List, Optional
+
+_WORDS = "photo travel coffee design studio london nyc creator music art food daily life love shop official news team".split()
+_REGIONS = ["London", "NYC", "Singapore", "Canada", "Shanghai", ""]
+
+
+def _sentence(rnd: random.Random, n: int) -> str:
+    return " ".join(rnd.choice(_WORDS) for _ in range(n))
+
+
+def make_profile_page(rnd: random.Random, username: str, size_kb: int = 64, ld_json: bool = True, shared_data: bool = True) -> str:
+    """生成一页约 size_kb KB 的 HTML；正文由帖子卡片填充到目标大小。"""
+    name = _sentence(rnd, 2).title()
+    bio = f"{_sentence(rnd, 8)} · {rnd.randint(18, 60)} years old · {rnd.choice(['she/her', 'he/him', ''])} {rnd.choice(_REGIONS)} https://{username}.example/link"
+    head = [
+        "<meta charset='utf-8'>",
+        f"<title>{name} (@{username}) • Instagram photos and videos</title>",
+        f"<meta name='description' content='{rnd.randint(1, 999)}K Followers, {_sentence(rnd, 6)}'>",
+        f"<meta property='og:title' content='{name} • Instagram photos and videos'>",
+        f"<meta property='og:description' content='{_sentence(rnd, 10)}'>",
+    ]
+    if ld_json:
+        ld = {"@context": "https://schema.org", "@type": "Person", "name": name, "url": f"https://{username}.example", "description": bio}
+        head.append(f'<script type="application/ld+json">{json.dumps(ld)}</script>')
+    body = [f"<header><h1>{name}</h1><section><p>{bio}</p></section></header>", "<main>"]
+    posts: List[dict] = []
+    target = size_kb * 1024
+    size = sum(map(len, head)) + sum(map(len, body))
+    i = 0
+    while size < target * (0.5 if shared_data else 1.0):
+        caption = _sentence(rnd, rnd.randint(5, 30))
+        card = f"<article><a href='/p/{username}{i}/'><img src='https://cdn.example/{i}.jpg' alt='{caption[:40]}'></a><div><span>{caption}</span></div></article>"
+        body.append(card); size += len(card)
+        posts.append({"id": f"{username}{i}", "caption": caption, "likes": rnd.randint(0, 10 ** 6)})
+        i += 1
+    body.append("</main>")
+    if shared_data:
+        blob = {"config": {"viewer": None}, "entry_data": {"ProfilePage": [{"graphql": {"user": {"username": username, "full_name": name, "biography": bio, "edge_owner_to_timeline_media": {"edges": posts}}}}]}}
+        body.append(f"<script>window._sharedData = {json.dumps(blob)};</script>")
+    return f"<!DOCTYPE html><html><head>{''.join(head)}</head><body>{''.join(body)}</body></html>"
+
+
+def make_corpus(n: int, sizes_kb: Optional[List[int]] = None, seed: int = 1) -> List[str]:
+    """n 页、大小在 sizes_kb 中轮换；固定 seed 保证跨提交可比。"""
+    rnd = random.Random(seed)
+    sizes_kb = sizes_kb or [16, 64, 256]
+    return [make_profile_page(rnd, f"user{i}", sizes_kb[i % len(sizes_kb)], ld_json=i % 3 != 2, shared_data=i % 2 == 0) for i in range(n)]
@@ -0,0 +1,159 @@
+"""
+离线基准测试入口：
+
+    python -m benchmarks.run --out bench.json            # 完整运行
+    python -m benchmarks.run --quick                     # 小规模冒烟
+    python -m benchmarks.run --out new.json --compare old.json
+
+结果为 JSON：meta（提交、Python、平台、时间）+ results（每项 name/params/指标），便于跨提交对比。
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# 固定与基准相关的环境变量（scrape_urls 在调用时经 Config.for_urls() 读取）
+os.environ["RATE_LIMIT_QPS"] = "0"
+os.environ["RETRY_ATTEMPTS"] = "1"
+os.environ.setdefault("TQDM_DISABLE", "1")
+
+from .corpus import make_corpus, make_profile_page  # noqa: E402
+from .server import StandInServer  # noqa: E402
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(round(q * (len(s) - 1))))]
+
+
+def _timings(fn: Callable[[], Any], repeat: int) -> List[float]:
+    out = []
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); out.append(time.perf_counter() - t)
+    return out
+
+
+def _summary(name: str, params: Dict[str, Any], samples: List[float], unit_count: int = 1) -> Dict[str, Any]:
+    """samples 为每次运行的耗时（秒），每次处理 unit_count 个单位。"""
+    per_unit_ms = [s / unit_count * 1000 for s in samples]
+    med = statistics.median(samples)
+    return {
+        "name": name, "params": params, "runs": len(samples),
+        "median_s": med, "p50_ms": _percentile(per_unit_ms, 0.5), "p95_ms": _percentile(per_unit_ms, 0.95),
+        "ops_per_s": unit_count / med if med > 0 else None,
+    }
+
+
+def bench_parsers(sizes_kb: List[int], pages: int, repeat: int) -> List[Dict[str, Any]]:
+    import random
+
+    from vigilant_enigma1.parser import parse_html, parse_profile
+
+    results = []
+    for size in sizes_kb:
+        rnd = random.Random(size)
+        docs = [make_profile_page(rnd, f"u{i}", size, ld_json=i % 2 == 0, shared_data=i % 2 == 1) for i in range(pages)]
+        for name, fn in (("parse_profile", lambda d: parse_profile(d, "u")), ("parse_html", lambda d: parse_html(d, "https://x.example/"))):
+            samples = _timings(lambda: [fn(d) for d in docs], repeat)
+            results.append(_summary(name, {"size_kb": size, "pages": pages}, samples, unit_count=pages))
+    return results
+
+
+def bench_scrape_urls(concurrencies: List[int], n_urls: int, latency: float, error_rate: float, repeat: int) -> List[Dict[str, Any]]:
+    from vigilant_enigma1.scraper import scrape_urls
+
+    results = []
+    with StandInServer(make_corpus(20, [16, 64]), latency=latency, jitter=latency / 2, error_rate=error_rate) as srv:
+        urls = [srv.url(i) for i in range(n_urls)]
+        for c in concurrencies:
+            errors: List[int] = []
+
+            def run():
+                rows = asyncio.run(scrape_urls(urls, concurrency=c))
+                errors.append(sum(1 for r in rows if r.get("error")))
+
+            samples = _timings(run, repeat)
+            res = _summary("scrape_urls", {"concurrency": c, "urls": n_urls, "latency_s": latency, "error_rate": error_rate}, samples, unit_count=n_urls)
+            res["errors"] = max(errors)
+            results.append(res)
+    return results
+
+
+def bench_writers(rows: int, repeat: int) -> List[Dict[str, Any]]:
+    from vigilant_enigma1.scraper import PROFILE_FIELDS, write_csv, write_rows
+
+    url_rows = [{"url": f"https://x.example/{i}", "title": f"title {i}", "description": "d" * 120} for i in range(rows)]
+    profile_rows = [{k: f"{k}-{i}" for k in PROFILE_FIELDS} for i in range(rows)]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "out.csv")
+        results.append(_summary("write_csv", {"rows": rows}, _timings(lambda: write_csv(url_rows, path), repeat), unit_count=rows))
+
+        def rows_in_batches():
+            if os.path.exists(path): os.remove(path)
+            for i in range(0, rows, 20): write_rows(path, profile_rows[i:i + 20])
+
+        results.append(_summary("write_rows", {"rows": rows, "batch": 20}, _timings(rows_in_batches, repeat), unit_count=rows))
+    return results
+
+
+def _meta() -> Dict[str, Any]:
+    try: commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception: commit = ""
+    return {"commit": commit, "python": sys.version.split()[0], "platform": platform.platform(), "cpus": os.cpu_count(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """按 name+params 对齐两次结果，输出 ops/s 的变化比例。"""
+    key = lambda r: (r["name"], json.dumps(r["params"], sort_keys=True))
+    before = {key(r): r for r in old.get("results", [])}
+    lines = []
+    for r in new.get("results", []):
+        o = before.get(key(r))
+        if not o or not o.get("ops_per_s") or not r.get("ops_per_s"): continue
+        lines.append(f"{r['name']:<14} {json.dumps(r['params'], sort_keys=True):<70} {o['ops_per_s']:>10.1f} -> {r['ops_per_s']:>10.1f} ops/s ({r['ops_per_s'] / o['ops_per_s'] - 1:+.1%})")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    p = argparse.ArgumentParser(prog="benchmarks.run", description="离线基准测试（本地替身服务器 + 合成语料）")
+    p.add_argument("--out", help="结果 JSON 路径（默认输出到 stdout）")
+    p.add_argument("--compare", help="与之前的结果 JSON 对比并打印变化")
+    p.add_argument("--quick", action="store_true", help="小规模快速运行")
+    p.add_argument("--only", choices=["parse", "scrape", "write"], action="append", help="只运行指定类别，可重复")
+    p.add_argument("--latency", type=float, default=0.02, help="替身服务器每请求延迟（秒）")
+    p.add_argument("--error-rate", type=float, default=0.0, help="替身服务器注入 500 的概率")
+    args = p.parse_args(argv)
+
+    only = set(args.only or ["parse", "scrape", "write"])
+    repeat = 1 if args.quick else 3
+    results: List[Dict[str, Any]] = []
+    if "parse" in only:
+        results += bench_parsers([16, 64] if args.quick else [16, 64, 256, 512], pages=5 if args.quick else 20, repeat=repeat)
+    if "scrape" in only:
+        results += bench_scrape_urls([1, 8] if args.quick else [1, 4, 16, 64], n_urls=40 if args.quick else 400, latency=args.latency, error_rate=args.error_rate, repeat=repeat)
+    if "write" in only:
+        results += bench_writers(1000 if args.quick else 20000, repeat=repeat)
+
+    report = {"meta": _meta(), "results": results}
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f: f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f: old = json.load(f)
+        print("\n".join(compare(old, report)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""本地替身 HTTP 服务器：可配置延迟、抖动与错误注入（5xx / 429+Retry-After）。"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+
+class StandInServer:
+    """
+    在 127.0.0.1 的随机端口上提供 /p/<i> 页面（取自 pages[i % len(pages)]）。
+    latency/jitter 为每个请求的固定与随机附加延迟（秒）；error_rate/throttle_rate 为注入 500/429 的概率。
+    """
+
+    def __init__(self, pages: List[str], latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, throttle_rate: float = 0.0, retry_after: int = 1, seed: int = 7):
+        self.pages = [p.encode("utf-8") for p in pages]
+        self.latency, self.jitter = latency, jitter
+        self.error_rate, self.throttle_rate, self.retry_after = error_rate, throttle_rate, retry_after
+        self._rnd = random.Random(seed); self._rnd_lock = threading.Lock()
+        self.requests = 0
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        assert self._httpd is not None
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, i: int) -> str:
+        return f"{self.base_url}/p/{i}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):  # 静默
+                pass
+
+            def do_GET(self):
+                with server._rnd_lock:
+                    server.requests += 1
+                    roll = server._rnd.random(); delay = server.latency + server._rnd.random() * server.jitter
+                if delay: time.sleep(delay)
+                if roll < server.throttle_rate:
+                    return self._send(429, b"slow down", {"Retry-After": str(server.retry_after)})
+                if roll < server.throttle_rate + server.error_rate:
+                    return self._send(500, b"boom")
+                try: i = int(self.path.rstrip("/").rsplit("/", 1)[-1])
+                except ValueError: return self._send(404, b"not found")
+                self._send(200, server.pages[i % len(server.pages)], {"Content-Type": "text/html; charset=utf-8"})
+
+            def _send(self, status, body, headers=None):
+                self.send_response(status)
+                for k, v in (headers or {}).items(): self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers(); self.wfile.write(body)
+
+        return Handler
+
+    def start(self) -> "StandInServer":
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True); self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown(); self._httpd.server_close(); self._httpd = None
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -1,3 +1,12 @@
-from vigilant_enigma1.parser import parse_profile
-from vigilant_enigma1.ratelimiter import RateLimiter
+from typing import Any
 __all__ = ["parse_profile", "RateLimiter"]
+
+def __getattr__(name: str) -> Any:
+    # 按需导入，igscrape --help 不加载 bs4
+    if name == "parse_profile":
+        from vigilant_enigma1.parser import parse_profile
+        return parse_profile
+    if name == "RateLimiter":
+        from vigilant_enigma1.ratelimiter import RateLimiter
+        return RateLimiter
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
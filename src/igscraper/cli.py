@@ -1,21 +1,67 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import os
 from dotenv import load_dotenv
 
+from vigilant_enigma1.checkpoint import Checkpoint, compact_output, row_failed
 from vigilant_enigma1.config import Config
 from vigilant_enigma1.logger import init_logger
-from vigilant_enigma1.scraper import scrape as run_scrape
+from vigilant_enigma1.metrics import NULL_METRICS, Metrics, profiled
+from vigilant_enigma1.parse_pool import ParsePool
+from vigilant_enigma1.scraper import PROFILE_FIELDS, scrape as run_scrape, scrape_async
+from vigilant_enigma1.sinks import FORMATS, infer_format
 
 def main() -> None:
     load_dotenv()
     p = argparse.ArgumentParser(prog="igscrape", description="Instagram public profile scraper")
     p.add_argument("-i","--input", default="data/input.csv", help="输入 CSV（需包含 username 列）")
-    p.add_argument("-o","--output", default="data/output.csv", help="输出 CSV")
+    p.add_argument("-o","--output", default="data/output.csv", help="输出路径（.csv/.jsonl/.parquet）")
+    p.add_argument("--format", choices=FORMATS, default=None, help="输出格式（默认按扩展名推断）；parquet 需要 pyarrow")
+    p.add_argument("--flush-rows", type=int, default=None, help="每攒够 N 行落盘一次（默认 csv/jsonl 逐行，parquet 每 10000 行一个 row group）")
+    p.add_argument("--flush-seconds", type=float, default=0.0, help="距上次落盘超过该秒数时在下一次写入时落盘（0 表示不按时间）")
     p.add_argument("--httpx", action="store_true", help="使用 httpx+Cookies 抓取（默认 Playwright）")
+    p.add_argument("--async", dest="use_async", action="store_true", help="使用 asyncio 流水线（抓取/解析/写出并行）")
+    p.add_argument("--concurrency", type=int, default=None, help="--async 模式的并发抓取数（默认 CONCURRENCY）")
+    p.add_argument("--parse-pool", choices=["process","thread"], default=os.getenv("PARSE_POOL") or None, help="在进程/线程池中解析（默认在当前线程）")
+    p.add_argument("--parse-workers", type=int, default=None, help="解析池大小（默认按 CPU 核数）")
+    p.add_argument("--resume", action="store_true", help="断点续跑：跳过已完成与重复的用户名（进度记录在 <output>.done）")
+    p.add_argument("--retry-errors", action="store_true", help="配合 --resume：重新抓取上次 error 非空的用户名")
+    p.add_argument("--checkpoint", default=None, help="进度索引文件路径（默认 <output>.done）")
+    p.add_argument("--cache-dir", default=None, help="--httpx 模式的磁盘响应缓存目录（默认 CACHE_DIR）")
+    p.add_argument("--offline", action="store_true", help="只读缓存、不联网（或 OFFLINE=1；需配合 --httpx 与缓存目录）")
+    p.add_argument("--archive", default=None, help="把抓到的原始 HTML 写入该归档目录（默认 ARCHIVE_DIR；之后可用 reparse 离线重新解析）")
+    p.add_argument("--metrics", default=os.getenv("METRICS_FILE") or None, help="指标输出文件：.prom/.txt 为 Prometheus 文本格式，其余为 JSON（默认关闭）")
+    p.add_argument("--metrics-interval", type=float, default=float(os.getenv("METRICS_INTERVAL", "30")), help="指标定时写出间隔（秒），0 表示只在结束时写出")
+    p.add_argument("--profile", default=None, help="用 cProfile 剖析整个运行并写出到该路径（.prof）")
     args = p.parse_args()
     logger = init_logger("igscraper")
     cfg = Config()
-    logger.info("开始：input=%s output=%s httpx=%s qps=%.3f", args.input, args.output, args.httpx, cfg.qps)
-    run_scrape(cfg, args.input, args.output, use_httpx=args.httpx)
+    if args.cache_dir: cfg.cache_dir = args.cache_dir
+    if args.offline: cfg.offline = True
+    if args.archive: cfg.archive_dir = args.archive
+    if cfg.offline and not (args.httpx and cfg.cache_dir):
+        logger.warning("--offline 需要配合 --httpx 与缓存目录（--cache-dir 或 CACHE_DIR），否则会直接联网抓取"); return
+    logger.info("开始：input=%s output=%s httpx=%s async=%s qps=%.3f", args.input, args.output, args.httpx, args.use_async, cfg.qps)
+    if (args.resume or args.retry_errors) and infer_format(args.output, args.format) == "parquet":
+        logger.warning("断点续跑需要可追加的输出格式（csv/jsonl），parquet 不支持 --resume"); return
+    parse_pool = ParsePool(args.parse_pool, workers=args.parse_workers) if args.parse_pool else None
+    checkpoint = None
+    if args.resume or args.retry_errors:
+        checkpoint = Checkpoint(args.checkpoint or args.output + ".done", retry_errors=args.retry_errors)
+        checkpoint.seed_from_output(args.output, "username", row_failed, fmt=args.format)
+    out_opts = dict(fmt=args.format, flush_rows=args.flush_rows, flush_seconds=args.flush_seconds)
+    metrics = Metrics(args.metrics, interval=args.metrics_interval).start() if args.metrics else NULL_METRICS
+    try:
+        with profiled(args.profile):
+            if args.use_async: asyncio.run(scrape_async(cfg, args.input, args.output, use_httpx=args.httpx, concurrency=args.concurrency, parse_pool=parse_pool, checkpoint=checkpoint, metrics=metrics, **out_opts))
+            else: run_scrape(cfg, args.input, args.output, use_httpx=args.httpx, parse_pool=parse_pool, checkpoint=checkpoint, metrics=metrics, **out_opts)
+    finally:
+        if parse_pool is not None: parse_pool.close()
+        if checkpoint is not None: checkpoint.close()
+        metrics.stop()
+        if metrics.enabled: logger.info("阶段耗时：%s", metrics.summary())
+    # 重试后同一用户名会有新旧两行，仅保留最新一行
+    if args.retry_errors: compact_output(args.output, "username", PROFILE_FIELDS, fmt=args.format)
     logger.info("完成")
@@ -1,4 +1,14 @@
-from .parser import parse_profile
-from .ratelimiter import RateLimiter
+from typing import Any
 
-__all__ = ["parse_profile", "RateLimiter"]
\ No newline at end of file
+__all__ = ["parse_profile", "RateLimiter"]
+
+
+def __getattr__(name: str) -> Any:
+    # 按需导入：import vigilant_enigma1.xxx（例如 CLI 启动）不会连带加载 bs4
+    if name == "parse_profile":
+        from .parser import parse_profile
+        return parse_profile
+    if name == "RateLimiter":
+        from .ratelimiter import RateLimiter
+        return RateLimiter
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
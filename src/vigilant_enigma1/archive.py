@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+__all__ = ["ArchiveEntry", "HtmlArchive", "read_record"]
+
+INDEX_NAME = "index.tsv"
+
+
+class ArchiveEntry(NamedTuple):
+    kind: str       # "profile"（igscrape，key 为用户名）或 "url"（scrape，key 为 URL）
+    key: str
+    ts: float       # 抓取时间（unix 秒）
+    segment: str    # 段文件名
+    offset: int
+    length: int
+    sha1: str       # 原始 HTML 的 sha1，用于跳过内容未变的重复写入
+    url: str
+
+    def to_line(self) -> str:
+        return "\t".join([self.kind, self.key, f"{self.ts:.3f}", self.segment, str(self.offset), str(self.length), self.sha1, self.url]) + "\n"
+
+    @classmethod
+    def from_line(cls, line: str) -> Optional["ArchiveEntry"]:
+        parts = line.rstrip("\n").split("\t")
+        if len(parts) != 8: return None  # 崩溃时可能留下半行
+        try: return cls(parts[0], parts[1], float(parts[2]), parts[3], int(parts[4]), int(parts[5]), parts[6], parts[7])
+        except ValueError: return None
+
+
+def _clean(value: str) -> str:
+    return value.replace("\t", " ").replace("\n", " ")
+
+
+def _decode(blob: bytes) -> str:
+    data = zlib.decompress(blob, wbits=31)
+    _, _, html = data.partition(b"\n")  # 第一行是 JSON 头（kind/key/url/ts），便于直接 zcat 查看
+    return html.decode("utf-8")
+
+
+def read_record(directory: str, entry: ArchiveEntry, f: Any = None) -> str:
+    """读取一条记录；f 为已打开的同一段文件时复用，避免逐条打开。"""
+    if f is None:
+        with open(os.path.join(directory, entry.segment), "rb") as f: return read_record(directory, entry, f)
+    f.seek(entry.offset)
+    return _decode(f.read(entry.length))
+
+
+class HtmlArchive:
+    """
+    抓取到的原始 HTML 的只追加归档，用于修改解析逻辑后离线重新解析（见 reparse）：
+    - 每条记录单独压缩为一个 gzip member，顺序追加到段文件 seg-<时间>-<pid>-<n>.gz；
+      段文件超过 segment_bytes 后换新段，旧段不再改写，整个段仍可直接 zcat
+    - index.tsv 每条记录一行：kind、key（用户名/URL）、抓取时间、段、偏移、长度、sha1、URL
+    - 同一 key 的 HTML 与最近一次归档内容相同时不重复写入
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 256 << 20, level: int = 6):
+        self.root = Path(directory); self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / INDEX_NAME
+        self.segment_bytes = segment_bytes
+        self.level = level
+        self._latest_sha: Optional[Dict[tuple, str]] = None  # 首次写入时才加载，只读使用不必扫描索引
+        self._seg: Any = None; self._seg_name = ""; self._seg_no = 0
+        self._index: Any = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: Any) -> Optional["HtmlArchive"]:
+        if not cfg.archive_dir: return None
+        return cls(cfg.archive_dir)
+
+    # ---- 写入 ----
+    def _open_segment(self) -> None:
+        if self._seg is not None: self._seg.close()
+        self._seg_no += 1
+        self._seg_name = f"seg-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}-{self._seg_no:04d}.gz"
+        self._seg = open(self.root / self._seg_name, "ab")
+
+    def append(self, kind: str, key: str, url: str, html: str, ts: Optional[float] = None) -> bool:
+        """
+        归档一页；内容与该 key 最近一次归档相同则跳过并返回 False。
+        线程安全（压缩在锁外进行）；异步代码应通过 asyncio.to_thread 调用，压缩与首次加载索引都会阻塞。
+        """
+        data = html.encode("utf-8"); sha1 = hashlib.sha1(data).hexdigest()
+        ident = (kind, _clean(key))
+        with self._lock:
+            if self._latest_sha is None: self._latest_sha = {e[:2]: e.sha1 for e in self.entries(latest=False)}
+            if self._latest_sha.get(ident) == sha1: return False
+        ts = time.time() if ts is None else ts
+        header = json.dumps({"kind": kind, "key": key, "url": url, "ts": ts}, ensure_ascii=False).encode("utf-8")
+        c = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        blob = c.compress(header + b"\n" + data) + c.flush()
+        with self._lock:
+            if self._seg is None or self._seg.tell() >= self.segment_bytes: self._open_segment()
+            offset = self._seg.tell()
+            self._seg.write(blob); self._seg.flush()
+            # 正文写入后再写索引：索引中的记录一定可读
+            if self._index is None: self._index = open(self.index_path, "a", encoding="utf-8")
+            entry = ArchiveEntry(kind, ident[1], ts, self._seg_name, offset, len(blob), sha1, _clean(url))
+            self._index.write(entry.to_line()); self._index.flush()
+            self._latest_sha[ident] = sha1
+        return True
+
+    def close(self) -> None:
+        if self._seg is not None: self._seg.close(); self._seg = None
+        if self._index is not None: self._index.close(); self._index = None
+
+    def __enter__(self) -> "HtmlArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---- 读取 ----
+    def entries(self, kind: Optional[str] = None, latest: bool = True) -> List[ArchiveEntry]:
+        """
+        读取索引。latest=True 时每个 key 只保留最近一次抓取；
+        结果按 (段, 偏移) 排序，重新解析时顺序读盘。
+        """
+        out: List[ArchiveEntry] = []
+        if self.index_path.exists():
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    e = ArchiveEntry.from_line(line)
+                    if e is not None and (kind is None or e.kind == kind): out.append(e)
+        if latest:
+            newest: Dict[tuple, ArchiveEntry] = {}
+            for e in out:
+                cur = newest.get(e[:2])
+                if cur is None or e.ts >= cur.ts: newest[e[:2]] = e
+            out = list(newest.values())
+        out.sort(key=lambda e: (e.segment, e.offset))
+        return out
+
+    def get(self, key: str, kind: Optional[str] = None) -> Optional[str]:
+        """取某个 key 最近一次归档的 HTML。"""
+        found = [e for e in self.entries(kind) if e.key == key]
+        return read_record(str(self.root), max(found, key=lambda e: e.ts)) if found else None
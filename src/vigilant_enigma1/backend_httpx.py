@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from contextlib import ExitStack
+from typing import Any, Dict, Optional
+
+import httpx
+from tenacity import AsyncRetrying
+
+from .backends import retry_kwargs
+from .cache import ResponseCache, RevalidationMiss
+from .config import Config
+from .head import HeadParser, parse_head
+from .metrics import NULL_METRICS, Metrics
+from .ratelimiter import AsyncRateLimiter, RateLimiter
+from .session import HttpxSession, http2_available
+
+__all__ = ["HttpxBackend", "AsyncHttpxBackend", "fetch_html_with_httpx", "fetch_httpx", "fetch_head_httpx"]
+
+# 只重试网络错误与 HTTP 错误状态；离线缓存未命中（CacheMiss）不重试
+RETRY_ON = (httpx.RequestError, httpx.HTTPStatusError)
+
+
+def fetch_html_with_httpx(cfg: Config, url: str, cache: Optional[ResponseCache] = None, limiter: Optional[RateLimiter] = None, session: Optional[HttpxSession] = None, metrics: Metrics = NULL_METRICS) -> str:
+    """
+    使用 httpx 抓取示例：从 Playwright 持久化的 storageState 导出 cookies 并复用。
+    注意：Instagram 对无头与反爬较严格，httpx 成功率可能低于 Playwright。
+    cache 非空时先查磁盘缓存（新鲜命中不发请求、不占限速配额）；
+    传入 session 时复用其长连接，否则临时建立一次性会话。
+    """
+    headers_extra: Dict[str, str] = {}
+    if cache is not None:
+        text, headers_extra = cache.lookup(url)
+        if text is not None: metrics.inc("cache_total", result="hit"); return text
+    if limiter is not None:
+        with metrics.timer("ratelimit"): limiter.wait(url)
+    with ExitStack() as stack:
+        if session is None: session = stack.enter_context(HttpxSession(cfg, max_connections=1))
+        with metrics.timer("fetch"): r = session.client.get(url, headers=headers_extra, extensions=metrics.httpx_extensions(is_async=False))
+        metrics.record_response(r.status_code, r.num_bytes_downloaded)
+        if limiter is not None: limiter.observe(url, r.status_code, r.headers)
+        if cache is not None and r.status_code == 304:
+            try: text = cache.update(url, r)
+            except RevalidationMiss:
+                # 条目在条件请求期间被淘汰：不带条件头重新完整请求一次（此时 lookup 不再返回条件头）
+                if not headers_extra: raise
+                return fetch_html_with_httpx(cfg, url, cache=cache, limiter=limiter, session=session, metrics=metrics)
+            metrics.inc("cache_total", result="revalidated"); return text
+        r.raise_for_status()
+        if cache is None: return r.text
+        metrics.inc("cache_total", result="miss"); return cache.update(url, r)
+
+
+async def _fetch_httpx_once(client: httpx.AsyncClient, url: str, cache: Optional[ResponseCache] = None, limiter: Optional[AsyncRateLimiter] = None, metrics: Metrics = NULL_METRICS) -> str:
+    """cache 非空时先查缓存：新鲜命中不发请求、不占限速配额；过期则发条件请求，304 视为命中。"""
+    headers: Dict[str, str] = {}
+    if cache is not None:
+        text, headers = cache.lookup(url)
+        if text is not None:
+            metrics.inc("cache_total", result="hit")
+            return text
+    if limiter is not None:
+        with metrics.timer("ratelimit"):
+            await limiter.wait(url)
+    with metrics.timer("fetch"):
+        resp = await client.get(url, headers=headers, extensions=metrics.httpx_extensions())
+    metrics.record_response(resp.status_code, resp.num_bytes_downloaded)
+    if limiter is not None:
+        limiter.observe(url, resp.status_code, resp.headers)  # 429/Retry-After 时暂停该 host
+    if cache is not None and resp.status_code == 304:
+        try: text = cache.update(url, resp)
+        except RevalidationMiss:
+            # 条目在条件请求期间被淘汰：不带条件头重新完整请求一次（此时 lookup 不再返回条件头）
+            if not headers: raise
+            return await _fetch_httpx_once(client, url, cache=cache, limiter=limiter, metrics=metrics)
+        metrics.inc("cache_total", result="revalidated")
+        return text
+    resp.raise_for_status()
+    if cache is None: return resp.text
+    metrics.inc("cache_total", result="miss")
+    return cache.update(url, resp)
+
+
+async def _fetch_head_once(client: httpx.AsyncClient, url: str, cache: Optional[ResponseCache] = None, limiter: Optional[AsyncRateLimiter] = None, metrics: Metrics = NULL_METRICS) -> Dict[str, Any]:
+    """
+    流式读取，边解码边喂给 HeadParser，看到 </head>/<body> 或 title 与 description 都已拿到时立即关闭响应，
+    直接返回解析结果（字段同 parse_html），不再二次解析。
+    缓存只读：新鲜命中时解析缓存的完整正文；截断的前缀不写入缓存（也不发条件请求）。
+    提前关闭的 HTTP/1.1 连接不能复用，HTTP/2 只重置该 stream。
+    """
+    if cache is not None:
+        text, _ = cache.lookup(url)
+        if text is not None:
+            metrics.inc("cache_total", result="hit")
+            return parse_head(text, url)
+    if limiter is not None:
+        with metrics.timer("ratelimit"):
+            await limiter.wait(url)
+    parser = HeadParser(); truncated = False
+    with metrics.timer("fetch"):
+        async with client.stream("GET", url, extensions=metrics.httpx_extensions()) as resp:
+            if resp.is_success:  # 错误响应不读正文，退出时直接关闭
+                async for text in resp.aiter_text():  # 按响应 charset 增量解码，多字节字符跨块也安全
+                    parser.feed(text)
+                    if parser.done: truncated = True; break
+    metrics.record_response(resp.status_code, resp.num_bytes_downloaded)
+    if truncated: metrics.inc("head_only_truncated_total")
+    if limiter is not None:
+        limiter.observe(url, resp.status_code, resp.headers)
+    resp.raise_for_status()
+    parser.close()
+    return parser.result(url)
+
+
+async def fetch_head_httpx(client: httpx.AsyncClient, url: str, cache: Optional[ResponseCache] = None, limiter: Optional[AsyncRateLimiter] = None, metrics: Metrics = NULL_METRICS, cfg: Optional[Config] = None) -> Dict[str, Any]:
+    """fetch_httpx 的 head-only 版本：只下载到 <head> 结束，返回 {"url", "title", "description"}。"""
+    retrying = AsyncRetrying(**retry_kwargs(cfg or Config.for_urls(), RETRY_ON, metrics))
+    return await retrying(_fetch_head_once, client, url, cache=cache, limiter=limiter, metrics=metrics)
+
+
+async def fetch_httpx(client: httpx.AsyncClient, url: str, cache: Optional[ResponseCache] = None, limiter: Optional[AsyncRateLimiter] = None, metrics: Metrics = NULL_METRICS, cfg: Optional[Config] = None) -> str:
+    """带重试的单次抓取；每次尝试（含重试）都重新经过 limiter。cfg 为空时按通用 URL 抓取的配置。"""
+    retrying = AsyncRetrying(**retry_kwargs(cfg or Config.for_urls(), RETRY_ON, metrics))
+    return await retrying(_fetch_httpx_once, client, url, cache=cache, limiter=limiter, metrics=metrics)
+
+
+class HttpxBackend:
+    """同步 httpx 后端：整个运行期间复用一个 HttpxSession（长连接 + Playwright 导出的 cookies）。"""
+
+    def __init__(self, cfg: Config, limiter: Optional[RateLimiter] = None, cache: Optional[ResponseCache] = None, metrics: Metrics = NULL_METRICS, concurrency: Optional[int] = None):
+        self.cfg = cfg; self.limiter = limiter; self.cache = cache; self.metrics = metrics
+        self.session = HttpxSession(cfg, max_connections=max(1, concurrency or 1) * 2)
+
+    def fetch(self, url: str) -> str:
+        return fetch_html_with_httpx(self.cfg, url, cache=self.cache, limiter=self.limiter, session=self.session, metrics=self.metrics)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "HttpxBackend":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class AsyncHttpxBackend:
+    """
+    异步 httpx 后端。cookies=True（默认）时使用 HttpxSession 的 AsyncClient（Instagram 抓取，带登录 cookies），
+    否则按 cfg 建一个不带 cookies 的通用客户端（scrape 命令）。失败按 cfg.retry_attempts 指数退避重试。
+    fetch_head 只流式读取到 </head>，直接返回 title/description。
+    """
+
+    def __init__(self, cfg: Config, limiter: Optional[AsyncRateLimiter] = None, cache: Optional[ResponseCache] = None, metrics: Metrics = NULL_METRICS, concurrency: Optional[int] = None, cookies: bool = True):
+        self.cfg = cfg; self.limiter = limiter; self.cache = cache; self.metrics = metrics
+        self.session = HttpxSession(cfg, max_connections=max(1, concurrency or cfg.concurrency) * 2) if cookies else None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self.session is not None: return self.session.async_client
+        if self._client is None:
+            kwargs: Dict[str, Any] = dict(
+                headers={"User-Agent": self.cfg.user_agent, "Accept": "text/html,application/xhtml+xml"},
+                timeout=httpx.Timeout(self.cfg.timeout, read=self.cfg.timeout),
+                follow_redirects=True,
+                http2=http2_available(),
+            )
+            if self.cfg.proxy: kwargs["proxies"] = self.cfg.proxy
+            self._client = httpx.AsyncClient(**kwargs)
+        return self._client
+
+    async def fetch(self, url: str) -> str:
+        retrying = AsyncRetrying(**retry_kwargs(self.cfg, RETRY_ON, self.metrics))
+        return await retrying(_fetch_httpx_once, self.client, url, cache=self.cache, limiter=self.limiter, metrics=self.metrics)
+
+    async def fetch_head(self, url: str) -> Dict[str, Any]:
+        retrying = AsyncRetrying(**retry_kwargs(self.cfg, RETRY_ON, self.metrics))
+        return await retrying(_fetch_head_once, self.client, url, cache=self.cache, limiter=self.limiter, metrics=self.metrics)
+
+    async def aclose(self) -> None:
+        if self.session is not None: await self.session.aclose()
+        if self._client is not None: await self._client.aclose(); self._client = None
+
+    async def __aenter__(self) -> "AsyncHttpxBackend":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from tenacity import AsyncRetrying, Retrying
+
+from .backends import TransientError, retry_kwargs
+from .browser_pool import AsyncBrowserPool, BrowserPool
+from .cache import ResponseCache
+from .config import Config
+from .metrics import NULL_METRICS, Metrics
+from .playwright_login import ResourceBlocker, _maybe_stealth_async, login_and_get_html, wait_ready_async
+from .ratelimiter import AsyncRateLimiter, RateLimiter
+
+__all__ = ["PlaywrightBackend", "AsyncPlaywrightBackend", "BrowserBackend", "fetch_html_with_playwright", "fetch_browser"]
+
+
+def _fetch_playwright_once(cfg: Config, url: str, pool: Optional[BrowserPool], limiter: Optional[RateLimiter], metrics: Metrics) -> str:
+    try:
+        if limiter is not None:
+            with metrics.timer("ratelimit"): limiter.wait(url)
+        with metrics.timer("fetch"):
+            if pool is not None: return pool.fetch(url, timeout=cfg.timeout, limiter=limiter, metrics=metrics)
+            return login_and_get_html(cfg.ig_user, cfg.ig_pass, url, headless=cfg.headless, proxy=cfg.proxy, user_agent=cfg.user_agent, blocker=ResourceBlocker.from_config(cfg, metrics), wait_selector=cfg.wait_selector, timeout=cfg.timeout)
+    except Exception as e: raise TransientError(str(e))
+
+
+def fetch_html_with_playwright(cfg: Config, url: str, pool: Optional[BrowserPool] = None, limiter: Optional[RateLimiter] = None, metrics: Metrics = NULL_METRICS) -> str:
+    """传入 pool 时复用常驻浏览器，否则每次独立启动 Chromium；limiter 对每次尝试（含重试）限速。"""
+    return Retrying(**retry_kwargs(cfg, TransientError, metrics))(_fetch_playwright_once, cfg, url, pool, limiter, metrics)
+
+
+async def fetch_browser(url: str, timeout: Optional[float] = None, cfg: Optional[Config] = None, metrics: Metrics = NULL_METRICS, limiter: Optional[AsyncRateLimiter] = None) -> str:
+    """
+    独立启动一次 Chromium 抓取单个 URL（不登录）；cfg 为空时按通用 URL 抓取的配置。
+    按 cfg.block_resources/block_urls 拦截图片、媒体、字体与统计请求，DOMContentLoaded 即返回。
+    limiter 非空时把主文档的状态码与响应头交给 limiter.observe（429 退避；--adaptive 时也是并发控制器的延迟/状态样本）。
+    """
+    try:
+        from playwright.async_api import async_playwright
+    except ImportError as e:
+        raise RuntimeError("Playwright 未安装，请安装 extras 'browser' 后使用 --browser") from e
+    cfg = cfg or Config.for_urls()
+
+    async with async_playwright() as p:
+        launch_kwargs: dict = {"headless": cfg.headless}
+        if cfg.proxy:
+            launch_kwargs["proxy"] = {"server": cfg.proxy}
+        browser = await p.chromium.launch(**launch_kwargs)
+        context = await browser.new_context(user_agent=cfg.user_agent)
+        blocker = ResourceBlocker.from_config(cfg, metrics)
+        if blocker is not None: await blocker.install_async(context)
+        page = await context.new_page()
+        await _maybe_stealth_async(page)
+        timeout_ms = int((timeout or cfg.timeout) * 1000)
+        resp = await page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+        if limiter is not None and resp is not None: limiter.observe(url, resp.status, resp.headers)
+        await wait_ready_async(page, cfg.wait_selector, timeout_ms)
+        content = await page.content()
+        await browser.close()
+        return content
+
+
+class PlaywrightBackend:
+    """同步常驻浏览器后端：整个运行期间只启动一次 Chromium（首次抓取时惰性启动）。"""
+
+    def __init__(self, cfg: Config, limiter: Optional[RateLimiter] = None, cache: Optional[ResponseCache] = None, metrics: Metrics = NULL_METRICS, concurrency: Optional[int] = None):
+        self.cfg = cfg; self.limiter = limiter; self.metrics = metrics
+        self.pool = BrowserPool(cfg, max_pages=max(concurrency or 0, cfg.page_pool_size), metrics=metrics)
+
+    def fetch(self, url: str) -> str:
+        return fetch_html_with_playwright(self.cfg, url, self.pool, self.limiter, metrics=self.metrics)
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def __enter__(self) -> "PlaywrightBackend":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class AsyncPlaywrightBackend:
+    """异步常驻浏览器后端：page 池大小不小于并发数；每次尝试（含重试）都先经过全局限速器。"""
+
+    def __init__(self, cfg: Config, limiter: Optional[AsyncRateLimiter] = None, cache: Optional[ResponseCache] = None, metrics: Metrics = NULL_METRICS, concurrency: Optional[int] = None):
+        self.cfg = cfg; self.limiter = limiter; self.metrics = metrics
+        self.pool = AsyncBrowserPool(cfg, max_pages=max(concurrency or 0, cfg.page_pool_size), metrics=metrics)
+
+    async def _fetch_once(self, url: str) -> str:
+        try:
+            if self.limiter is not None:
+                with self.metrics.timer("ratelimit"): await self.limiter.wait(url)
+            with self.metrics.timer("fetch"): return await self.pool.fetch(url, timeout=self.cfg.timeout, limiter=self.limiter, metrics=self.metrics)
+        except Exception as e: raise TransientError(str(e))
+
+    async def fetch(self, url: str) -> str:
+        return await AsyncRetrying(**retry_kwargs(self.cfg, TransientError, self.metrics))(self._fetch_once, url)
+
+    async def aclose(self) -> None:
+        await self.pool.close()
+
+    async def __aenter__(self) -> "AsyncPlaywrightBackend":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+
+class BrowserBackend:
+    """scrape --browser：每个 URL 独立启动一次 Chromium（不登录、不重试，不经过响应缓存）。"""
+
+    def __init__(self, cfg: Config, limiter: Optional[AsyncRateLimiter] = None, cache: Optional[ResponseCache] = None, metrics: Metrics = NULL_METRICS, concurrency: Optional[int] = None):
+        self.cfg = cfg; self.limiter = limiter; self.metrics = metrics
+
+    async def fetch(self, url: str) -> str:
+        if self.limiter is not None:
+            with self.metrics.timer("ratelimit"): await self.limiter.wait(url)
+        with self.metrics.timer("fetch"): return await fetch_browser(url, cfg=self.cfg, metrics=self.metrics, limiter=self.limiter)
+
+    async def aclose(self) -> None:
+        pass
+
+    async def __aenter__(self) -> "BrowserBackend":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
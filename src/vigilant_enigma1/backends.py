@@ -0,0 +1,71 @@
+"""
+抓取后端注册表：名字 → "模块:类"，只有被选中时才导入对应模块（连同 httpx / playwright / tenacity）。
+
+    httpx             同步 httpx 长连接会话（igscrape --httpx）
+    httpx-async       异步 httpx（scrape 与 igscrape --httpx --async）
+    playwright        同步常驻浏览器 page 池（igscrape 默认）
+    playwright-async  异步常驻浏览器 page 池（igscrape --async）
+    browser           每个 URL 独立启动一次 Chromium（scrape --browser）
+
+后端统一以 (cfg, limiter=None, cache=None, metrics=NULL_METRICS, concurrency=None) 构造，
+同步后端提供 fetch(url)/close() 与 with，异步后端提供 await fetch(url)/aclose() 与 async with。
+限速、缓存、重试与指标都在后端内部完成；重试次数与退避在调用时取自 cfg。
+"""
+from __future__ import annotations
+
+import importlib
+from typing import Any, Dict, Optional, Tuple, Type
+
+__all__ = ["BACKENDS", "TransientError", "register_backend", "load_backend", "open_backend", "retry_kwargs"]
+
+BACKENDS: Dict[str, str] = {
+    "httpx": "vigilant_enigma1.backend_httpx:HttpxBackend",
+    "httpx-async": "vigilant_enigma1.backend_httpx:AsyncHttpxBackend",
+    "playwright": "vigilant_enigma1.backend_playwright:PlaywrightBackend",
+    "playwright-async": "vigilant_enigma1.backend_playwright:AsyncPlaywrightBackend",
+    "browser": "vigilant_enigma1.backend_playwright:BrowserBackend",
+}
+_loaded: Dict[str, Any] = {}  # 按 "模块:类" 缓存已导入的类：替换注册（包括直接改 BACKENDS）后立即生效
+
+
+class TransientError(Exception): pass
+
+
+def register_backend(name: str, target: str) -> None:
+    """注册（或替换）一个后端；target 为 "模块:类"，首次使用时才导入。"""
+    BACKENDS[name] = target
+
+
+def load_backend(name: str) -> Any:
+    target = BACKENDS.get(name)
+    if target is None: raise ValueError(f"未知的抓取后端: {name}（可选 {', '.join(sorted(BACKENDS))}）")
+    cls = _loaded.get(target)
+    if cls is None:
+        module, _, attr = target.partition(":")
+        cls = _loaded[target] = getattr(importlib.import_module(module), attr)
+    return cls
+
+
+def open_backend(name: str, cfg: Any, **kwargs: Any) -> Any:
+    """按名字创建后端实例（未启动；由 with / async with 管理生命周期）。"""
+    return load_backend(name)(cfg, **kwargs)
+
+
+def retry_kwargs(cfg: Any, retry_on: Tuple[Type[BaseException], ...] | Type[BaseException], metrics: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    按 cfg.retry_attempts / cfg.retry_backoff 构造 tenacity 的 Retrying/AsyncRetrying 参数；
+    每次调用新建一个 Retrying，重试状态不在并发的协程之间共享。metrics 非空时累计 retries_total。
+    """
+    from tenacity import retry_if_exception_type, stop_after_attempt, wait_exponential
+
+    def before_sleep(retry_state: Any) -> None:
+        if metrics is not None: metrics.inc("retries_total")
+
+    backoff = cfg.retry_backoff
+    return dict(
+        stop=stop_after_attempt(max(1, cfg.retry_attempts)),
+        wait=wait_exponential(multiplier=backoff, min=backoff, max=backoff * 8),
+        retry=retry_if_exception_type(retry_on),
+        before_sleep=before_sleep,
+        reraise=True,
+    )
@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import Config
+from .logger import init_logger
+from .playwright_login import ResourceBlocker, _maybe_stealth, _maybe_stealth_async, ensure_logged_in, ensure_logged_in_async, wait_ready, wait_ready_async
+
+__all__ = ["BrowserPool", "AsyncBrowserPool"]
+
+
+def _cookie_signature(cookies: List[dict]) -> str:
+    """cookies 的稳定指纹；忽略顺序，用于判断是否需要回写 storage state。"""
+    norm = sorted((c.get("domain", ""), c.get("path", ""), c.get("name", ""), c.get("value", "")) for c in cookies)
+    return hashlib.sha1(json.dumps(norm).encode("utf-8")).hexdigest()
+
+
+class _PoolBase:
+    """
+    BrowserPool 与 AsyncBrowserPool 共用的配置与记账（不做任何 I/O）：
+    page 借出/归还计数、使用次数、崩溃标记、context 到期判断与 cookies 指纹。
+    两个子类只负责调用各自的 sync/async Playwright API，借还规则只在这里实现一次。
+    """
+
+    def __init__(self, cfg: Config, storage_dir: str, max_pages: Optional[int], page_max_uses: Optional[int], context_max_uses: Optional[int], metrics: Any):
+        self.cfg = cfg
+        self.state_path = Path(storage_dir) / "state.json"
+        self.max_pages = max(1, max_pages or cfg.page_pool_size)
+        self.page_max_uses = page_max_uses or cfg.page_max_uses
+        self.context_max_uses = context_max_uses or cfg.context_max_uses
+        self.logger = init_logger("igscraper")
+        # 图片/媒体/字体/统计请求在 context 级拦截（含登录页）；cfg.block_resources 与 block_urls 均为空时不拦截
+        self.blocker = ResourceBlocker.from_config(cfg, metrics)
+        self._pw: Any = None
+        self._browser: Any = None
+        self._context: Any = None
+        self._idle: List[Any] = []
+        self._uses: Dict[int, int] = {}
+        self._crashed: set[int] = set()
+        self._in_use = 0
+        self._context_uses = 0
+        self._cookie_sig = ""
+
+    def _launch_kwargs(self) -> dict:
+        launch_kwargs: dict = {"headless": self.cfg.headless}
+        if self.cfg.proxy: launch_kwargs["proxy"] = {"server": self.cfg.proxy}
+        return launch_kwargs
+
+    def _context_kwargs(self) -> dict:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        storage_state = str(self.state_path) if self.state_path.exists() else None
+        return {"storage_state": storage_state, "user_agent": self.cfg.user_agent}
+
+    def _track_page(self, page: Any) -> Any:
+        self._uses[id(page)] = 0
+        page.on("crash", lambda p=page: self._crashed.add(id(p)))
+        return page
+
+    def _forget_page(self, page: Any) -> None:
+        self._uses.pop(id(page), None); self._crashed.discard(id(page))
+
+    def _reset(self) -> None:
+        self._pw = self._browser = self._context = None
+        self._idle.clear(); self._uses.clear(); self._crashed.clear()
+
+    def _needs_recycle(self) -> bool:
+        """context 到期或浏览器断开，且没有借出的 page：可以重建。"""
+        return self._in_use == 0 and (self._context_uses >= self.context_max_uses or not self._browser.is_connected())
+
+    def _can_lend(self) -> bool:
+        """context 到期后不再借出（等借出的 page 全部归还再重建）；借出数不超过 max_pages。"""
+        return self._context_uses < self.context_max_uses and bool(self._idle or self._in_use < self.max_pages)
+
+    def _returned(self, page: Any, broken: bool) -> bool:
+        """记账一次归还；返回 True 表示该 page 应关闭（出错、崩溃、已关闭或达到 page_max_uses），否则已放回空闲队列。"""
+        self._in_use -= 1
+        self._context_uses += 1
+        uses = self._uses.get(id(page), 0) + 1
+        self._uses[id(page)] = uses
+        if broken or id(page) in self._crashed or page.is_closed() or uses >= self.page_max_uses: return True
+        self._idle.append(page)
+        return False
+
+    def _changed_signature(self, cookies: List[dict]) -> Optional[str]:
+        """cookies 与上次写入时不同则返回新指纹，否则返回 None（无需回写 state.json）。"""
+        sig = _cookie_signature(cookies)
+        return None if sig == self._cookie_sig else sig
+
+
+class BrowserPool(_PoolBase):
+    """
+    常驻 Chromium 会话：只启动一次浏览器、维护一个已登录的 context，
+    并提供有界的可复用 page 池。page 在使用 page_max_uses 次或崩溃后回收，
+    context 在 context_max_uses 次后整体重建；cookies 变化时才回写 state.json。
+
+    注意：sync Playwright 对象只能在创建它的线程中使用。
+    """
+
+    def __init__(
+        self,
+        cfg: Config,
+        storage_dir: str = ".playwright",
+        max_pages: Optional[int] = None,
+        page_max_uses: Optional[int] = None,
+        context_max_uses: Optional[int] = None,
+        metrics: Any = None,
+    ):
+        super().__init__(cfg, storage_dir, max_pages, page_max_uses, context_max_uses, metrics)
+        self._cond = threading.Condition()
+
+    # ---- 生命周期 ----
+    def start(self) -> "BrowserPool":
+        if self._browser is not None: return self
+        try:
+            from playwright.sync_api import sync_playwright
+        except ImportError as e:
+            raise RuntimeError("Playwright 未安装，请安装 extras 'browser'") from e
+        self._pw = sync_playwright().start()
+        try: self._launch()
+        except Exception:
+            if self._browser is not None:
+                try: self._browser.close()
+                except Exception: pass
+            self._pw.stop(); self._reset()
+            raise
+        return self
+
+    def _launch(self) -> None:
+        self._browser = self._pw.chromium.launch(**self._launch_kwargs())
+        self._new_context()
+
+    def _new_context(self) -> None:
+        self._context = self._browser.new_context(**self._context_kwargs())
+        if self.blocker is not None: self.blocker.install(self._context)
+        self._context_uses = 0
+        page = self._new_page()
+        if ensure_logged_in(page, self.cfg.ig_user, self.cfg.ig_pass):
+            self._context.storage_state(path=str(self.state_path))
+        self._cookie_sig = _cookie_signature(self._context.cookies())
+        self._idle.append(page)
+        self.logger.debug("已创建浏览器 context")
+
+    def _new_page(self) -> Any:
+        page = self._context.new_page(); _maybe_stealth(page)
+        return self._track_page(page)
+
+    def _close_page(self, page: Any) -> None:
+        self._forget_page(page)
+        try: page.close()
+        except Exception: pass
+
+    def _recycle_context(self) -> None:
+        """关闭当前 context（及其空闲 page）并重建；浏览器已断开时整体重启。"""
+        try: self.save_state()
+        except Exception: pass
+        for page in self._idle: self._close_page(page)
+        self._idle.clear()
+        try: self._context.close()
+        except Exception: pass
+        if not self._browser.is_connected():
+            self.logger.warning("浏览器已断开，重新启动 Chromium")
+            self._launch()
+        else:
+            self._new_context()
+
+    def close(self) -> None:
+        if self._browser is None: return
+        try: self.save_state()
+        except Exception: pass
+        try: self._browser.close()
+        finally:
+            self._pw.stop(); self._reset()
+
+    def __enter__(self) -> "BrowserPool":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---- page 池 ----
+    def acquire(self) -> Any:
+        with self._cond:
+            while True:
+                if self._needs_recycle(): self._recycle_context()
+                if self._can_lend(): break
+                self._cond.wait()
+            page = self._idle.pop() if self._idle else self._new_page()
+            self._in_use += 1
+            return page
+
+    def release(self, page: Any, broken: bool = False) -> None:
+        with self._cond:
+            if self._returned(page, broken): self._close_page(page)
+            self._cond.notify_all()
+
+    def save_state(self) -> bool:
+        """仅在 cookies 发生变化时写 state.json；返回是否写入。"""
+        if self._context is None: return False
+        sig = self._changed_signature(self._context.cookies())
+        if sig is None: return False
+        self._context.storage_state(path=str(self.state_path)); self._cookie_sig = sig
+        return True
+
+    def fetch(self, url: str, timeout: Optional[float] = None, limiter: Any = None, metrics: Any = None) -> str:
+        """
+        limiter 非空时把响应状态交给它（429/Retry-After 会暂停后续请求）；metrics 非空时记录状态码与字节数。
+        cfg.wait_selector 非空时 DOMContentLoaded 后只等该选择器出现（超时则按当前 HTML 返回），否则等待 networkidle。
+        """
+        if self._browser is None: self.start()
+        page = self.acquire(); broken = False
+        timeout_ms = int((timeout or self.cfg.timeout) * 1000)
+        try:
+            resp = page.goto(url, wait_until="domcontentloaded" if self.cfg.wait_selector else "networkidle", timeout=timeout_ms)
+            if limiter is not None and resp is not None: limiter.observe(url, resp.status, resp.headers)
+            if not wait_ready(page, self.cfg.wait_selector, timeout_ms): self.logger.debug("%s 未等到 %s，按当前 HTML 返回", url, self.cfg.wait_selector)
+            html = page.content()
+            if metrics is not None and metrics.enabled and resp is not None: metrics.record_response(resp.status, len(html.encode("utf-8")))
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.release(page, broken=broken)
+        self.save_state()
+        return html
+
+
+class AsyncBrowserPool(_PoolBase):
+    """BrowserPool 的 async_api 版本：page 池可被多个协程并发借用。"""
+
+    def __init__(
+        self,
+        cfg: Config,
+        storage_dir: str = ".playwright",
+        max_pages: Optional[int] = None,
+        page_max_uses: Optional[int] = None,
+        context_max_uses: Optional[int] = None,
+        metrics: Any = None,
+    ):
+        super().__init__(cfg, storage_dir, max_pages, page_max_uses, context_max_uses, metrics)
+        self._cond = asyncio.Condition()
+        self._start_lock = asyncio.Lock()
+
+    # ---- 生命周期 ----
+    async def start(self) -> "AsyncBrowserPool":
+        async with self._start_lock:
+            if self._browser is not None: return self
+            try:
+                from playwright.async_api import async_playwright
+            except ImportError as e:
+                raise RuntimeError("Playwright 未安装，请安装 extras 'browser'") from e
+            self._pw = await async_playwright().start()
+            try: await self._launch()
+            except Exception:
+                if self._browser is not None:
+                    try: await self._browser.close()
+                    except Exception: pass
+                await self._pw.stop(); self._reset()
+                raise
+            return self
+
+    async def _launch(self) -> None:
+        self._browser = await self._pw.chromium.launch(**self._launch_kwargs())
+        await self._new_context()
+
+    async def _new_context(self) -> None:
+        self._context = await self._browser.new_context(**self._context_kwargs())
+        if self.blocker is not None: await self.blocker.install_async(self._context)
+        self._context_uses = 0
+        page = await self._new_page()
+        if await ensure_logged_in_async(page, self.cfg.ig_user, self.cfg.ig_pass):
+            await self._context.storage_state(path=str(self.state_path))
+        self._cookie_sig = _cookie_signature(await self._context.cookies())
+        self._idle.append(page)
+        self.logger.debug("已创建浏览器 context")
+
+    async def _new_page(self) -> Any:
+        page = await self._context.new_page(); await _maybe_stealth_async(page)
+        return self._track_page(page)
+
+    async def _close_page(self, page: Any) -> None:
+        self._forget_page(page)
+        try: await page.close()
+        except Exception: pass
+
+    async def _recycle_context(self) -> None:
+        try: await self.save_state()
+        except Exception: pass
+        for page in self._idle: await self._close_page(page)
+        self._idle.clear()
+        try: await self._context.close()
+        except Exception: pass
+        if not self._browser.is_connected():
+            self.logger.warning("浏览器已断开，重新启动 Chromium")
+            await self._launch()
+        else:
+            await self._new_context()
+
+    async def close(self) -> None:
+        if self._browser is None: return
+        try: await self.save_state()
+        except Exception: pass
+        try: await self._browser.close()
+        finally:
+            await self._pw.stop(); self._reset()
+
+    async def __aenter__(self) -> "AsyncBrowserPool":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    # ---- page 池 ----
+    async def acquire(self) -> Any:
+        async with self._cond:
+            while True:
+                if self._needs_recycle(): await self._recycle_context()
+                if self._can_lend(): break
+                await self._cond.wait()
+            page = self._idle.pop() if self._idle else await self._new_page()
+            self._in_use += 1
+            return page
+
+    async def release(self, page: Any, broken: bool = False) -> None:
+        async with self._cond:
+            if self._returned(page, broken): await self._close_page(page)
+            self._cond.notify_all()
+
+    async def save_state(self) -> bool:
+        if self._context is None: return False
+        sig = self._changed_signature(await self._context.cookies())
+        if sig is None: return False
+        await self._context.storage_state(path=str(self.state_path)); self._cookie_sig = sig
+        return True
+
+    async def fetch(self, url: str, timeout: Optional[float] = None, limiter: Any = None, metrics: Any = None) -> str:
+        if self._browser is None: await self.start()
+        page = await self.acquire(); broken = False
+        timeout_ms = int((timeout or self.cfg.timeout) * 1000)
+        try:
+            resp = await page.goto(url, wait_until="domcontentloaded" if self.cfg.wait_selector else "networkidle", timeout=timeout_ms)
+            if limiter is not None and resp is not None: limiter.observe(url, resp.status, resp.headers)
+            if not await wait_ready_async(page, self.cfg.wait_selector, timeout_ms): self.logger.debug("%s 未等到 %s，按当前 HTML 返回", url, self.cfg.wait_selector)
+            html = await page.content()
+            if metrics is not None and metrics.enabled and resp is not None: metrics.record_response(resp.status, len(html.encode("utf-8")))
+        except Exception:
+            broken = True
+            raise
+        finally:
+            await self.release(page, broken=broken)
+        await self.save_state()
+        return html
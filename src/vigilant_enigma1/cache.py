@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+__all__ = ["ResponseCache", "CacheMiss", "RevalidationMiss"]
+
+
+class CacheMiss(Exception):
+    """离线模式下请求的 URL 不在缓存中。"""
+
+
+class RevalidationMiss(Exception):
+    """收到 304，但缓存条目在条件请求期间已被淘汰：应去掉条件头重新请求。"""
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """先写同目录下的唯一临时文件再 os.replace：多个进程（分片共享 --cache-dir）同时写同一路径也互不干扰。"""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f: f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
+
+
+class ResponseCache:
+    """
+    磁盘 HTTP 响应缓存（httpx 两条抓取路径共用）：
+    - 正文按 sha256 内容寻址存放在 <dir>/blobs/，相同内容只存一份
+    - 每个 URL 一份元数据 <dir>/meta/<sha256(url)>.json，记录 ETag/Last-Modified 与写入时间
+    - ttl 秒内直接命中；过期后发送 If-None-Match/If-Modified-Since，304 视为命中
+    - 正文总大小超过 max_bytes 时按最近访问时间（LRU）淘汰；同一 URL 换了内容时旧正文立即删除
+    - offline=True 时只读缓存，未命中抛 CacheMiss
+    """
+
+    def __init__(self, directory: str, ttl: float = 86400.0, max_bytes: int = 1 << 30, offline: bool = False):
+        self.root = Path(directory)
+        self.meta_dir = self.root / "meta"; self.blob_dir = self.root / "blobs"
+        self.meta_dir.mkdir(parents=True, exist_ok=True); self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.stats: Dict[str, int] = {"hit": 0, "revalidated": 0, "miss": 0, "stored": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        self._total = sum(p.stat().st_size for p in self.blob_dir.glob("*/*") if p.suffix != ".tmp")
+
+    @classmethod
+    def from_config(cls, cfg: Any) -> Optional["ResponseCache"]:
+        if not cfg.cache_dir: return None
+        return cls(cfg.cache_dir, ttl=cfg.cache_ttl, max_bytes=int(cfg.cache_max_mb * 1024 * 1024), offline=cfg.offline)
+
+    # ---- 路径与读写 ----
+    def _meta_path(self, url: str) -> Path:
+        return self.meta_dir / (_sha256(url.encode("utf-8")) + ".json")
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / digest
+
+    def _read_meta(self, url: str) -> Optional[Dict[str, Any]]:
+        try: meta = json.loads(self._meta_path(url).read_text(encoding="utf-8"))
+        except (OSError, ValueError): return None
+        return meta if meta.get("url") == url else None
+
+    def _read_body(self, meta: Dict[str, Any]) -> Optional[str]:
+        try: body = self._blob_path(meta["blob"]).read_bytes()
+        except OSError: return None
+        return body.decode("utf-8")
+
+    def _write_meta(self, url: str, meta: Dict[str, Any]) -> None:
+        _atomic_write(self._meta_path(url), json.dumps(meta).encode("utf-8"))
+
+    # ---- 对外接口 ----
+    def lookup(self, url: str) -> Tuple[Optional[str], Dict[str, str]]:
+        """
+        返回 (正文, 条件请求头)：正文非 None 表示新鲜命中，无需请求；
+        否则按返回的请求头发起（条件）请求，再交给 update() 处理响应。
+        """
+        meta = self._read_meta(url)
+        body = self._read_body(meta) if meta else None
+        if meta is not None and body is not None:
+            if self.offline or time.time() - meta["stored_at"] < self.ttl:
+                self.stats["hit"] += 1; os.utime(self._meta_path(url))
+                return body, {}
+            headers: Dict[str, str] = {}
+            if meta.get("etag"): headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"): headers["If-Modified-Since"] = meta["last_modified"]
+            return None, headers
+        if self.offline: raise CacheMiss(url)
+        return None, {}
+
+    def update(self, url: str, resp: Any) -> str:
+        """
+        处理响应：304 返回缓存正文并刷新写入时间；其它（2xx）写入缓存并返回 resp.text。
+        304 时条目已被淘汰（lookup 与 update 之间）则抛 RevalidationMiss：304 没有正文，绝不写入缓存。
+        """
+        if resp.status_code == 304:
+            meta = self._read_meta(url)
+            body = self._read_body(meta) if meta else None
+            if meta is None or body is None: raise RevalidationMiss(url)
+            meta["stored_at"] = time.time(); self._write_meta(url, meta)
+            self.stats["revalidated"] += 1
+            return body
+        text = resp.text
+        self.store(url, text, etag=resp.headers.get("etag"), last_modified=resp.headers.get("last-modified"))
+        self.stats["miss"] += 1
+        return text
+
+    def store(self, url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """
+        写入正文与元数据。同一 URL 之前指向另一份正文时直接删除旧正文（页面每次抓取都会变，否则旧正文只占空间、永远不会被淘汰）；
+        旧正文若恰好也被别的 URL 引用，那个 URL 下次查找时按未命中处理、重新抓取。
+        """
+        data = text.encode("utf-8"); digest = _sha256(data)
+        blob = self._blob_path(digest)
+        with self._lock:
+            prev = self._read_meta(url)
+            if not blob.exists():
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                _atomic_write(blob, data)
+                self._total += len(data)
+            self._write_meta(url, {"url": url, "blob": digest, "size": len(data), "etag": etag, "last_modified": last_modified, "stored_at": time.time()})
+            self.stats["stored"] += 1
+            if prev is not None and prev.get("blob") and prev["blob"] != digest: self._drop_blob(prev["blob"])
+            if self._total > self.max_bytes: self._evict(keep=self._meta_path(url))
+
+    def _drop_blob(self, digest: str) -> None:
+        blob = self._blob_path(digest)
+        try: size = blob.stat().st_size; blob.unlink()
+        except OSError: return
+        self._total -= size
+
+    def _evict(self, keep: Optional[Path] = None) -> None:
+        """
+        先删除没有任何元数据引用的正文（并按磁盘重新统计总大小，其它进程共享目录时 _total 会偏离），
+        再按元数据的访问时间从旧到新删除，直到降到 max_bytes 的 90%；keep（刚写入的条目）不删。
+        """
+        metas = []
+        for p in self.meta_dir.glob("*.json"):
+            try: metas.append((p.stat().st_mtime, p, json.loads(p.read_text(encoding="utf-8"))["blob"]))
+            except (OSError, ValueError, KeyError): continue
+        metas.sort(key=lambda m: m[0])
+        refs: Dict[str, int] = {}
+        for _, _, digest in metas: refs[digest] = refs.get(digest, 0) + 1
+        total = 0
+        for blob in self.blob_dir.glob("*/*"):
+            if blob.suffix == ".tmp": continue
+            try:
+                if blob.name in refs: total += blob.stat().st_size
+                else: blob.unlink()
+            except OSError: continue
+        self._total = total
+        target = int(self.max_bytes * 0.9)
+        for _, path, digest in metas:
+            if self._total <= target: break
+            if path == keep: continue
+            path.unlink(missing_ok=True); self.stats["evicted"] += 1
+            refs[digest] -= 1
+            if refs[digest] == 0: self._drop_blob(digest)
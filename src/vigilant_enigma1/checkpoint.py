@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import csv
+import json
+import os
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from .sinks import infer_format, read_rows
+
+__all__ = ["Checkpoint", "CheckpointSink", "compact_output", "row_failed"]
+
+
+def row_failed(row: Dict[str, Any]) -> bool:
+    # 用户行与 URL 行都以显式的 error 列标记失败；description 等字段可以是任意文本（包括以 "ERROR:" 开头）
+    return bool(row.get("error"))
+
+
+class Checkpoint:
+    """
+    已完成工作的索引：追加写的日志文件，每行 "ok\\t<key>" 或 "err\\t<key>"，
+    启动时读入内存集合，之后每条判断 O(1)。同一 key 以最后一条记录为准。
+    retry_errors=True 时，上次失败的 key 会被重新抓取。
+    """
+
+    def __init__(self, path: str, retry_errors: bool = False):
+        self.path = path
+        self.retry_errors = retry_errors
+        self.done: Set[str] = set()
+        self.failed: Set[str] = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    status, _, key = line.rstrip("\n").partition("\t")
+                    if key: self._record(key, status == "ok")
+        self._f = open(path, "a", encoding="utf-8")
+
+    def _record(self, key: str, ok: bool) -> None:
+        if ok: self.done.add(key); self.failed.discard(key)
+        else: self.failed.add(key); self.done.discard(key)
+
+    def seed_from_output(self, path: str, key_field: str, failed: Callable[[Dict[str, Any]], bool] = row_failed, fmt: Optional[str] = None) -> int:
+        """日志缺失但输出文件已存在时（例如旧版本产生的输出），用输出内容初始化索引。fmt 为空时按扩展名推断。"""
+        if self.done or self.failed or not os.path.exists(path) or os.path.getsize(path) == 0: return 0
+        n = 0
+        for row in read_rows(path, fmt):
+            key = row.get(key_field)
+            if key: self.mark(str(key), not failed(row)); n += 1
+        return n
+
+    def should_skip(self, key: str) -> bool:
+        return key in self.done or (key in self.failed and not self.retry_errors)
+
+    def filter(self, keys: Iterable[str]) -> Iterator[str]:
+        """惰性去重并跳过已完成的 key。"""
+        seen: Set[str] = set()
+        for k in keys:
+            if k in seen or self.should_skip(k): continue
+            seen.add(k)
+            yield k
+
+    def mark(self, key: str, ok: bool) -> None:
+        self._record(key, ok)
+        self._f.write(f"{'ok' if ok else 'err'}\t{key}\n"); self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "Checkpoint":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CheckpointSink:
+    """
+    包装输出 sink：行落盘（sink.flushed 推进）之后才记入 checkpoint，保证索引不会领先于输出文件。
+    sink 按批 flush 时，尚未落盘的行在 flush() 或退出 with 时补记。
+    """
+
+    def __init__(self, sink: Any, checkpoint: Checkpoint, key_field: str, failed: Callable[[Dict[str, Any]], bool]):
+        self.sink, self.checkpoint, self.key_field, self.failed = sink, checkpoint, key_field, failed
+        self._unmarked: Deque[Tuple[str, bool]] = deque()
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self.write_many([row])
+
+    def write_many(self, rows: Iterable[Dict[str, Any]]) -> None:
+        rows = list(rows)
+        self.sink.write_many(rows)
+        self._unmarked.extend((str(r.get(self.key_field, "")), not self.failed(r)) for r in rows)
+        self._sync()
+
+    def _sync(self) -> None:
+        for _ in range(len(self._unmarked) - (self.sink.count - self.sink.flushed)):
+            self.checkpoint.mark(*self._unmarked.popleft())
+
+    def flush(self) -> None:
+        self.sink.flush(); self._sync()
+
+    def __enter__(self) -> "CheckpointSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.flush()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.sink, name)
+
+
+def compact_output(path: str, key_field: str, fieldnames: Optional[list] = None, fmt: Optional[str] = None) -> int:
+    """
+    重试失败行后，同一 key 可能在输出中出现多次：保留每个 key 的最后一行（按首次出现的位置），
+    通过临时文件原子替换。fmt 为空时按扩展名推断（须与写出时的 --format 一致）。返回去掉的行数。
+    """
+    if not os.path.exists(path): return 0
+    latest: Dict[str, Dict[str, Any]] = {}; total = 0
+    for row in read_rows(path, fmt):
+        latest[str(row.get(key_field, ""))] = row; total += 1
+    removed = total - len(latest)
+    if removed == 0: return 0
+    tmp = path + ".tmp"
+    if infer_format(path, fmt) == "jsonl":
+        with open(tmp, "w", encoding="utf-8") as f:
+            for row in latest.values(): f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    else:
+        fields = fieldnames or list(next(iter(latest.values())).keys())
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore"); w.writeheader(); w.writerows(latest.values())
+    os.replace(tmp, path)
+    return removed
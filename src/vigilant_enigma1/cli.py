@@ -2,38 +2,181 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import multiprocessing
 import os
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import Any, Iterator, List, Optional, Tuple
 
 from dotenv import load_dotenv
-from .scraper import scrape_urls, write_csv
+from .archive import HtmlArchive
+from .cache import ResponseCache
+from .checkpoint import Checkpoint, CheckpointSink, compact_output, row_failed
+from .concurrency import AdaptiveConcurrency
+from .config import Config
+from .metrics import NULL_METRICS, Metrics, profiled
+from .parse_pool import ParsePool
+from .scraper import scrape_urls, scrape_urls_stream
+from .shard import RemoteRateLimiter, TokenServer, shard_of, shard_path
+from .sinks import FORMATS, URL_FIELDS, infer_format, merge_outputs, open_sink
 from .logger import init_logger
 
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(prog="scrape", description="Minimal async scraper")
     p.add_argument("--url", help="单个 URL")
     p.add_argument("--infile", help="包含 URL 列表的文本文件，每行一个")
-    p.add_argument("--out", default="output.csv", help="输出 CSV 路径，默认 output.csv")
+    p.add_argument("--out", default="output.csv", help="输出路径（.csv/.jsonl/.parquet），默认 output.csv")
     p.add_argument("--browser", action="store_true", help="使用 Playwright（需要安装 extras 'browser'）")
-    p.add_argument("--concurrency", type=int, default=int(os.getenv("CONCURRENCY", "5")), help="并发数")
+    p.add_argument("--concurrency", type=int, default=int(os.getenv("CONCURRENCY", "5")), help="并发数（--adaptive 时为初始值）")
+    p.add_argument("--adaptive", action="store_true", default=os.getenv("ADAPTIVE_CONCURRENCY", "").lower() in ("1", "true", "yes", "on"), help="自适应并发（AIMD）：延迟平稳且无错误时逐步加并发，p95 上升、超时、5xx 或 429/503 时成倍回退")
+    p.add_argument("--min-concurrency", type=int, default=int(os.getenv("MIN_CONCURRENCY", "1")), help="--adaptive 的并发下限")
+    p.add_argument("--max-concurrency", type=int, default=int(os.getenv("MAX_CONCURRENCY", "32")), help="--adaptive 的并发上限（同时受 RATE_LIMIT_QPS 约束）")
+    p.add_argument("--parse-pool", choices=["process", "thread"], default=os.getenv("PARSE_POOL") or None, help="在进程/线程池中解析 HTML（默认在事件循环内）")
+    p.add_argument("--parse-workers", type=int, default=None, help="解析池大小（默认按 CPU 核数）")
+    p.add_argument("--head-only", action="store_true", default=os.getenv("HEAD_ONLY", "").lower() in ("1", "true", "yes", "on"), help="只下载到 </head>（流式读取，拿到 title/description 即断开），仅 httpx 模式")
+    p.add_argument("--stream", action="store_true", help="流式模式：惰性读取输入、有界在途任务、结果完成即写出")
+    p.add_argument("--shards", type=int, default=int(os.getenv("SHARDS", "0") or 0), help="分片进程数（>1 时隐含 --stream）：输入按 URL 哈希分到 N 个进程，各自以 --concurrency 并发抓取与解析，共享同一个全局 QPS 预算，结束后合并输出；--metrics 按分片分别写出 <metrics>.shardN，不支持 --profile")
+    p.add_argument("--format", choices=FORMATS, default=None, help="输出格式（默认按 --out 扩展名推断）；parquet 需要 pyarrow")
+    p.add_argument("--flush-rows", type=int, default=None, help="每攒够 N 行落盘一次（默认 csv/jsonl 逐行，parquet 每 10000 行一个 row group）")
+    p.add_argument("--flush-seconds", type=float, default=0.0, help="距上次落盘超过该秒数时在下一次写入时落盘（0 表示不按时间）")
+    p.add_argument("--resume", action="store_true", help="断点续跑（隐含 --stream）：跳过已完成与重复的 URL，进度记录在 <out>.done")
+    p.add_argument("--retry-errors", action="store_true", help="配合 --resume：重新抓取上次失败的 URL")
+    p.add_argument("--checkpoint", default=None, help="进度索引文件路径（默认 <out>.done）")
+    p.add_argument("--cache-dir", default=os.getenv("CACHE_DIR") or None, help="磁盘响应缓存目录（仅 httpx 模式）")
+    p.add_argument("--cache-ttl", type=float, default=float(os.getenv("CACHE_TTL", "86400")), help="缓存新鲜期（秒），过期后条件请求重新验证")
+    p.add_argument("--cache-max-mb", type=float, default=float(os.getenv("CACHE_MAX_MB", "1024")), help="缓存大小上限（MB），超出按 LRU 淘汰")
+    p.add_argument("--offline", action="store_true", default=Config.for_urls().offline, help="只读缓存、不联网（或 OFFLINE=1）；未命中的 URL 记为错误，需配合 --cache-dir，不支持 --browser")
+    p.add_argument("--archive", default=os.getenv("ARCHIVE_DIR") or None, help="把抓到的原始 HTML 写入该归档目录（之后可用 reparse 离线重新解析）")
+    p.add_argument("--metrics", default=os.getenv("METRICS_FILE") or None, help="指标输出文件：.prom/.txt 为 Prometheus 文本格式，其余为 JSON（默认关闭；--shards 时每个分片一个 <metrics>.shardN，不合并）")
+    p.add_argument("--metrics-interval", type=float, default=float(os.getenv("METRICS_INTERVAL", "30")), help="指标定时写出间隔（秒），0 表示只在结束时写出")
+    p.add_argument("--profile", default=None, help="用 cProfile 剖析整个运行并写出到该路径（.prof）")
     return p.parse_args()
 
+def iter_urls(args: argparse.Namespace) -> Iterator[str]:
+    """惰性产出 URL：--url 在前，随后逐行读取 --infile。"""
+    if args.url:
+        yield args.url
+    if args.infile:
+        with open(args.infile, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+
+@contextmanager
+def _resources(args: argparse.Namespace, metrics_path: Optional[str]) -> Iterator[Tuple[Optional[ParsePool], Optional[ResponseCache], Optional[HtmlArchive], Metrics]]:
+    """按参数创建解析池、响应缓存、归档与指标，退出时依次关闭。"""
+    logger = init_logger()
+    parse_pool = ParsePool(args.parse_pool, workers=args.parse_workers) if args.parse_pool else None
+    cache = None
+    if args.cache_dir and not args.browser:
+        cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl, max_bytes=int(args.cache_max_mb * 1024 * 1024), offline=args.offline)
+    archive = HtmlArchive(args.archive) if args.archive else None
+    metrics = Metrics(metrics_path, interval=args.metrics_interval).start() if metrics_path else NULL_METRICS
+    try:
+        yield parse_pool, cache, archive, metrics
+    finally:
+        if parse_pool is not None:
+            parse_pool.close()
+        if archive is not None:
+            archive.close()
+        metrics.stop()
+        if metrics.enabled:
+            logger.info("阶段耗时：%s", metrics.summary())
+
+def _controller(args: argparse.Namespace, metrics: Metrics, shards: int = 1) -> Optional[AdaptiveConcurrency]:
+    """--adaptive 时按参数创建 AIMD 控制器；分片时每个进程按全局 QPS 的 1/shards 估算并发上限。"""
+    if not args.adaptive: return None
+    return AdaptiveConcurrency(args.concurrency, min_limit=args.min_concurrency, max_limit=args.max_concurrency, qps=Config.for_urls().qps / shards, metrics=metrics)
+
 def main() -> None:
     load_dotenv()
     logger = init_logger()
     args = parse_args()
 
-    urls: List[str] = []
-    if args.url:
-        urls.append(args.url)
-    if args.infile:
-        with open(args.infile, "r", encoding="utf-8") as f:
-            urls.extend([line.strip() for line in f if line.strip()])
+    if not args.url and not args.infile:
+        logger.warning("未提供 URL。使用 --url 或 --infile。")
+        return
+    resume = args.resume or args.retry_errors
+    if resume and infer_format(args.out, args.format) == "parquet":
+        logger.warning("断点续跑需要可追加的输出格式（csv/jsonl），parquet 不支持 --resume")
+        return
+    if resume and args.shards > 1:
+        logger.warning("--shards 暂不支持断点续跑（--resume/--retry-errors）")
+        return
+    if args.head_only and args.browser:
+        logger.warning("--head-only 只对 httpx 模式生效，--browser 下将抓取完整页面")
+    elif args.head_only and args.archive:
+        logger.warning("--head-only 只读到 </head>，截断的页面不会写入 --archive")
+    if args.offline and (args.browser or not args.cache_dir):
+        # --browser 不经过响应缓存，放行的话会直接联网抓取
+        logger.warning("--offline 需要配合 --cache-dir（或 CACHE_DIR），且只对 httpx 模式生效，不能与 --browser 同用")
+        return
+    if args.shards > 1 and args.profile:
+        logger.warning("--profile 只能剖析当前进程，--shards 下主进程只做调度，请去掉 --shards 单独剖析")
+        return
+    if args.shards > 1:
+        _run_sharded(args)
+        return
+    with _resources(args, args.metrics) as (parse_pool, cache, archive, metrics), profiled(args.profile):
+        _run(args, parse_pool, cache, archive, metrics, resume)
 
+def _run_sharded(args: argparse.Namespace) -> None:
+    """
+    主进程：启动本机令牌服务（限速时），把输入按 URL 哈希分给 args.shards 个进程，
+    各分片写 <out>.shardN，全部完成后按分片顺序合并到 --out 并删除分片文件。
+    """
+    logger = init_logger()
+    cfg = Config.for_urls()
+    server = TokenServer(cfg.qps, burst=cfg.burst, per_host_qps=cfg.per_host_qps) if cfg.qps > 0 or cfg.per_host_qps > 0 else None
+    token = (server.address, server.authkey) if server is not None else None
+    paths = [shard_path(args.out, i) for i in range(args.shards)]
+    logger.info("分片抓取：%d 个进程，全局 QPS 上限 %s -> %s", args.shards, cfg.qps or "不限", args.out)
+    # spawn：主进程中有令牌服务线程，fork 出的子进程会继承其锁状态
+    with server or nullcontext(), ProcessPoolExecutor(max_workers=args.shards, mp_context=multiprocessing.get_context("spawn")) as executor:
+        counts = [f.result() for f in [executor.submit(_run_shard, args, i, token) for i in range(args.shards)]]
+    merge_outputs(paths, args.out, URL_FIELDS, fmt=args.format, flush_rows=args.flush_rows)
+    for path in paths:
+        os.remove(path)
+    logger.info("完成，%d 个分片共写出 %d 行到 %s（各分片 %s）", args.shards, sum(counts), args.out, counts)
+    if args.metrics:
+        logger.info("各分片指标分别写在 %s", ", ".join(shard_path(args.metrics, i) for i in range(args.shards)))
+
+def _run_shard(args: argparse.Namespace, index: int, token: Optional[Tuple[Any, bytes]]) -> int:
+    """分片进程：只处理 shard_of(url) == index 的输入，写到自己的分片文件；限速令牌向主进程申请。"""
+    load_dotenv()
+    limiter = RemoteRateLimiter(*token) if token is not None else None
+    urls = (u for u in iter_urls(args) if shard_of(u, args.shards) == index)
+    metrics_path = shard_path(args.metrics, index) if args.metrics else None
+    try:
+        with _resources(args, metrics_path) as (parse_pool, cache, archive, metrics), open_sink(shard_path(args.out, index), URL_FIELDS, fmt=args.format, flush_rows=args.flush_rows, flush_seconds=args.flush_seconds) as sink:
+            return asyncio.run(scrape_urls_stream(urls, sink, use_browser=args.browser, concurrency=args.concurrency, parse_pool=parse_pool, cache=cache, archive=archive, metrics=metrics, limiter=limiter, controller=_controller(args, metrics, args.shards), head_only=args.head_only))
+    finally:
+        if limiter is not None:
+            limiter.close()
+
+def _run(args: argparse.Namespace, parse_pool: Optional[ParsePool], cache: Optional[ResponseCache], archive: Optional[HtmlArchive], metrics: Metrics, resume: bool) -> None:
+    logger = init_logger()
+    if args.stream or resume:
+        logger.info("开始流式抓取 -> %s", args.out)
+        urls = iter_urls(args)
+        with open_sink(args.out, URL_FIELDS, fmt=args.format, append=resume, flush_rows=args.flush_rows, flush_seconds=args.flush_seconds) as sink:
+            if resume:
+                with Checkpoint(args.checkpoint or args.out + ".done", retry_errors=args.retry_errors) as checkpoint:
+                    checkpoint.seed_from_output(args.out, "url", row_failed, fmt=args.format)
+                    with CheckpointSink(sink, checkpoint, "url", row_failed) as tracked:
+                        n = asyncio.run(scrape_urls_stream(checkpoint.filter(urls), tracked, use_browser=args.browser, concurrency=args.concurrency, parse_pool=parse_pool, cache=cache, archive=archive, metrics=metrics, controller=_controller(args, metrics), head_only=args.head_only))
+            else:
+                n = asyncio.run(scrape_urls_stream(urls, sink, use_browser=args.browser, concurrency=args.concurrency, parse_pool=parse_pool, cache=cache, archive=archive, metrics=metrics, controller=_controller(args, metrics), head_only=args.head_only))
+        if args.retry_errors:
+            compact_output(args.out, "url", URL_FIELDS, fmt=args.format)
+        logger.info("完成，共写出 %d 行到 %s", n, args.out)
+        return
+    urls: List[str] = list(iter_urls(args))
     if not urls:
         logger.warning("未提供 URL。使用 --url 或 --infile。")
         return
     logger.info("开始抓取，共 %d 个 URL", len(urls))
-    results = asyncio.run(scrape_urls(urls, use_browser=args.browser, concurrency=args.concurrency))
-    write_csv(results, args.out)
+    results = asyncio.run(scrape_urls(urls, use_browser=args.browser, concurrency=args.concurrency, parse_pool=parse_pool, cache=cache, archive=archive, metrics=metrics, controller=_controller(args, metrics), head_only=args.head_only))
+    with metrics.timer("write"), open_sink(args.out, URL_FIELDS, fmt=args.format, flush_rows=args.flush_rows, flush_seconds=args.flush_seconds) as sink:
+        sink.write_many(results)
     logger.info("完成，已写出 %s", args.out)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import math
+import time
+from collections import deque
+from typing import Any, Deque, List, Mapping, Optional
+
+from .logger import init_logger
+from .metrics import NULL_METRICS, Metrics
+
+__all__ = ["AdaptiveConcurrency"]
+
+# 请求开始时间（限速等待结束后），按 asyncio 任务隔离，供 observe 计算响应延迟
+_started: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("adaptive_started", default=None)
+
+
+def _is_timeout(e: BaseException) -> bool:
+    """httpx.TimeoutException / Playwright TimeoutError / asyncio.TimeoutError 等，沿异常链查找，不依赖具体库。"""
+    seen = 0
+    while e is not None and seen < 5:
+        if isinstance(e, TimeoutError) or "Timeout" in type(e).__name__: return True
+        e = e.__cause__ or e.__context__; seen += 1  # type: ignore[assignment]
+    return False
+
+
+class _FeedbackLimiter:
+    """包装限速器：wait 结束时记下开始时间，observe 时把延迟与状态码交给控制器，其余行为不变。"""
+
+    def __init__(self, limiter: Any, controller: "AdaptiveConcurrency"):
+        self._limiter = limiter; self._controller = controller
+
+    async def wait(self, key: Optional[str] = None) -> None:
+        if self._limiter is not None: await self._limiter.wait(key)
+        _started.set(time.monotonic())
+
+    def observe(self, key: Optional[str], status: int, headers: Optional[Mapping[str, str]] = None) -> Optional[float]:
+        started = _started.get()
+        self._controller.on_response(time.monotonic() - started if started is not None else None, status, headers)
+        return self._limiter.observe(key, status, headers) if self._limiter is not None else None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._limiter, name)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD 自适应并发（可替代 asyncio.Semaphore 使用：async with controller）。
+    每完成约 limit 个请求（至少 min_samples 个）评估一次：
+    - 出现超时、5xx 或过载信号（429、503 或带 Retry-After 的响应），或 p95 延迟超过基线（最近若干轮 p95 的最小值）
+      的 tolerance 倍 → limit 乘以 backoff（不低于 min_limit）
+    - 否则若其它错误比例不超过 error_threshold → limit 加 1（不超过 max_limit；有 QPS 上限时
+      也不超过 qps × p50 延迟 × 2 + 1，再多的并发只会在限速器前排队）
+    每次调整记一条日志并累计 concurrency_changes_total{direction=up/down}。
+    反馈都来自持有名额的请求，调高后紧随其后的 release 会唤醒等待者。
+    """
+
+    def __init__(self, initial: int, min_limit: int = 1, max_limit: int = 64, qps: float = 0.0, tolerance: float = 2.0,
+                 backoff: float = 0.5, error_threshold: float = 0.1, min_samples: int = 10, baseline_rounds: int = 10, metrics: Metrics = NULL_METRICS):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial))
+        self.qps = qps; self.tolerance = tolerance; self.backoff = backoff
+        self.error_threshold = error_threshold; self.min_samples = min_samples
+        self.metrics = metrics
+        self.logger = init_logger("igscraper")
+        self.in_flight = 0
+        self._cond: Optional[asyncio.Condition] = None
+        self._latencies: List[float] = []
+        self._errors = 0; self._congestion = {"timeout": 0, "5xx": 0, "overload": 0}
+        self._baselines: Deque[float] = deque(maxlen=baseline_rounds)
+        self.history: List[int] = [self.limit]
+
+    # ---- 信号量接口 ----
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None: self._cond = asyncio.Condition()  # 在事件循环内创建
+        return self._cond
+
+    async def acquire(self) -> None:
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        cond = self._condition()
+        async with cond:
+            self.in_flight -= 1
+            cond.notify_all()
+
+    async def __aenter__(self) -> "AdaptiveConcurrency":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.release()
+
+    def wrap(self, limiter: Any) -> _FeedbackLimiter:
+        """包装传给抓取后端的限速器，使每个响应的延迟与状态码反馈到控制器。"""
+        return _FeedbackLimiter(limiter, self)
+
+    # ---- 反馈 ----
+    def on_response(self, latency: Optional[float], status: int, headers: Optional[Mapping[str, str]] = None) -> None:
+        if latency is not None: self._latencies.append(latency)
+        if status == 429 or status == 503 or (headers or {}).get("retry-after") is not None: self._congestion["overload"] += 1
+        elif status >= 500: self._congestion["5xx"] += 1
+        elif status >= 400: self._errors += 1
+        self._maybe_adjust()
+
+    def on_error(self, e: BaseException) -> None:
+        """请求最终失败（重试耗尽）时调用；超时视为拥塞，其它错误只计入错误比例。"""
+        if _is_timeout(e): self._congestion["timeout"] += 1
+        else: self._errors += 1
+        self._maybe_adjust()
+
+    def _quantile(self, q: float) -> float:
+        s = sorted(self._latencies)
+        return s[min(len(s) - 1, int(round(q * (len(s) - 1))))]
+
+    def _maybe_adjust(self) -> None:
+        n = len(self._latencies) + self._errors + self._congestion["timeout"]
+        if n < max(self.min_samples, self.limit): return
+        p95 = self._quantile(0.95) if self._latencies else 0.0
+        p50 = self._quantile(0.5) if self._latencies else 0.0
+        baseline = min(self._baselines) if self._baselines else p95
+        signals = {k: v for k, v in self._congestion.items() if v}
+        old = self.limit
+        if signals or (self._baselines and p95 > baseline * self.tolerance):
+            self.limit = max(self.min_limit, int(self.limit * self.backoff))
+            reason = ", ".join(f"{k}={v}" for k, v in signals.items()) or f"p95 {p95 * 1000:.0f}ms > 基线 {baseline * 1000:.0f}ms × {self.tolerance:g}"
+        else:
+            if self._latencies: self._baselines.append(p95)
+            cap = self.max_limit
+            if self.qps > 0 and p50 > 0: cap = min(cap, max(self.min_limit, math.ceil(self.qps * p50 * 2) + 1))
+            if self._errors / n <= self.error_threshold and self.limit < cap: self.limit += 1
+            elif self.limit > cap: self.limit = cap
+            reason = f"p95 {p95 * 1000:.0f}ms，错误 {self._errors}/{n}"
+        self._latencies = []; self._errors = 0; self._congestion = {"timeout": 0, "5xx": 0, "overload": 0}
+        if self.limit != old:
+            self.history.append(self.limit)
+            self.metrics.inc("concurrency_changes_total", direction="up" if self.limit > old else "down")
+            self.logger.info("自适应并发：%d -> %d（%s）", old, self.limit, reason)
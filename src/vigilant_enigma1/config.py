@@ -1,16 +1,65 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any, Callable
 from dotenv import load_dotenv
 
 load_dotenv()
 
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+# 浏览器默认拦截的统计/广告请求（URL 片段）
+DEFAULT_BLOCK_URLS = "google-analytics.com,googletagmanager.com,doubleclick.net,connect.facebook.net,/logging_client_events,/ajax/bz"
+# 主页 HTML 中出现任一即可解析（ld+json 或 og:description），不必等 networkidle
+DEFAULT_WAIT_SELECTOR = 'script[type="application/ld+json"], meta[property="og:description"]'
+
+
+def _env(name: str, default: str, cast: Callable[[str], Any] = str, allow_empty: bool = False) -> Any:
+    # 默认值在创建 Config 时才读取环境变量：导入之后修改的配置（load_dotenv、测试、子进程）同样生效
+    # allow_empty=True 时显式设为空即表示关闭（如 BLOCK_RESOURCES=）
+    if allow_empty: return field(default_factory=lambda: cast(os.getenv(name, default)))
+    return field(default_factory=lambda: cast(os.getenv(name, default) or default))
+
+
+def _flag(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes", "on")
+
+
 @dataclass
 class Config:
-    ig_user: str = os.getenv("IG_USERNAME", "")
-    ig_pass: str = os.getenv("IG_PASSWORD", "")
-    proxy: str | None = os.getenv("PROXY_URL") or None
-    headless: bool = os.getenv("HEADLESS", "true").lower() == "true"
-    qps: float = float(os.getenv("RATE_LIMIT_QPS", "0.3"))
-    retry_attempts: int = int(os.getenv("RETRY_ATTEMPTS", "3"))
-    retry_backoff: float = float(os.getenv("RETRY_BACKOFF", "2"))
-    timeout: float = float(os.getenv("TIMEOUT_SECONDS", "30"))
+    ig_user: str = _env("IG_USERNAME", "")
+    ig_pass: str = _env("IG_PASSWORD", "")
+    proxy: str | None = field(default_factory=lambda: os.getenv("PROXY_URL") or None)
+    headless: bool = _env("HEADLESS", "true", _flag)
+    user_agent: str = _env("USER_AGENT", DEFAULT_USER_AGENT)
+    qps: float = _env("RATE_LIMIT_QPS", "0.3", float)
+    burst: int = _env("RATE_LIMIT_BURST", "1", int)
+    per_host_qps: float = _env("RATE_LIMIT_PER_HOST_QPS", "0", float)
+    retry_attempts: int = _env("RETRY_ATTEMPTS", "3", int)
+    retry_backoff: float = _env("RETRY_BACKOFF", "2", float)
+    timeout: float = _env("TIMEOUT_SECONDS", "30", float)
+    concurrency: int = _env("CONCURRENCY", "5", int)
+    # httpx 磁盘响应缓存（CACHE_DIR 为空则不启用）
+    cache_dir: str = _env("CACHE_DIR", "")
+    cache_ttl: float = _env("CACHE_TTL", "86400", float)
+    cache_max_mb: float = _env("CACHE_MAX_MB", "1024", float)
+    offline: bool = _env("OFFLINE", "false", _flag)
+    # 原始 HTML 归档目录（ARCHIVE_DIR 为空则不归档），供 reparse 离线重新解析
+    archive_dir: str = _env("ARCHIVE_DIR", "")
+    # 常驻浏览器 page 池
+    page_pool_size: int = _env("PAGE_POOL_SIZE", "2", int)
+    page_max_uses: int = _env("PAGE_MAX_USES", "50", int)
+    context_max_uses: int = _env("CONTEXT_MAX_USES", "500", int)
+    # Playwright 请求拦截：资源类型与 URL 片段（逗号分隔，片段可含 * 通配），留空不拦截
+    block_resources: str = _env("BLOCK_RESOURCES", "image,media,font", allow_empty=True)
+    block_urls: str = _env("BLOCK_URLS", DEFAULT_BLOCK_URLS, allow_empty=True)
+    # 页面出现该选择器即取 HTML 返回；留空则等待 networkidle
+    wait_selector: str = _env("WAIT_SELECTOR", DEFAULT_WAIT_SELECTOR, allow_empty=True)
+
+    @classmethod
+    def for_urls(cls, **overrides: Any) -> "Config":
+        """
+        通用 URL 抓取（scrape 命令）的配置：未设置 RATE_LIMIT_QPS 时不限速，超时默认 15 秒（也接受 TIMEOUT）；
+        页面只需 <head>，默认不等待选择器（DOMContentLoaded 即返回）。
+        """
+        kwargs: dict = {"qps": float(os.getenv("RATE_LIMIT_QPS", "0") or 0), "timeout": float(os.getenv("TIMEOUT_SECONDS", os.getenv("TIMEOUT", "15")) or 15), "wait_selector": os.getenv("WAIT_SELECTOR", "")}
+        kwargs.update(overrides)
+        return cls(**kwargs)
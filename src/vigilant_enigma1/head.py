@@ -0,0 +1,66 @@
+"""
+只取 <head> 的元数据解析：parse_html 只需要 <title> 与 description / og:description，
+它们都在 <head> 内。HeadParser 基于标准库 html.parser，可以边下载边喂入文本，
+看到 </head>（或 <body>）、或所需标签都已拿到时即可停止读取。
+"""
+from __future__ import annotations
+
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+__all__ = ["HeadParser", "parse_head"]
+
+
+class HeadParser(HTMLParser):
+    """
+    增量解析 <head>：feed() 可多次调用，done 为 True 后后续文本不再需要。
+    取值规则与 parse_html 一致：第一个 <title> 的文本；description 优先取 meta name=description，没有时取 og:description。
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.title: Optional[str] = None
+        self.description: Optional[str] = None
+        self.og_description: Optional[str] = None
+        self.done = False
+        self._in_title = False
+        self._title_parts: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == "title" and self.title is None:
+            self._in_title = True; self._title_parts = []
+        elif tag == "meta":
+            # 与 soup.find 一致：取第一个匹配的 meta，即使其 content 为空
+            a = dict(attrs); content = (a.get("content") or "").strip()
+            if a.get("name") == "description" and self.description is None: self.description = content
+            elif a.get("property") == "og:description" and self.og_description is None: self.og_description = content
+            if self.description is not None and self.title is not None: self.done = True
+        elif tag == "body":
+            self.done = True
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.handle_starttag(tag, attrs)
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title: self._title_parts.append(data)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "title" and self._in_title:
+            self._in_title = False; self.title = "".join(self._title_parts).strip()
+            if self.description is not None: self.done = True
+        elif tag == "head":
+            self.done = True
+
+    def result(self, url: str) -> Dict[str, Any]:
+        if self._in_title: self.title = "".join(self._title_parts).strip()  # 前缀在 <title> 中间截断
+        return {"url": url, "title": self.title or "", "description": self.description if self.description is not None else (self.og_description or "")}
+
+
+def parse_head(html: str, url: str) -> Dict[str, Any]:
+    """parse_html 的轻量版本：只解析到 <head> 结束，输出字段相同；用于 head-only 抓取得到的前缀。"""
+    parser = HeadParser()
+    pos, step = 0, 8192
+    while pos < len(html) and not parser.done:
+        parser.feed(html[pos:pos + step]); pos += step
+    parser.close()
+    return parser.result(url)
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import cProfile
+import json
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+__all__ = ["Histogram", "Metrics", "NullMetrics", "NULL_METRICS", "profiled"]
+
+# httpcore trace 事件 → 阶段名（DNS 解析包含在 connect 中）
+_TRACE_STAGES = {
+    "connect_tcp": "connect",
+    "connect_unix_socket": "connect",
+    "start_tls": "tls",
+    "receive_response_headers": "ttfb",
+    "receive_response_body": "body",
+}
+
+
+def _nearest_rank(s: List[float], q: float) -> float:
+    return s[min(len(s) - 1, max(0, math.ceil(q * len(s)) - 1))] if s else 0.0
+
+
+class Histogram:
+    """
+    耗时分布：count/sum/min/max 精确累计；分位数来自最多 max_samples 个样本的蓄水池抽样，
+    内存占用有上限，长时间运行也不会增长。
+    """
+
+    def __init__(self, max_samples: int = 10000, seed: int = 0):
+        self.count = 0; self.sum = 0.0
+        self.min = math.inf; self.max = 0.0
+        self._samples: List[float] = []; self._max_samples = max_samples
+        self._rnd = random.Random(seed)
+
+    def observe(self, value: float) -> None:
+        self.count += 1; self.sum += value
+        if value < self.min: self.min = value
+        if value > self.max: self.max = value
+        if len(self._samples) < self._max_samples: self._samples.append(value)
+        else:
+            j = self._rnd.randrange(self.count)
+            if j < self._max_samples: self._samples[j] = value
+
+    def quantile(self, q: float) -> float:
+        return _nearest_rank(sorted(self._samples), q)
+
+    def snapshot(self) -> Dict[str, float]:
+        s = sorted(self._samples)
+        return {
+            "count": self.count, "sum": self.sum,
+            "min": self.min if self.count else 0.0, "max": self.max,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": _nearest_rank(s, 0.50), "p95": _nearest_rank(s, 0.95), "p99": _nearest_rank(s, 0.99),
+        }
+
+
+def _label_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _prom_labels(pairs: Tuple[Tuple[str, str], ...]) -> str:
+    if not pairs: return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    """
+    抓取过程的指标：
+    - 各阶段耗时直方图（queue/ratelimit/fetch/connect/tls/ttfb/body/parse/write），输出 p50/p95/p99
+    - 计数器：状态码、重试、缓存命中、错误、下载字节数、写出行数
+    - path 非空时由后台线程每 interval 秒写出一次（.prom/.txt 为 Prometheus 文本格式，其余为 JSON），
+      stop() 时再写一次最终结果
+    不需要指标时使用 NULL_METRICS：所有方法为空操作，开销可忽略。
+    """
+
+    enabled = True
+
+    def __init__(self, path: Optional[str] = None, interval: float = 30.0, fmt: Optional[str] = None):
+        self.path = path
+        self.interval = interval
+        self.fmt = fmt or ("prometheus" if path and path.endswith((".prom", ".txt")) else "json")
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self._hist: Dict[str, Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- 记录 ----
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            h = self._hist.get(stage)
+            if h is None: h = self._hist[stage] = Histogram()
+            h.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        t = time.perf_counter()
+        try: yield
+        finally: self.observe(stage, time.perf_counter() - t)
+
+    def inc(self, name: str, n: float = 1, **labels: Any) -> None:
+        key = (name, _label_key(labels))
+        with self._lock: self._counters[key] = self._counters.get(key, 0) + n
+
+    def record_response(self, status: int, nbytes: int = 0) -> None:
+        self.inc("responses_total", status=status)
+        if nbytes: self.inc("bytes_received_total", nbytes)
+
+    def httpx_extensions(self, is_async: bool = True) -> Dict[str, Any]:
+        """为单个 httpx 请求生成 trace 扩展，拆分出 connect/tls/ttfb/body 耗时。"""
+        starts: Dict[str, float] = {}
+
+        def on_event(name: str, info: Dict[str, Any]) -> None:
+            base, _, phase = name.rpartition(".")
+            stage = _TRACE_STAGES.get(base.rpartition(".")[2])
+            if stage is None: return
+            if phase == "started": starts[base] = time.perf_counter()
+            elif phase == "complete" and base in starts: self.observe(stage, time.perf_counter() - starts.pop(base))
+
+        if not is_async: return {"trace": on_event}
+
+        async def on_event_async(name: str, info: Dict[str, Any]) -> None:
+            on_event(name, info)
+
+        return {"trace": on_event_async}
+
+    def done_callback(self, stage: str) -> Callable[[Any], None]:
+        """返回 Future 完成回调：记录从现在到 Future 完成的耗时（用于投递到解析池的任务）。"""
+        t = time.perf_counter()
+        return lambda _: self.observe(stage, time.perf_counter() - t)
+
+    # ---- 输出 ----
+    def snapshot(self) -> Dict[str, Any]:
+        uptime = time.perf_counter() - self._t0
+        with self._lock:
+            stages = {k: h.snapshot() for k, h in self._hist.items()}
+            counters: Dict[str, Any] = {}
+            for (name, labels), v in sorted(self._counters.items()):
+                if labels: counters.setdefault(name, {})[",".join(f"{k}={val}" for k, val in labels)] = v
+                else: counters[name] = v
+        for s in stages.values(): s["rate_per_s"] = s["count"] / uptime if uptime > 0 else 0.0
+        return {"started_at": self.started_at, "uptime_s": uptime, "stages": stages, "counters": counters}
+
+    def to_prometheus(self, prefix: str = "scrape") -> str:
+        lines: List[str] = []
+        with self._lock:
+            hists = {k: h.snapshot() for k, h in self._hist.items()}
+            counters = sorted(self._counters.items())
+        if hists:
+            lines.append(f"# TYPE {prefix}_stage_seconds summary")
+            for stage, s in sorted(hists.items()):
+                for q in ("0.5", "0.95", "0.99"):
+                    lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} {s["p" + str(round(float(q) * 100))]:.6f}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {s["sum"]:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+        typed = set()
+        for (name, labels), v in counters:
+            if name not in typed: lines.append(f"# TYPE {prefix}_{name} counter"); typed.add(name)
+            lines.append(f"{prefix}_{name}{_prom_labels(labels)} {v:.15g}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """一行摘要，便于在运行结束时写入日志。"""
+        snap = self.snapshot()
+        parts = [f"{k} n={s['count']} p50={s['p50'] * 1000:.1f}ms p95={s['p95'] * 1000:.1f}ms p99={s['p99'] * 1000:.1f}ms" for k, s in sorted(snap["stages"].items())]
+        return "; ".join(parts) or "无数据"
+
+    def dump(self, path: Optional[str] = None) -> None:
+        """写出当前指标；通过临时文件原子替换，读取方不会看到半截内容。"""
+        path = path or self.path
+        if not path: return
+        text = self.to_prometheus() if self.fmt == "prometheus" else json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f: f.write(text)
+        os.replace(tmp, path)
+
+    # ---- 定时写出 ----
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval): self.dump()
+
+    def start(self) -> "Metrics":
+        if self.path and self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="metrics-dump", daemon=True); self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None: self._thread.join(); self._thread = None
+        self.dump()
+
+    def __enter__(self) -> "Metrics":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class NullMetrics(Metrics):
+    """关闭状态：不加锁、不计时、不写文件。"""
+
+    enabled = False
+    _null = nullcontext()
+
+    def __init__(self):
+        super().__init__(None)
+
+    def observe(self, stage: str, seconds: float) -> None: pass
+    def timer(self, stage: str) -> Any: return self._null  # type: ignore[override]
+    def inc(self, name: str, n: float = 1, **labels: Any) -> None: pass
+    def record_response(self, status: int, nbytes: int = 0) -> None: pass
+    def httpx_extensions(self, is_async: bool = True) -> Dict[str, Any]: return {}
+    def done_callback(self, stage: str) -> Callable[[Any], None]: return lambda _: None
+    def start(self) -> "Metrics": return self
+    def stop(self) -> None: pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+@contextmanager
+def profiled(path: Optional[str]) -> Iterator[Optional[cProfile.Profile]]:
+    """path 非空时用 cProfile 包住整个运行并写出 .prof（python -m pstats 或 snakeviz 查看）。"""
+    if not path:
+        yield None; return
+    prof = cProfile.Profile(); prof.enable()
+    try: yield prof
+    finally:
+        prof.disable(); prof.dump_stats(path)
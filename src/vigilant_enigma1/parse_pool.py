@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+__all__ = ["ParsePool", "INLINE_THRESHOLD"]
+
+T = TypeVar("T")
+
+# 小于该长度（字符）的 HTML 直接在当前线程解析：投递到进程池的往返开销已不划算
+INLINE_THRESHOLD = 4096
+
+
+def _default_workers(kind: str) -> int:
+    cpus = os.cpu_count() or 1
+    # 进程池留一个核给事件循环/抓取；线程池受 GIL 限制，线程多了无益
+    return max(1, cpus - 1) if kind == "process" else min(4, cpus)
+
+
+class ParsePool:
+    """
+    把 CPU 密集的解析（parse_html / parse_profile）移出事件循环或抓取线程。
+    kind："process"（默认，真正并行）、"thread"、"inline"（不使用池）。
+    同时在途的解析任务不超过 max_pending，超出时调用方等待（背压）。
+    """
+
+    def __init__(self, kind: str = "process", workers: Optional[int] = None, max_pending: Optional[int] = None, inline_threshold: int = INLINE_THRESHOLD):
+        if kind not in ("process", "thread", "inline"): raise ValueError(f"未知的解析池类型: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers or _default_workers(kind))
+        self.max_pending = max(1, max_pending or self.workers * 2)
+        self.inline_threshold = inline_threshold
+        self._executor: Optional[Executor] = None
+        # spawn：worker 在首次提交时才启动，那时 Playwright 驱动线程与 BrowserPool 的锁可能已存在，fork 会复制它们的锁状态
+        if kind == "process": self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        elif kind == "thread": self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="parse")
+        self._sem = threading.BoundedSemaphore(self.max_pending)
+        self._asem: Optional[asyncio.Semaphore] = None
+
+    def _inline(self, html: str) -> bool:
+        return self._executor is None or len(html or "") < self.inline_threshold
+
+    def submit(self, fn: Callable[..., T], html: str, *args: Any) -> "Future[T]":
+        """同步接口：返回 Future；在途任务达到上限时阻塞。"""
+        if self._inline(html):
+            fut: Future = Future()
+            try: fut.set_result(fn(html, *args))
+            except Exception as e: fut.set_exception(e)
+            return fut
+        self._sem.acquire()
+        try: fut = self._executor.submit(fn, html, *args)  # type: ignore[union-attr]
+        except BaseException: self._sem.release(); raise
+        fut.add_done_callback(lambda _: self._sem.release())
+        return fut
+
+    async def run(self, fn: Callable[..., T], html: str, *args: Any) -> T:
+        """异步接口：在池中执行 fn(html, *args) 并等待结果。"""
+        if self._inline(html): return fn(html, *args)
+        if self._asem is None: self._asem = asyncio.Semaphore(self.max_pending)
+        async with self._asem:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, html, *args)
+
+    def close(self) -> None:
+        if self._executor is not None: self._executor.shutdown(wait=True); self._executor = None
+
+    def __enter__(self) -> "ParsePool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -5,16 +5,59 @@ from bs4 import BeautifulSoup
 EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-ZaZ0-9.-]+\.[A-Za-z]{2,}")
 PHONE_RE = re.compile(r"(?:\+?\d[\d\s\-]{7,}\d)")
 LINK_RE = re.compile(r"https?://[^\s\"')]+", re.I)
+PRONOUN_RE = re.compile(r"\b(she|her|he|him|they|them)\b")
+AGE_RE = re.compile(r"\b(1[6-9]|[2-9]\d)\b\s*(?:y/o|years?\s*old)")
+REGION_RE = re.compile(r"(USA|UK|Canada|Australia|China|India|Singapore|Hong Kong|NYC|LA|London|Beijing|Shanghai)", re.I)
 
-def extract_structured_json(html: str) -> Optional[dict]:
+# 内嵌数据块的定位前缀（只匹配到开括号为止）与旧正则对应的终止符
+_BLOB_PREFIXES = (
+    (re.compile(r"window\._sharedData\s*=\s*\{"), "};"),
+    (re.compile(r"window\.__additionalDataLoaded\([^,]+,\s*\{"), "});"),
+    (re.compile(r"\"props\":\s*\{"), "}"),
+)
+_NON_STRUCT_RE = re.compile(r'[^{}"]*')
+_STR_TAIL_RE = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+
+def find_json_end(text: str, start: int) -> int:
+    """
+    text[start] 为 '{'：线性扫描做括号配对（跳过 JSON 字符串字面量），
+    返回与之配对的 '}' 下标；未闭合返回 -1。
+    """
+    depth, i, n = 0, start, len(text)
+    while i < n:
+        i = _NON_STRUCT_RE.match(text, i).end()  # type: ignore[union-attr]
+        if i >= n: break
+        if text[i] == '"':
+            m = _STR_TAIL_RE.match(text, i + 1)
+            if not m: return -1
+            i = m.end(); continue
+        depth += 1 if text[i] == "{" else -1
+        if depth == 0: return i
+        i += 1
+    return -1
+
+def _extract_embedded_json(html: str) -> Optional[dict]:
+    for prefix, term in _BLOB_PREFIXES:
+        m = prefix.search(html)
+        if not m: continue
+        head = m.end() - 1; tail = find_json_end(html, head)
+        # 旧实现用非贪婪正则截到首个 "}"+终止符；仅当配对结果与之重合时采用，保证输出一致
+        if tail == -1 or html.find(term, head + 1) != tail: continue
+        try: data = json.loads(html[head:tail + 1])
+        except Exception: continue
+        if isinstance(data, dict): return data
+    return None
+
+def extract_structured_json(html: str, soup: Optional[BeautifulSoup] = None) -> Optional[dict]:
     """
     优先从 <script type="application/ld+json"> 提取结构化 JSON；
     次选尝试解析内嵌数据块（页面 props/sharedData 等）。
+    可传入已构建的 soup 以避免重复解析。
     """
-    soup = BeautifulSoup(html, "lxml")
+    if soup is None: soup = BeautifulSoup(html, "lxml")
     for s in soup.find_all("script", type="application/ld+json"):
         try:
-            txt = s.get_text(strip=True); 
+            txt = s.get_text(strip=True)
             if not txt: continue
             obj = json.loads(txt)
             # 兼容数组形式
@@ -23,19 +66,8 @@ def extract_structured_json(html: str) -> Optional[dict]:
                     if isinstance(it, dict) and it.get("@type") in {"Person","Organization"}: return it
             elif isinstance(obj, dict) and obj.get("@type") in {"Person","Organization"}: return obj
         except Exception: continue
-    # 简单兜底：匹配 props/sharedData 片段尝试反序列化
-    for pat in (r"window\._sharedData\s*=\s*(\{.*?\});", r"window\.__additionalDataLoaded\([^,]+,\s*(\{.*?\})\);", r"\"props\":\s*\{.*?\}"):
-        m = re.search(pat, html, re.S)
-        if not m: continue
-        try:
-            chunk = m.group(1) if m.groups() else m.group(0)
-            # 尝试修剪到最外层 {}
-            head, tail = chunk.find("{"), chunk.rfind("}")
-            if head!=-1 and tail!=-1 and head<tail: chunk = chunk[head:tail+1]
-            data = json.loads(chunk); 
-            if isinstance(data, dict): return data
-        except Exception: continue
-    return None
+    # 兜底：定位 props/sharedData 片段，括号配对后反序列化
+    return _extract_embedded_json(html)
 
 def parse_profile(html: str, profile_username: str) -> Tuple[Dict[str, Any], str]:
     """
@@ -73,15 +105,15 @@ def parse_profile(html: str, profile_username: str) -> Tuple[Dict[str, Any], str
     phone_match = PHONE_RE.search(bio or ""); phone = phone_match.group(0) if phone_match else ""
     # 性别/年龄/地区：低置信度启发式
     gender = ""
-    if re.search(r"\b(she|her|he|him|they|them)\b", (bio or "").lower()): gender="unspecified-pronouns"; warning.append("low_conf_gender")
+    if PRONOUN_RE.search((bio or "").lower()): gender="unspecified-pronouns"; warning.append("low_conf_gender")
     age = ""
-    m_age = re.search(r"\b(1[6-9]|[2-9]\d)\b\s*(?:y/o|years?\s*old)", (bio or "").lower())
+    m_age = AGE_RE.search((bio or "").lower())
     if m_age: age = m_age.group(1); warning.append("low_conf_age")
     region = ""
-    m_region = re.search(r"(USA|UK|Canada|Australia|China|India|Singapore|Hong Kong|NYC|LA|London|Beijing|Shanghai)", bio or "", re.I)
+    m_region = REGION_RE.search(bio or "")
     if m_region: region = m_region.group(1)
-    # 结构化 JSON 辅助填充
-    js = extract_structured_json(html)
+    # 结构化 JSON 辅助填充：仅在仍有缺失字段时查找，并复用同一棵 soup
+    js = extract_structured_json(html, soup) if not display_name or not links else None
     if isinstance(js, dict):
         display_name = display_name or js.get("name","") or ""
         if not links:
@@ -90,3 +122,12 @@ def parse_profile(html: str, profile_username: str) -> Tuple[Dict[str, Any], str
     warning_code = ";".join(sorted(set(warning))) if warning else ""
     row: Dict[str, Any] = {"username":username,"display_name":display_name,"bio":bio,"email":email,"phone":phone,"links":",".join(links),"gender":gender,"age":age,"region":region,"warning_code":warning_code,"error":""}
     return row, warning_code
+
+def parse_html(html: str, url: str) -> Dict[str, Any]:
+    soup = BeautifulSoup(html, "lxml")
+    title = (soup.title.string or "").strip() if soup.title and soup.title.string else ""
+    desc = ""
+    mt = soup.find("meta", attrs={"name": "description"}) or soup.find("meta", attrs={"property": "og:description"})
+    if mt and mt.get("content"):
+        desc = mt["content"].strip()
+    return {"url": url, "title": title, "description": desc}
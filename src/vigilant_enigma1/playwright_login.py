@@ -1,10 +1,11 @@
 import json
-import os
+from fnmatch import fnmatchcase
 from pathlib import Path
-from typing import Optional
-from playwright.sync_api import sync_playwright
+from typing import Any, Iterable, Optional
 
-DEFAULT_UA = os.getenv("USER_AGENT","Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0 Safari/537.36")
+from .config import DEFAULT_USER_AGENT
+
+DEFAULT_UA = DEFAULT_USER_AGENT  # 兼容旧导出；实际 UA 取自 Config.user_agent（USER_AGENT）
 
 def _maybe_stealth(page) -> None:
     try:
@@ -13,26 +14,128 @@ def _maybe_stealth(page) -> None:
     except Exception:
         pass
 
-def login_and_get_html(username: str, password: str, target_url: str, headless: bool = True, proxy: Optional[str] = None, storage_dir: str = ".playwright") -> str:
+async def _maybe_stealth_async(page) -> None:
+    try:
+        from playwright_stealth import stealth_async  # type: ignore
+        await stealth_async(page)
+    except Exception:
+        pass
+
+# 首页出现登录表单或已登录导航之一即可判断登录态
+LOGIN_STATE_SELECTOR = 'input[name="username"], svg[aria-label="Home"], a[href="/explore/"]'
+
+
+def _split(value: str) -> list:
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+class ResourceBlocker:
+    """
+    浏览器请求拦截（context.route）：按资源类型（image/media/font…）或 URL 片段拦截，
+    片段含 * 时按通配匹配整个 URL。被拦截的请求计入 blocked_requests_total{type=...}。
+    """
+
+    def __init__(self, types: Iterable[str] = (), patterns: Iterable[str] = (), metrics: Any = None):
+        self.types = frozenset(types)
+        self.patterns = tuple(p for p in patterns if "*" not in p)
+        self.globs = tuple(p for p in patterns if "*" in p)
+        self.metrics = metrics
+        self.blocked = 0
+
+    @classmethod
+    def from_config(cls, cfg: Any, metrics: Any = None) -> Optional["ResourceBlocker"]:
+        types, patterns = _split(cfg.block_resources), _split(cfg.block_urls)
+        return cls(types, patterns, metrics) if types or patterns else None
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.types: return True
+        return any(p in url for p in self.patterns) or any(fnmatchcase(url, g) for g in self.globs)
+
+    def _blocks(self, request: Any) -> bool:
+        if not self.should_block(request.resource_type, request.url): return False
+        self.blocked += 1
+        if self.metrics is not None: self.metrics.inc("blocked_requests_total", type=request.resource_type)
+        return True
+
+    def handle(self, route: Any) -> None:
+        if self._blocks(route.request): route.abort()
+        else: route.continue_()
+
+    async def handle_async(self, route: Any) -> None:
+        if self._blocks(route.request): await route.abort()
+        else: await route.continue_()
+
+    def install(self, context: Any) -> None:
+        context.route("**/*", self.handle)
+
+    async def install_async(self, context: Any) -> None:
+        await context.route("**/*", self.handle_async)
+
+
+def wait_ready(page, selector: str, timeout_ms: int) -> bool:
+    """等到 selector 出现在 DOM 中（attached 即可，不要求可见）；超时返回 False，调用方按当前 HTML 继续。"""
+    if not selector: return True
+    try: page.wait_for_selector(selector, state="attached", timeout=timeout_ms); return True
+    except Exception: return False
+
+
+async def wait_ready_async(page, selector: str, timeout_ms: int) -> bool:
+    if not selector: return True
+    try: await page.wait_for_selector(selector, state="attached", timeout=timeout_ms); return True
+    except Exception: return False
+
+def ensure_logged_in(page, username: str, password: str) -> bool:
+    """
+    打开首页检查登录态，必要时填表登录。
+    返回 True 表示本次执行了登录（调用方应持久化 storage state）。
+    """
+    page.goto("https://www.instagram.com/", wait_until="domcontentloaded")
+    if not wait_ready(page, LOGIN_STATE_SELECTOR, 15000): page.wait_for_load_state("networkidle")
+    needs_login = page.locator('input[name="username"]').count() > 0
+    if not needs_login: return False
+    if not username or not password: raise ValueError("需要 IG_USERNAME/IG_PASSWORD")
+    page.fill('input[name="username"]', username); page.fill('input[name="password"]', password)
+    page.click('button[type="submit"]'); page.wait_for_load_state("networkidle", timeout=60000)
+    for txt in ("Not Now","稍后再说"):
+        try: page.get_by_text(txt, exact=True).click(timeout=3000)
+        except Exception: pass
+    return True
+
+async def ensure_logged_in_async(page, username: str, password: str) -> bool:
+    """ensure_logged_in 的 async_api 版本。"""
+    await page.goto("https://www.instagram.com/", wait_until="domcontentloaded")
+    if not await wait_ready_async(page, LOGIN_STATE_SELECTOR, 15000): await page.wait_for_load_state("networkidle")
+    needs_login = await page.locator('input[name="username"]').count() > 0
+    if not needs_login: return False
+    if not username or not password: raise ValueError("需要 IG_USERNAME/IG_PASSWORD")
+    await page.fill('input[name="username"]', username); await page.fill('input[name="password"]', password)
+    await page.click('button[type="submit"]'); await page.wait_for_load_state("networkidle", timeout=60000)
+    for txt in ("Not Now","稍后再说"):
+        try: await page.get_by_text(txt, exact=True).click(timeout=3000)
+        except Exception: pass
+    return True
+
+def login_and_get_html(username: str, password: str, target_url: str, headless: bool = True, proxy: Optional[str] = None, storage_dir: str = ".playwright", user_agent: Optional[str] = None, blocker: Optional[ResourceBlocker] = None, wait_selector: str = "", timeout: float = 30) -> str:
+    """
+    blocker 非空时拦截图片/媒体/字体/统计等请求；wait_selector 非空时目标页
+    DOMContentLoaded 后只等该选择器出现即取 HTML，否则等待 networkidle。
+    """
+    # 只在真正启动浏览器时导入 playwright：导入本模块（export_cookies 等）不加载它
+    from playwright.sync_api import sync_playwright
     storage = Path(storage_dir); storage.mkdir(parents=True, exist_ok=True)
     state_path = storage / "state.json"
     launch_kwargs: dict = {"headless": headless}
     if proxy: launch_kwargs["proxy"] = {"server": proxy}
     with sync_playwright() as p:
         browser = p.chromium.launch(**launch_kwargs)
-        context = browser.new_context(storage_state=str(state_path) if state_path.exists() else None, user_agent=DEFAULT_UA)
+        context = browser.new_context(storage_state=str(state_path) if state_path.exists() else None, user_agent=user_agent or DEFAULT_UA)
+        if blocker is not None: blocker.install(context)
         page = context.new_page(); _maybe_stealth(page)
-        page.goto("https://www.instagram.com/", wait_until="networkidle")
-        needs_login = page.locator('input[name="username"]').count() > 0
-        if needs_login:
-            if not username or not password: browser.close(); raise ValueError("需要 IG_USERNAME/IG_PASSWORD")
-            page.fill('input[name="username"]', username); page.fill('input[name="password"]', password)
-            page.click('button[type="submit"]'); page.wait_for_load_state("networkidle", timeout=60000)
-            for txt in ("Not Now","稍后再说"):
-                try: page.get_by_text(txt, exact=True).click(timeout=3000)
-                except Exception: pass
-            context.storage_state(path=str(state_path))
-        page.goto(target_url, wait_until="networkidle")
+        try:
+            if ensure_logged_in(page, username, password): context.storage_state(path=str(state_path))
+        except ValueError: browser.close(); raise
+        page.goto(target_url, wait_until="domcontentloaded" if wait_selector else "networkidle", timeout=int(timeout * 1000))
+        wait_ready(page, wait_selector, int(timeout * 1000))
         html = page.content(); context.storage_state(path=str(state_path)); browser.close()
         return html
 
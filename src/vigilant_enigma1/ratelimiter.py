@@ -1,27 +1,98 @@
 import threading
 import time
 import asyncio
-__all__ = ["RateLimiter","AsyncRateLimiter"]
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlsplit
+__all__ = ["TokenBucket","RateLimiter","AsyncRateLimiter","HostRateLimiter","AsyncHostRateLimiter","parse_retry_after"]
 
-class RateLimiter:
-    def __init__(self, qps: float):
-        self.min_interval = 1.0 / qps if qps > 0 else 0
-        self._lock = threading.Lock(); self._last = 0.0
-    def wait(self):
-        if self.min_interval <= 0: return
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After（秒数或 HTTP 日期），返回需要等待的秒数。"""
+    if not value: return None
+    value = value.strip()
+    try: return max(0.0, float(value))
+    except ValueError: pass
+    try: return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError): return None
+
+def _host(key: Optional[str]) -> str:
+    if not key: return ""
+    return (urlsplit(key).hostname or "") if "://" in key else key.lower()
+
+class TokenBucket:
+    """
+    令牌桶（GCRA 形式）：平均 rate 个/秒，最多连续放行 burst 个；rate<=0 表示不限速（但仍可被 pause）。
+    使用单调时钟；锁内只做记账并为调用方预约时间槽，睡眠在锁外进行，等待者之间互不串行阻塞。
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate; self.burst = max(1, int(burst))
+        self.min_interval = 1.0 / rate if rate > 0 else 0
+        self._tau = (self.burst - 1) * self.min_interval  # 允许的突发提前量
+        self._tat = 0.0  # 理论到达时间
+        self._lock = threading.Lock()
+    def reserve(self) -> float:
+        """预约一个令牌，返回需要等待的秒数。"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._tat - self._tau)
+            self._tat = max(self._tat, start) + self.min_interval
+            return start - now
+    def pause(self, seconds: float) -> None:
+        """seconds 内不再放行（如服务端返回 Retry-After）；恢复后不立即突发。"""
         with self._lock:
-            now = time.time(); delta = now - self._last
-            sleep_for = self.min_interval - delta
-            if sleep_for > 0: time.sleep(sleep_for)
-            self._last = time.time()
+            self._tat = max(self._tat, time.monotonic() + seconds + self._tau)
+    def wait(self, key: Optional[str] = None):
+        delay = self.reserve()
+        if delay > 0: time.sleep(delay)
+
+class RateLimiter(TokenBucket):
+    """全局限速（同步）。wait/observe 接受 URL 参数，与按 host 限速的接口一致。"""
+    def __init__(self, qps: float, burst: int = 1, default_pause: float = 30.0):
+        super().__init__(qps, burst); self.default_pause = default_pause
+    def penalize(self, key: Optional[str], seconds: float) -> None:
+        self.pause(seconds)
+    def observe(self, key: Optional[str], status: int, headers: Optional[Mapping[str, str]] = None) -> Optional[float]:
+        """根据响应状态处理限流信号：429 或带 Retry-After 的 503 会暂停放行，返回暂停秒数。"""
+        retry_after = parse_retry_after((headers or {}).get("retry-after"))
+        if status == 429 or (status == 503 and retry_after is not None):
+            seconds = retry_after if retry_after is not None else self.default_pause
+            self.penalize(key, seconds); return seconds
+        return None
+
+class AsyncRateLimiter(RateLimiter):
+    """全局限速（asyncio）。记账与同步版共用，等待用 asyncio.sleep。"""
+    async def wait(self, key: Optional[str] = None):  # type: ignore[override]
+        delay = self.reserve()
+        if delay > 0: await asyncio.sleep(delay)
+
+class HostRateLimiter(RateLimiter):
+    """
+    全局令牌桶（qps 为所有 host 合计的硬上限）+ 每个 host 一个令牌桶（per_host_qps，0 表示只受全局限制）。
+    429/Retry-After 只暂停对应 host，其它 host 照常进行。
+    """
+    def __init__(self, qps: float, burst: int = 1, per_host_qps: float = 0, per_host_burst: Optional[int] = None, default_pause: float = 30.0):
+        super().__init__(qps, burst, default_pause)
+        self.per_host_qps = per_host_qps; self.per_host_burst = per_host_burst or burst
+        self._hosts: Dict[str, TokenBucket] = {}; self._hosts_lock = threading.Lock()
+    def bucket(self, key: Optional[str]) -> TokenBucket:
+        host = _host(key)
+        b = self._hosts.get(host)
+        if b is None:
+            with self._hosts_lock:
+                b = self._hosts.setdefault(host, TokenBucket(self.per_host_qps, self.per_host_burst))
+        return b
+    def penalize(self, key: Optional[str], seconds: float) -> None:
+        self.bucket(key).pause(seconds)
+    def wait(self, key: Optional[str] = None):
+        # 先等 host 桶（含 Retry-After 暂停），再取全局令牌：被暂停的 host 不会白占全局配额
+        delay = self.bucket(key).reserve()
+        if delay > 0: time.sleep(delay)
+        delay = self.reserve()
+        if delay > 0: time.sleep(delay)
 
-class AsyncRateLimiter:
-    def __init__(self, qps: float):
-        self.min_interval = 1.0 / qps if qps > 0 else 0
-        self._lock = asyncio.Lock(); self._next_ts = 0.0
-    async def wait(self):
-        if self.min_interval <= 0: return
-        async with self._lock:
-            loop = asyncio.get_running_loop(); now = loop.time()
-            if now < self._next_ts: await asyncio.sleep(self._next_ts - now); now = self._next_ts
-            self._next_ts = now + self.min_interval
+class AsyncHostRateLimiter(HostRateLimiter):
+    async def wait(self, key: Optional[str] = None):  # type: ignore[override]
+        delay = self.bucket(key).reserve()
+        if delay > 0: await asyncio.sleep(delay)
+        delay = self.reserve()
+        if delay > 0: await asyncio.sleep(delay)
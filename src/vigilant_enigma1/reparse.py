@@ -0,0 +1,100 @@
+"""
+reparse：把 HtmlArchive 中归档的原始 HTML 重新解析并写出新的 CSV/JSONL，全程不联网。
+
+    reparse data/archive -o data/output.csv              # igscrape 归档（按用户名）
+    reparse archive --kind url -o output.jsonl          # scrape 归档（按 URL）
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from .archive import ArchiveEntry, HtmlArchive, read_record
+from .logger import init_logger
+from .parse_pool import ParsePool
+from .sinks import FORMATS, PROFILE_FIELDS, URL_FIELDS, open_sink
+
+__all__ = ["reparse", "main"]
+
+
+def _error_row(kind: str, entry: ArchiveEntry, e: BaseException) -> Dict[str, Any]:
+    if kind == "url": return {"url": entry.url, "title": "", "description": "", "error": f"{type(e).__name__}: {e}"}
+    row: Dict[str, Any] = {k: "" for k in PROFILE_FIELDS}
+    row["username"] = entry.key; row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def _parse_chunk(directory: str, kind: str, entries: List[ArchiveEntry]) -> List[Dict[str, Any]]:
+    """在子进程中执行：自行读盘、解压、解析一批记录（HTML 不经过进程间管道）。"""
+    from .parser import parse_html, parse_profile
+    rows: List[Dict[str, Any]] = []
+    f = None; current = None
+    try:
+        for e in entries:
+            try:
+                if e.segment != current:
+                    if f is not None: f.close()
+                    f = open(os.path.join(directory, e.segment), "rb"); current = e.segment
+                html = read_record(directory, e, f)
+                if kind == "url": rows.append(parse_html(html, e.url))
+                else: rows.append(parse_profile(html, e.key)[0])
+            except Exception as ex:
+                rows.append(_error_row(kind, e, ex))
+    finally:
+        if f is not None: f.close()
+    return rows
+
+
+def reparse(directory: str, output: str, kind: Optional[str] = None, fmt: Optional[str] = None, workers: Optional[int] = None, chunk_size: int = 200, all_versions: bool = False) -> int:
+    """
+    按 (段, 偏移) 顺序把索引切成每批 chunk_size 条，投递到进程池并行解析，
+    按投递顺序写出。默认每个 key 只取最近一次抓取。返回写出的行数。
+    """
+    logger = init_logger("igscraper")
+    archive = HtmlArchive(directory)
+    if kind is None:
+        kinds = {e.kind for e in archive.entries(latest=False)}
+        if len(kinds) > 1: raise ValueError(f"归档中包含多种记录 {sorted(kinds)}，请用 --kind 指定")
+        kind = kinds.pop() if kinds else "profile"
+    entries = archive.entries(kind, latest=not all_versions)
+    logger.info("重新解析 %s：%d 条 %s 记录", directory, len(entries), kind)
+    t0 = time.perf_counter(); written = 0
+    # 离线解析没有抓取要做，默认用满所有核；每个任务的第一个参数是归档目录而非 HTML，inline_threshold=0 保证全部投递到池中
+    n = workers or os.cpu_count() or 1
+    pool = ParsePool("process" if n > 1 else "inline", workers=n, inline_threshold=0)
+    pending: Deque[Future] = deque()
+    with pool, open_sink(output, URL_FIELDS if kind == "url" else PROFILE_FIELDS, fmt=fmt) as sink:
+        for i in range(0, len(entries), chunk_size):
+            pending.append(pool.submit(_parse_chunk, directory, kind, entries[i:i + chunk_size]))
+            while pending and pending[0].done():
+                rows = pending.popleft().result(); sink.write_many(rows); written += len(rows)
+        while pending:
+            rows = pending.popleft().result(); sink.write_many(rows); written += len(rows)
+    elapsed = time.perf_counter() - t0
+    logger.info("完成：写出 %d 行到 %s，用时 %.1fs（%.0f 页/秒）", written, output, elapsed, written / elapsed if elapsed > 0 else 0)
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    load_dotenv()
+    p = argparse.ArgumentParser(prog="reparse", description="离线重新解析归档的原始 HTML（不联网）")
+    p.add_argument("archive", nargs="?", default=os.getenv("ARCHIVE_DIR") or None, help="归档目录（默认 ARCHIVE_DIR）")
+    p.add_argument("-o", "--output", required=True, help="输出路径（.csv/.jsonl/.parquet）")
+    p.add_argument("--kind", choices=["profile", "url"], default=None, help="记录类型：profile（igscrape）或 url（scrape），默认按归档推断")
+    p.add_argument("--format", choices=FORMATS, default=None, help="输出格式（默认按扩展名推断）；parquet 需要 pyarrow")
+    p.add_argument("--workers", type=int, default=None, help="解析进程数（默认按 CPU 核数）")
+    p.add_argument("--chunk-size", type=int, default=200, help="每个任务解析的记录数")
+    p.add_argument("--all-versions", action="store_true", help="输出每一次抓取（默认每个 key 只取最近一次）")
+    args = p.parse_args(argv)
+    if not args.archive: p.error("需要指定归档目录或设置 ARCHIVE_DIR")
+    reparse(args.archive, args.output, kind=args.kind, fmt=args.format, workers=args.workers, chunk_size=args.chunk_size, all_versions=args.all_versions)
+
+
+if __name__ == "__main__":
+    main()
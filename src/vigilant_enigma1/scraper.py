@@ -2,145 +2,184 @@ from __future__ import annotations
 
 import asyncio
 import csv
-import os
+import importlib
 import time
-from contextlib import asynccontextmanager
-from typing import Any, Dict, Iterable, List, Optional
-
-import httpx
-from bs4 import BeautifulSoup
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from tqdm import tqdm
-from .ratelimiter import AsyncRateLimiter
+from contextlib import AsyncExitStack, ExitStack
+from pathlib import Path
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from .backends import TransientError, open_backend  # noqa: F401  TransientError 保留原导出
 from .config import Config
 from .logger import init_logger
-from .ratelimiter import RateLimiter
-from .playwright_login import login_and_get_html, export_cookies
-from .parser import parse_profile
-
-DEFAULT_UA = os.getenv(
-    "USER_AGENT",
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
-)
-# 读取可配置参数（带默认）
-PROXY_URL = (os.getenv("PROXY_URL") or "").strip() or None
-HEADLESS = (os.getenv("HEADLESS", "true").lower() in ("1", "true", "yes", "on"))
-RATE_LIMIT_QPS = float(os.getenv("RATE_LIMIT_QPS", "0") or 0)
-RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "3") or 3)
-RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", "2") or 2.0)
-DEFAULT_TIMEOUT = float(os.getenv("TIMEOUT_SECONDS", os.getenv("TIMEOUT", "15")) or 15)
-
-def _try_import(name: str):
-    try:
-        __import__(name)
-        return True
-    except Exception:
-        return False
-
-@asynccontextmanager
-async def _async_client(timeout: float = DEFAULT_TIMEOUT, ua: str = DEFAULT_UA):
-    headers = {"User-Agent": ua, "Accept": "text/html,application/xhtml+xml"}
-    # 加载代理（如有）
-    client_kwargs = dict(
-        headers=headers,
-        timeout=httpx.Timeout(timeout, read=timeout),
-        follow_redirects=True,
-        http2=True,
-    )
-    if PROXY_URL:
-        client_kwargs["proxies"] = PROXY_URL  # type: ignore[assignment]
-    async with httpx.AsyncClient(**client_kwargs) as client:
-        yield client
-
-# 使用可配置的重试策略
-@retry(
-    stop=stop_after_attempt(RETRY_ATTEMPTS),
-    wait=wait_exponential(multiplier=RETRY_BACKOFF, min=RETRY_BACKOFF, max=RETRY_BACKOFF * 8),
-    retry=retry_if_exception_type((httpx.RequestError, httpx.HTTPStatusError)),
-    reraise=True,
-)
-async def fetch_httpx(client: httpx.AsyncClient, url: str) -> str:
-    resp = await client.get(url)
-    resp.raise_for_status()
-    return resp.text
-
-async def fetch_browser(url: str, timeout: float = DEFAULT_TIMEOUT) -> str:
-    try:
-        from playwright.async_api import async_playwright
-    except ImportError as e:
-        raise RuntimeError("Playwright 未安装，请安装 extras 'browser' 后使用 --browser") from e
-
-    async with async_playwright() as p:
-        launch_kwargs = {"headless": HEADLESS}
-        if PROXY_URL:
-            launch_kwargs["proxy"] = {"server": PROXY_URL}
-        browser = await p.chromium.launch(**launch_kwargs)
-        context = await browser.new_context(user_agent=DEFAULT_UA)
-        page = await context.new_page()
-        # 可选 stealth
-        if _try_import("playwright_stealth"):
-            from playwright_stealth import stealth_async
-            await stealth_async(page)
-        await page.goto(url, wait_until="domcontentloaded", timeout=int(timeout * 1000))
-        content = await page.content()
-        await browser.close()
-        return content
-
-def parse_html(html: str, url: str) -> Dict[str, Any]:
-    soup = BeautifulSoup(html, "lxml")
-    title = (soup.title.string or "").strip() if soup.title and soup.title.string else ""
-    desc = ""
-    mt = soup.find("meta", attrs={"name": "description"}) or soup.find("meta", attrs={"property": "og:description"})
-    if mt and mt.get("content"):
-        desc = mt["content"].strip()
-    return {"url": url, "title": title, "description": desc}
-
-async def _worker(url: str, use_browser: bool, client: Optional[httpx.AsyncClient]) -> Dict[str, Any]:
-    html = await (fetch_browser(url) if use_browser else fetch_httpx(client, url))  # type: ignore[arg-type]
-    return parse_html(html, url)
-
-async def scrape_urls(urls: Iterable[str], use_browser: bool = False, concurrency: int = 5) -> List[Dict[str, Any]]:
-    semaphore = asyncio.Semaphore(concurrency)
-    results: List[Dict[str, Any]] = []
+from .ratelimiter import AsyncHostRateLimiter, AsyncRateLimiter, RateLimiter
+from .parse_pool import ParsePool
+from .checkpoint import Checkpoint, CheckpointSink, row_failed
+from .concurrency import AdaptiveConcurrency
+from .cache import CacheMiss, ResponseCache  # noqa: F401  CacheMiss 保留原导出
+from .archive import HtmlArchive
+from .metrics import NULL_METRICS, Metrics
+from .sinks import PROFILE_FIELDS, CsvSink, open_sink
+from .urls import canonical_url, normalize_url
+
+# 抓取后端（httpx/Playwright）、解析器（bs4）与 tqdm 都在用到时才导入：
+# 导入本模块、以及 CLI 的 --help 不加载它们。旧的函数导出经 __getattr__ 按需转发到所在模块。
+_LAZY_EXPORTS = {
+    "fetch_html_with_httpx": "backend_httpx", "fetch_httpx": "backend_httpx",
+    "fetch_html_with_playwright": "backend_playwright", "fetch_browser": "backend_playwright",
+    "HttpxSession": "session", "cookies_to_jar": "session", "http2_available": "session",
+    "BrowserPool": "browser_pool", "AsyncBrowserPool": "browser_pool",
+    "login_and_get_html": "playwright_login", "export_cookies": "playwright_login",
+    "parse_html": "parser", "parse_profile": "parser",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_EXPORTS.get(name)
+    if module is None: raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{module}", __package__), name)
+
+
+def _url_backend(cfg: Config, use_browser: bool, limiter: Any, cache: Optional[ResponseCache], metrics: Metrics) -> Any:
+    """scrape 命令的后端：--browser 时每个 URL 独立启动 Chromium，否则为不带 cookies 的异步 httpx。"""
+    if use_browser: return open_backend("browser", cfg, limiter=limiter, metrics=metrics)
+    return open_backend("httpx-async", cfg, limiter=limiter, cache=cache, metrics=metrics, cookies=False)
+
+async def _worker(url: str, backend: Any, parse_pool: Optional[ParsePool] = None, archive: Optional[HtmlArchive] = None, head_only: bool = False, metrics: Metrics = NULL_METRICS) -> Dict[str, Any]:
+    # head-only：后端边下载边解析，直接给出结果；截断的前缀不是完整页面，不写入归档（否则 reparse 会把它当整页）
+    if head_only: return await backend.fetch_head(url)
+    from .parser import parse_html
+    html = await backend.fetch(url)
+    if archive is not None:
+        # 压缩、哈希与写盘放到线程里，不阻塞事件循环上的其它连接
+        with metrics.timer("archive"): await asyncio.to_thread(archive.append, "url", url, url, html)
+    with metrics.timer("parse"):
+        if parse_pool is not None: return await parse_pool.run(parse_html, html, url)
+        return parse_html(html, url)
+
+async def _limited(gate: Any, metrics: Metrics, *args: Any) -> Dict[str, Any]:
+    """
+    等待并发名额（计入 queue 阶段）后执行 _worker。gate 为 asyncio.Semaphore 或 AdaptiveConcurrency；
+    后者的状态码与延迟由包装后的限速器反馈，这里只补报没有响应的失败（超时、连接错误）。
+    """
+    t = time.perf_counter()
+    async with gate:
+        if metrics.enabled: metrics.observe("queue", time.perf_counter() - t)
+        try: return await _worker(*args, metrics=metrics)
+        except Exception as e:
+            if isinstance(gate, AdaptiveConcurrency) and getattr(e, "response", None) is None: gate.on_error(e)
+            raise
+
+def _gate(concurrency: int, controller: Optional[AdaptiveConcurrency], limiter: Any) -> Tuple[Any, Any]:
+    """返回 (并发闸门, 传给后端的限速器)：自适应时限速器包一层，把每个响应反馈给 controller。"""
+    if controller is None: return asyncio.Semaphore(concurrency), limiter
+    return controller, controller.wrap(limiter)
+
+def _url_error_row(url: str, e: BaseException) -> Dict[str, Any]:
+    return {"url": url, "title": "", "description": "", "error": f"{type(e).__name__}: {e}"}
 
-    # 用异步限速器统一控制 QPS
-    limiter = AsyncRateLimiter(RATE_LIMIT_QPS)
+async def scrape_urls(urls: Iterable[str], use_browser: bool = False, concurrency: int = 5, parse_pool: Optional[ParsePool] = None, cache: Optional[ResponseCache] = None, metrics: Metrics = NULL_METRICS, archive: Optional[HtmlArchive] = None, cfg: Optional[Config] = None, limiter: Optional[Any] = None, controller: Optional[AdaptiveConcurrency] = None, head_only: bool = False) -> List[Dict[str, Any]]:
+    """
+    输入先按 canonical_url 分组去重（host 大小写、默认端口、末尾 /、跟踪参数、参数顺序不同视为同一页），
+    每组只抓取一次（用 normalize_url 后的第一个输入）；返回与输入一一对应、顺序一致的行，
+    url 列为原始输入，失败的输入各自得到一行错误（error 列非空，成功的行 error 为空字符串）。
+    parse_pool 非空时，解析在进程/线程池中进行，不阻塞事件循环；
+    cache 非空时 httpx 抓取经过磁盘响应缓存；
+    archive 非空时原始 HTML 写入归档，之后可用 reparse 离线重新解析；
+    metrics 记录各阶段耗时与状态码/重试/缓存计数（默认关闭）。
+    cfg 为空时在调用时按环境变量构造（Config.for_urls()）：限速、超时、重试、代理与 UA 均取自它。
+    limiter 为空时按 cfg 新建进程内限速器；分片运行时传入 RemoteRateLimiter，与其它进程共享速率预算。
+    controller 非空时用它（AdaptiveConcurrency，AIMD）代替固定的 concurrency 信号量，限速器仍是 QPS 上限。
+    head_only 为 True 时（仅 httpx）调用后端的 fetch_head：流式读取到 </head> 即关闭响应，边下载边解析；
+    只看 <head> 内的 title/description，写在 <body> 里的这些标签不会被取到；截断的页面不写入 archive。
+    """
+    from tqdm import tqdm
+    cfg = cfg or Config.for_urls()
+    head_only = head_only and not use_browser
+    inputs = list(urls)
+    keys = [canonical_url(u) for u in inputs]
+    groups: Dict[str, str] = {}
+    for k, u in zip(keys, inputs): groups.setdefault(k, u)
+    if len(groups) < len(inputs):
+        metrics.inc("urls_deduplicated_total", len(inputs) - len(groups))
+        init_logger("igscraper").info("去重：输入 %d 个 URL，实际抓取 %d 个", len(inputs), len(groups))
+    outcome: Dict[str, Any] = {}
 
-    async with _async_client(timeout=DEFAULT_TIMEOUT) as client:
-        async def limited(u: str):
-            async with semaphore:
-                await limiter.wait()
-                return await _worker(u, use_browser, client)
+    async def fetch_one(key: str, url: str) -> None:
+        try: outcome[key] = await _limited(gate, metrics, normalize_url(url), backend, parse_pool, archive, head_only)
+        except Exception as e: outcome[key] = e
 
-        tasks = [limited(u) for u in urls]
+    # 用异步限速器统一控制 QPS：全局上限 + 按 host 的令牌桶，遵守 429/Retry-After
+    limiter = limiter or AsyncHostRateLimiter(cfg.qps, burst=cfg.burst, per_host_qps=cfg.per_host_qps)
+    gate, limiter = _gate(concurrency, controller, limiter)
+
+    async with _url_backend(cfg, use_browser, limiter, cache, metrics) as backend:
+        tasks = [fetch_one(k, u) for k, u in groups.items()]
         for coro in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="scraping"):
-            try:
-                res = await coro
-                results.append(res)
-            except Exception as e:
-                results.append({"url": "...", "title": "", "description": f"ERROR: {e}"})
-        return results
+            await coro
+    results: List[Dict[str, Any]] = []
+    for k, u in zip(keys, inputs):
+        res = outcome[k]
+        if isinstance(res, Exception):
+            metrics.inc("errors_total"); results.append(_url_error_row(u, res))
+        else:
+            results.append(dict(res, url=u, error=""))
+        metrics.inc("rows_total")
+    return results
+
+async def scrape_urls_stream(urls: Iterable[str], sink: Any, use_browser: bool = False, concurrency: int = 5, parse_pool: Optional[ParsePool] = None, window: Optional[int] = None, cache: Optional[ResponseCache] = None, metrics: Metrics = NULL_METRICS, archive: Optional[HtmlArchive] = None, cfg: Optional[Config] = None, limiter: Optional[Any] = None, controller: Optional[AdaptiveConcurrency] = None, head_only: bool = False) -> int:
+    """
+    流式版本：惰性消费 urls，在途任务数不超过 window（默认 concurrency*2，自适应时为 controller.max_limit*2），
+    每完成一个结果立即写入 sink（CsvSink/JsonlSink）。内存占用与输入规模无关。
+    与在途请求 canonical_url 相同的输入不再单独抓取，而是合并到该请求上，完成后每个输入各写一行。
+    limiter、controller、head_only 含义同 scrape_urls。
+    返回写出的行数。
+    """
+    from tqdm import tqdm
+    cfg = cfg or Config.for_urls()
+    head_only = head_only and not use_browser
+    limiter = limiter or AsyncHostRateLimiter(cfg.qps, burst=cfg.burst, per_host_qps=cfg.per_host_qps)
+    gate, limiter = _gate(concurrency, controller, limiter)
+    window = max(1, window or (controller.max_limit if controller is not None else concurrency) * 2)
+    written = 0
+
+    async with _url_backend(cfg, use_browser, limiter, cache, metrics) as backend:
+        in_flight: Dict[asyncio.Task, Tuple[str, List[str]]] = {}  # 任务 -> (canonical key, 合并到它的原始输入)
+        by_key: Dict[str, asyncio.Task] = {}
+        it = iter(urls)
+        exhausted = False
+        with tqdm(desc="scraping", unit="url") as bar:
+            while in_flight or not exhausted:
+                while not exhausted and len(in_flight) < window:
+                    u = next(it, None)
+                    if u is None: exhausted = True; break
+                    key = canonical_url(u)
+                    t = by_key.get(key)
+                    if t is not None:
+                        in_flight[t][1].append(u); metrics.inc("urls_coalesced_total"); continue
+                    t = asyncio.create_task(_limited(gate, metrics, normalize_url(u), backend, parse_pool, archive, head_only))
+                    in_flight[t] = (key, [u]); by_key[key] = t
+                if not in_flight: break
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    key, members = in_flight.pop(t); del by_key[key]
+                    try: res, err = t.result(), None
+                    except Exception as e: res, err = None, e
+                    for u in members:
+                        if err is not None: metrics.inc("errors_total"); row = _url_error_row(u, err)
+                        else: row = dict(res, url=u, error="")
+                        with metrics.timer("write"): sink.write(row)
+                        written += 1; metrics.inc("rows_total")
+                    bar.update(len(members))
+    return written
 
 def write_csv(rows: List[Dict[str, Any]], out_path: str) -> None:
     if not rows:
         return
-    # 若已安装 pandas，则优先使用
-    try:
-        import pandas as pd  # type: ignore
-        df = pd.DataFrame(rows)
-        df.to_csv(out_path, index=False)
-        return
-    except Exception:
-        pass
-
-    keys = list(rows[0].keys())
-    with open(out_path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=keys)
-        w.writeheader()
-        w.writerows(rows)
-
-class TransientError(Exception): pass
-
+    # 列取第一行的键；整批写完后一次落盘
+    with CsvSink(out_path, list(rows[0].keys()), flush_rows=len(rows)) as sink:
+        sink.write_many(rows)
 
 def read_usernames(path: str) -> List[str]:
     users: List[str] = []
@@ -151,10 +190,16 @@ def read_usernames(path: str) -> List[str]:
     return users
 
 
+def _error_row(username: str, e: BaseException) -> Dict[str, Any]:
+    row: Dict[str, Any] = {k: "" for k in PROFILE_FIELDS}
+    row["username"] = username; row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
 def write_rows(path: str, rows: List[Dict]):
     need_header = not Path(path).exists()
     with open(path, "a", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=["username","display_name","bio","email","phone","links","gender","age","region","warning_code","error"])
+        w = csv.DictWriter(f, fieldnames=PROFILE_FIELDS)
         if need_header: w.writeheader()
         for r in rows: w.writerow(r)
 
@@ -162,53 +207,146 @@ def write_rows(path: str, rows: List[Dict]):
 def build_profile_url(username: str) -> str: return f"https://www.instagram.com/{username}/"
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=1, max=10),
-    retry=retry_if_exception_type(TransientError),
-    reraise=True,
-)
-def fetch_html_with_playwright(cfg: Config, url: str) -> str:
-    try: return login_and_get_html(cfg.ig_user, cfg.ig_pass, url, headless=cfg.headless, proxy=cfg.proxy)
-    except Exception as e: raise TransientError(str(e))
-
-
-def cookies_to_jar(cookies: List[dict]) -> httpx.Cookies:
-    jar = httpx.Cookies()
-    for c in cookies:
-        name, value = c.get("name"), c.get("value")
-        if name is None or value is None: continue
-        jar.set(name, value, domain=c.get("domain") or None, path=c.get("path") or "/")
-    return jar
+def _filter_done(usernames: List[str], checkpoint: Optional[Checkpoint], logger) -> List[str]:
+    if checkpoint is None: return usernames
+    todo = list(checkpoint.filter(usernames))
+    logger.info("断点续跑：输入 %d 个，跳过已完成/重复 %d 个，待抓取 %d 个", len(usernames), len(usernames) - len(todo), len(todo))
+    return todo
 
 
-def fetch_html_with_httpx(cfg: Config, url: str) -> str:
+def _open_output(stack: Any, output: str, checkpoint: Optional[Checkpoint], fmt: Optional[str], flush_rows: Optional[int], flush_seconds: float) -> Any:
     """
-    使用 httpx 抓取示例：从 Playwright 持久化的 storageState 导出 cookies 并复用。
-    注意：Instagram 对无头与反爬较严格，httpx 成功率可能低于 Playwright。
+    以追加方式打开输出 sink（列为 PROFILE_FIELDS），句柄在整个运行期间保持打开；
+    有 checkpoint 时包一层 CheckpointSink：行落盘后才记入进度，退出时补记。
     """
-    cookies = export_cookies(); jar = cookies_to_jar(cookies)
-    headers = {"User-Agent":"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36","Accept":"text/html,application/xhtml+xml"}
-    kwargs = dict(headers=headers, cookies=jar, timeout=httpx.Timeout(cfg.timeout, read=cfg.timeout), follow_redirects=True, http2=True)
-    if cfg.proxy: kwargs["proxies"] = cfg.proxy  # type: ignore[assignment]
-    with httpx.Client(**kwargs) as client:
-        r = client.get(url); r.raise_for_status(); return r.text
+    sink = stack.enter_context(open_sink(output, PROFILE_FIELDS, fmt=fmt, append=True, flush_rows=flush_rows, flush_seconds=flush_seconds))
+    if checkpoint is None: return sink
+    return stack.enter_context(CheckpointSink(sink, checkpoint, "username", row_failed))
 
 
-def scrape(cfg: Config, input_csv: str, output_csv: str, use_httpx: bool = False):
+def scrape(cfg: Config, input_csv: str, output_csv: str, use_httpx: bool = False, parse_pool: Optional[ParsePool] = None, checkpoint: Optional[Checkpoint] = None, metrics: Metrics = NULL_METRICS, fmt: Optional[str] = None, flush_rows: Optional[int] = None, flush_seconds: float = 0.0, backend: Optional[str] = None):
+    """
+    backend 为 backends 注册表中的同步后端名（默认 use_httpx 时 "httpx"，否则 "playwright"），选中时才导入。
+    parse_pool 非空时，解析与下一个用户名的抓取重叠进行；输出顺序与输入一致。
+    checkpoint 非空时，跳过已完成及重复的用户名，并在行落盘后记录进度。
+    fmt 为 csv/jsonl/parquet（默认按扩展名推断），按 flush_rows 行或 flush_seconds 秒落盘。
+    metrics 记录 ratelimit/fetch/parse/write 各阶段耗时及状态码、重试、缓存计数。
+    cfg.archive_dir 非空时原始 HTML 写入归档（按用户名索引）。
+    """
+    from .parser import parse_profile
     logger = init_logger("igscraper")
     usernames = read_usernames(input_csv)
     if not usernames: logger.warning("输入为空或未找到 username 列"); return
-    limiter = RateLimiter(cfg.qps); rows_out: List[Dict] = []
-    for u in usernames:
-        limiter.wait()
-        url = build_profile_url(u); logger.info("抓取 %s -> %s", u, url)
-        try:
-            html = fetch_html_with_httpx(cfg, url) if use_httpx else fetch_html_with_playwright(cfg, url)
-            row, _ = parse_profile(html, u)
+    usernames = _filter_done(usernames, checkpoint, logger)
+    limiter = RateLimiter(cfg.qps, burst=cfg.burst)
+    cache = ResponseCache.from_config(cfg) if use_httpx else None
+    archive = HtmlArchive.from_config(cfg)
+    parser_pool = parse_pool or ParsePool(kind="inline")
+    pending: Deque[Tuple[str, Future]] = deque()
+
+    def collect(u: str, fut: Future) -> None:
+        try: row, _ = fut.result()
         except Exception as e:
-            row = {"username":u,"display_name":"","bio":"","email":"","phone":"","links":"","gender":"","age":"","region":"","warning_code":"","error":f"{type(e).__name__}: {e}"}
+            row = _error_row(u, e); metrics.inc("errors_total")
             logger.error("%s 报错: %s", u, row["error"])
-        rows_out.append(row)
-        if len(rows_out) >= 20: write_rows(output_csv, rows_out); rows_out.clear()
-    if rows_out: write_rows(output_csv, rows_out)
+        with metrics.timer("write"): sink.write(row)
+        metrics.inc("rows_total")
+
+    with ExitStack() as stack:
+        sink = _open_output(stack, output_csv, checkpoint, fmt, flush_rows, flush_seconds)
+        # 整个运行期间复用一个后端：Playwright 只启动一次浏览器（首次抓取时惰性启动），httpx 复用一个长连接会话
+        fetcher = stack.enter_context(open_backend(backend or ("httpx" if use_httpx else "playwright"), cfg, limiter=limiter, cache=cache, metrics=metrics))
+        if archive is not None: stack.callback(archive.close)
+        for u in usernames:
+            url = build_profile_url(u); logger.info("抓取 %s -> %s", u, url)
+            try:
+                html = fetcher.fetch(url)
+                if archive is not None:
+                    with metrics.timer("archive"): archive.append("profile", u, url, html)
+                on_parsed = metrics.done_callback("parse")
+                fut = parser_pool.submit(parse_profile, html, u)
+                fut.add_done_callback(on_parsed)
+            except Exception as e:
+                fut = Future(); fut.set_exception(e)
+            pending.append((u, fut))
+            while pending and pending[0][1].done(): collect(*pending.popleft())
+        while pending: collect(*pending.popleft())
+
+
+# ---- asyncio 流水线：fetch → parse → write 三段，由有界队列衔接 ----
+_DONE = object()
+
+
+async def scrape_async(cfg: Config, input_csv: str, output_csv: str, use_httpx: bool = False, concurrency: Optional[int] = None, batch_size: int = 20, parse_pool: Optional[ParsePool] = None, checkpoint: Optional[Checkpoint] = None, metrics: Metrics = NULL_METRICS, fmt: Optional[str] = None, flush_rows: Optional[int] = None, flush_seconds: float = 0.0, backend: Optional[str] = None) -> None:
+    """
+    scrape() 的异步流水线版本：
+    - fetch：concurrency 个协程并发抓取，共享一个 AsyncRateLimiter（cfg.qps 为全局硬上限）
+    - parse：在线程中（或 parse_pool 的进程/线程池中）运行 parse_profile，不阻塞事件循环
+    - write：攒够 batch_size 行后交给输出 sink（格式与落盘策略同 scrape()）
+    行的写出顺序按完成先后，不保证与输入一致。
+    backend 为异步后端名（默认 use_httpx 时 "httpx-async"，否则 "playwright-async"）。
+    """
+    from .parser import parse_profile
+    logger = init_logger("igscraper")
+    usernames = read_usernames(input_csv)
+    if not usernames: logger.warning("输入为空或未找到 username 列"); return
+    usernames = _filter_done(usernames, checkpoint, logger)
+    n = max(1, concurrency or cfg.concurrency)
+    limiter = AsyncRateLimiter(cfg.qps, burst=cfg.burst)
+    cache = ResponseCache.from_config(cfg) if use_httpx else None
+    archive = HtmlArchive.from_config(cfg)
+    fetch_q: asyncio.Queue = asyncio.Queue(maxsize=n * 2)
+    parse_q: asyncio.Queue = asyncio.Queue(maxsize=n * 2)
+    write_q: asyncio.Queue = asyncio.Queue(maxsize=batch_size * 2)
+
+    async def produce():
+        for u in usernames: await fetch_q.put(u)
+        for _ in range(n): await fetch_q.put(_DONE)
+
+    async def fetcher(client):
+        while (u := await fetch_q.get()) is not _DONE:
+            url = build_profile_url(u); logger.info("抓取 %s -> %s", u, url)
+            try: html = await client.fetch(url)
+            except Exception as e: await parse_q.put((u, None, e)); continue
+            if archive is not None:
+                with metrics.timer("archive"): await asyncio.to_thread(archive.append, "profile", u, url, html)
+            await parse_q.put((u, html, None))
+
+    # 有解析池时按池的 worker 数起多个解析协程，否则一个线程足够
+    n_parsers = parse_pool.workers if parse_pool is not None else 1
+
+    async def parser():
+        while (item := await parse_q.get()) is not _DONE:
+            u, html, err = item
+            if err is None:
+                try:
+                    with metrics.timer("parse"):
+                        row, _ = await (parse_pool.run(parse_profile, html, u) if parse_pool is not None else asyncio.to_thread(parse_profile, html, u))
+                except Exception as e: err = e
+            if err is not None:
+                row = _error_row(u, err); metrics.inc("errors_total"); logger.error("%s 报错: %s", u, row["error"])
+            await write_q.put(row)
+        await write_q.put(_DONE)
+
+    async def writer(sink):
+        buf: List[Dict] = []; live = n_parsers
+        while live:
+            row = await write_q.get()
+            if row is _DONE: live -= 1; continue
+            buf.append(row); metrics.inc("rows_total")
+            if len(buf) >= batch_size:
+                with metrics.timer("write"): await asyncio.to_thread(sink.write_many, buf)
+                buf = []
+        if buf:
+            with metrics.timer("write"): await asyncio.to_thread(sink.write_many, buf)
+
+    async with AsyncExitStack() as stack:
+        sink = _open_output(stack, output_csv, checkpoint, fmt, flush_rows, flush_seconds)
+        client = await stack.enter_async_context(open_backend(backend or ("httpx-async" if use_httpx else "playwright-async"), cfg, limiter=limiter, cache=cache, metrics=metrics, concurrency=n))
+        if archive is not None: stack.callback(archive.close)
+
+        async def fetch_stage():
+            await asyncio.gather(produce(), *(fetcher(client) for _ in range(n)))
+            for _ in range(n_parsers): await parse_q.put(_DONE)
+
+        await asyncio.gather(fetch_stage(), *(parser() for _ in range(n_parsers)), writer(sink))
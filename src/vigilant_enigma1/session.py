@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, List, Optional
+
+import httpx
+
+from .config import Config
+from .playwright_login import export_cookies
+
+__all__ = ["HttpxSession", "cookies_to_jar", "http2_available"]
+
+# User-Agent 不写死：取 cfg.user_agent，与产生 cookies 的 Playwright context 保持一致
+IG_HEADERS = {"Accept": "text/html,application/xhtml+xml"}
+
+
+def http2_available() -> bool:
+    """httpx 的 HTTP/2 依赖 h2（httpx[http2]）；未安装时退回 HTTP/1.1 长连接。"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def cookies_to_jar(cookies: List[dict]) -> httpx.Cookies:
+    jar = httpx.Cookies()
+    for c in cookies:
+        name, value = c.get("name"), c.get("value")
+        if name is None or value is None: continue
+        jar.set(name, value, domain=c.get("domain") or None, path=c.get("path") or "/")
+    return jar
+
+
+class HttpxSession:
+    """
+    igscrape --httpx 的长连接会话：持有一个 httpx.Client（同步）和/或 httpx.AsyncClient，
+    复用连接池与 HTTP/2 多路复用，避免每个用户名重新握手。
+    cookies 只在创建时从 .playwright/state.json 加载一次，之后仅当该文件 mtime 变化时重新加载。
+    transport 非空时传给 httpx 客户端（如 httpx.MockTransport）。
+    """
+
+    def __init__(self, cfg: Config, storage_dir: str = ".playwright", max_connections: Optional[int] = None, transport: Any = None):
+        self.cfg = cfg
+        self.storage_dir = storage_dir
+        self.state_path = Path(storage_dir) / "state.json"
+        n = max_connections or max(1, cfg.concurrency) * 2
+        self.limits = httpx.Limits(max_connections=n, max_keepalive_connections=n)
+        self.transport = transport
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._jar = httpx.Cookies()
+        self._client: Optional[httpx.Client] = None
+        self._aclient: Optional[httpx.AsyncClient] = None
+
+    def _client_kwargs(self) -> dict:
+        kwargs = dict(headers={**IG_HEADERS, "User-Agent": self.cfg.user_agent}, cookies=self._jar, timeout=httpx.Timeout(self.cfg.timeout, read=self.cfg.timeout), follow_redirects=True, http2=http2_available(), limits=self.limits)
+        if self.cfg.proxy: kwargs["proxies"] = self.cfg.proxy  # type: ignore[assignment]
+        if self.transport is not None: kwargs["transport"] = self.transport
+        return kwargs
+
+    def _refresh_cookies(self) -> None:
+        """state.json 的 mtime 变化（例如 Playwright 重新登录）时重新加载 cookies。"""
+        try: mtime: Optional[float] = os.stat(self.state_path).st_mtime
+        except OSError: mtime = None
+        if mtime == self._mtime and (self._client is not None or self._aclient is not None): return
+        with self._lock:
+            if mtime == self._mtime and (self._client is not None or self._aclient is not None): return
+            self._jar = cookies_to_jar(export_cookies(self.storage_dir)); self._mtime = mtime
+            if self._client is not None: self._client.cookies = self._jar
+            if self._aclient is not None: self._aclient.cookies = self._jar
+
+    @property
+    def client(self) -> httpx.Client:
+        self._refresh_cookies()
+        if self._client is None: self._client = httpx.Client(**self._client_kwargs())
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        self._refresh_cookies()
+        if self._aclient is None: self._aclient = httpx.AsyncClient(**self._client_kwargs())
+        return self._aclient
+
+    def close(self) -> None:
+        if self._client is not None: self._client.close(); self._client = None
+
+    async def aclose(self) -> None:
+        if self._aclient is not None: await self._aclient.aclose(); self._aclient = None
+        self.close()
+
+    def __enter__(self) -> "HttpxSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "HttpxSession":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
@@ -0,0 +1,144 @@
+"""
+多进程分片抓取的公共部分：
+
+- TokenServer：在主进程后台线程中持有唯一的全局/按 host 令牌桶，监听本机 Unix socket
+  （Windows 为命名管道，multiprocessing.connection），各分片进程向它预约令牌，合计速率不超过 RATE_LIMIT_QPS
+- RemoteRateLimiter：分片进程中的限速器，接口与 AsyncHostRateLimiter 相同（wait / observe）
+- shard_of：按规范化 URL 的哈希分片，同一页面的不同写法落在同一分片（分片内仍可去重/合并）
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import zlib
+from multiprocessing.connection import Client, Listener
+from typing import Any, Optional, Set, Tuple
+
+from .logger import init_logger
+from .ratelimiter import HostRateLimiter, RateLimiter, _host
+from .urls import canonical_url
+
+__all__ = ["TokenServer", "RemoteRateLimiter", "shard_of", "shard_path"]
+
+
+def shard_of(url: str, shards: int) -> int:
+    return zlib.crc32(canonical_url(url).encode("utf-8")) % shards
+
+
+def shard_path(path: str, index: int) -> str:
+    """out.csv -> out.shard0.csv（扩展名保留，输出格式推断不受影响）。"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{index}{ext}"
+
+
+class TokenServer:
+    """
+    本机令牌服务。服务端只做记账（TokenBucket.reserve），返回需要等待的秒数，睡眠在客户端进行；
+    每个连接一个线程，请求是 ("host", host) / ("global",) / ("pause", host, 秒数)；
+    处理出错时把异常回给客户端（由客户端抛出），不让分片永远阻塞在 recv 上。
+    与进程内的 HostRateLimiter 一样先等 host 桶再取全局令牌，被 Retry-After 暂停的 host 不会白占全局配额。
+    """
+
+    def __init__(self, qps: float, burst: int = 1, per_host_qps: float = 0):
+        self.limiter = HostRateLimiter(qps, burst=burst, per_host_qps=per_host_qps)
+        self.authkey = os.urandom(16)
+        self._listener = Listener(authkey=self.authkey)
+        self.address = self._listener.address
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+        self.logger = init_logger("igscraper")
+
+    def start(self) -> "TokenServer":
+        self._thread = threading.Thread(target=self._accept_loop, name="token-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def _accept_loop(self) -> None:
+        while not self._closing:
+            try: conn = self._listener.accept()
+            except Exception:
+                if self._closing: break
+                continue
+            if self._closing: conn.close(); break
+            threading.Thread(target=self._serve, args=(conn,), name="token-conn", daemon=True).start()
+
+    def _serve(self, conn: Any) -> None:
+        with conn:
+            while True:
+                try: msg = conn.recv()
+                except (EOFError, OSError): return
+                try: reply: Any = self._handle(msg)
+                except Exception as e:
+                    self.logger.error("令牌请求 %r 处理失败: %s", msg, e); reply = RuntimeError(f"令牌服务处理 {msg!r} 失败: {type(e).__name__}: {e}")
+                try: conn.send(reply)
+                except (EOFError, OSError): return
+
+    def _handle(self, msg: Tuple[Any, ...]) -> float:
+        op = msg[0]
+        if op == "host": return self.limiter.bucket(msg[1]).reserve()
+        if op == "global": return self.limiter.reserve()
+        if op == "pause":
+            self.limiter.penalize(msg[1], msg[2]); self.logger.info("%s 返回限流信号，所有分片暂停该 host %.1fs", msg[1] or "<global>", msg[2])
+            return 0.0
+        raise ValueError(f"未知的令牌请求: {op!r}")
+
+    def close(self) -> None:
+        if self._closing: return
+        self._closing = True
+        # accept() 阻塞时关闭监听 socket 不一定能唤醒它：先连一次让循环看到 _closing
+        try: Client(self.address, authkey=self.authkey).close()
+        except Exception: pass
+        self._listener.close()
+        if self._thread is not None: self._thread.join(timeout=5)
+
+    def __enter__(self) -> "TokenServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class RemoteRateLimiter(RateLimiter):
+    """
+    分片进程中的限速器：向 TokenServer 预约令牌后在本地 asyncio.sleep。
+    observe 沿用 RateLimiter 的 429/Retry-After 判断，暂停通过服务端作用到所有分片。
+    连接在首次使用时建立（构造参数可跨进程传递）。
+    observe 通常在事件循环上调用：此时暂停请求放到线程里发送，不在循环上等待 socket 往返与连接锁。
+    """
+
+    def __init__(self, address: Any, authkey: bytes, default_pause: float = 30.0):
+        super().__init__(0, default_pause=default_pause)
+        self.address = address; self.authkey = authkey
+        self._conn: Any = None
+        self._io = threading.Lock()
+        self._pending: Set[asyncio.Future] = set()
+
+    def _call(self, *msg: Any) -> float:
+        with self._io:
+            if self._conn is None: self._conn = Client(self.address, authkey=self.authkey)
+            self._conn.send(msg)
+            reply = self._conn.recv()
+        if isinstance(reply, BaseException): raise reply
+        return reply
+
+    async def wait(self, key: Optional[str] = None) -> None:  # type: ignore[override]
+        for msg in (("host", _host(key)), ("global",)):
+            delay = await asyncio.to_thread(self._call, *msg)
+            if delay > 0: await asyncio.sleep(delay)
+
+    def penalize(self, key: Optional[str], seconds: float) -> None:
+        msg = ("pause", _host(key), seconds)
+        try: loop = asyncio.get_running_loop()
+        except RuntimeError: self._call(*msg); return
+        fut = loop.run_in_executor(None, self._call, *msg)
+        self._pending.add(fut); fut.add_done_callback(self._pause_sent)
+
+    def _pause_sent(self, fut: asyncio.Future) -> None:
+        self._pending.discard(fut)
+        if not fut.cancelled() and fut.exception() is not None:
+            init_logger("igscraper").warning("向令牌服务发送暂停失败: %s", fut.exception())
+
+    def close(self) -> None:
+        with self._io:
+            if self._conn is not None: self._conn.close(); self._conn = None
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import shutil
+import time
+from abc import ABC, abstractmethod
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+__all__ = ["URL_FIELDS", "PROFILE_FIELDS", "FORMATS", "CsvSink", "JsonlSink", "ParquetSink", "open_sink", "infer_format", "read_rows", "merge_outputs"]
+
+URL_FIELDS = ["url", "title", "description", "error"]
+PROFILE_FIELDS = ["username","display_name","bio","email","phone","links","gender","age","region","warning_code","error"]
+FORMATS = ["csv", "jsonl", "parquet"]
+
+
+class _FileSink(ABC):
+    """
+    输出 sink 的公共部分：文件句柄在整个运行期间保持打开，
+    攒够 flush_rows 行或距上次落盘超过 flush_seconds 秒（在写入时检查）即 flush。
+    count 为已写入的行数，flushed 为其中已落盘的行数（CheckpointSink 据此推进进度）。
+    子类必须实现 _write/_flush/_close，缺一个在构造时就会报 TypeError。
+    """
+    default_flush_rows = 1
+
+    def __init__(self, flush_rows: Optional[int] = None, flush_seconds: float = 0.0):
+        self.flush_rows = max(1, flush_rows or self.default_flush_rows)
+        self.flush_seconds = flush_seconds
+        self.count = 0
+        self.flushed = 0
+        self._last_flush = time.monotonic()
+
+    @abstractmethod
+    def _write(self, rows: List[Dict[str, Any]]) -> None: ...
+
+    @abstractmethod
+    def _flush(self) -> None: ...
+
+    @abstractmethod
+    def _close(self) -> None: ...
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self.write_many([row])
+
+    def write_many(self, rows: Iterable[Dict[str, Any]]) -> None:
+        rows = list(rows)
+        if not rows: return
+        self._write(rows); self.count += len(rows)
+        if self.count - self.flushed >= self.flush_rows or (self.flush_seconds and time.monotonic() - self._last_flush >= self.flush_seconds):
+            self.flush()
+
+    def flush(self) -> None:
+        if self.count != self.flushed: self._flush()
+        self.flushed = self.count; self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        try: self.flush()
+        finally: self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CsvSink(_FileSink):
+    """逐行写 CSV。"""
+
+    def __init__(self, path: str, fieldnames: Sequence[str], append: bool = False, flush_rows: Optional[int] = None, flush_seconds: float = 0.0):
+        super().__init__(flush_rows, flush_seconds)
+        need_header = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+        self._f = open(path, "a" if append else "w", encoding="utf-8", newline="")
+        self._w = csv.DictWriter(self._f, fieldnames=list(fieldnames), extrasaction="ignore")
+        if need_header: self._w.writeheader(); self._f.flush()
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        self._w.writerows(rows)
+
+    def _flush(self) -> None:
+        self._f.flush()
+
+    def _close(self) -> None:
+        self._f.close()
+
+
+class JsonlSink(_FileSink):
+    """每行一个 JSON 对象。"""
+
+    def __init__(self, path: str, fieldnames: Sequence[str], append: bool = False, flush_rows: Optional[int] = None, flush_seconds: float = 0.0):
+        super().__init__(flush_rows, flush_seconds)
+        self.fieldnames = list(fieldnames)
+        self._f = open(path, "a" if append else "w", encoding="utf-8")
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        self._f.write("".join(self._dump(r) for r in rows))
+
+    def _flush(self) -> None:
+        self._f.flush()
+
+    def _close(self) -> None:
+        self._f.close()
+
+    def _dump(self, row: Dict[str, Any]) -> str:
+        return json.dumps({k: row.get(k, "") for k in self.fieldnames}, ensure_ascii=False) + "\n"
+
+
+class ParquetSink(_FileSink):
+    """
+    Parquet 输出（需要 pyarrow）：行先缓存在内存，每 flush_rows 行（默认 10000）写成一个压缩的 row group。
+    所有列均为字符串，列与 fieldnames 一致。Parquet 无法追加到已有文件，断点续跑请使用 csv/jsonl。
+    """
+    default_flush_rows = 10000
+
+    def __init__(self, path: str, fieldnames: Sequence[str], append: bool = False, flush_rows: Optional[int] = None, flush_seconds: float = 0.0, compression: str = "zstd"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet 输出需要 pyarrow，请安装 extras 'parquet'（pip install pyarrow）") from e
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            raise ValueError(f"Parquet 无法追加到已有文件 {path}，请换一个输出路径或使用 csv/jsonl")
+        super().__init__(flush_rows, flush_seconds)
+        self.fieldnames = list(fieldnames)
+        self._pa = pa
+        self._schema = pa.schema([(k, pa.string()) for k in self.fieldnames])
+        self._writer = pq.ParquetWriter(path, self._schema, compression=compression)
+        self._buf: Dict[str, List[str]] = {k: [] for k in self.fieldnames}
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        for k, col in self._buf.items():
+            col.extend("" if r.get(k) is None else str(r.get(k)) for r in rows)
+
+    def _flush(self) -> None:
+        table = self._pa.Table.from_pydict(self._buf, schema=self._schema)
+        self._writer.write_table(table, row_group_size=self.flush_rows)
+        self._buf = {k: [] for k in self.fieldnames}
+
+    def _close(self) -> None:
+        self._writer.close()
+
+
+def infer_format(path: str, fmt: Optional[str] = None) -> str:
+    if fmt: return fmt
+    lower = path.lower()
+    if lower.endswith((".jsonl", ".ndjson")): return "jsonl"
+    if lower.endswith((".parquet", ".pq")): return "parquet"
+    return "csv"
+
+
+def open_sink(path: str, fieldnames: Sequence[str], fmt: Optional[str] = None, append: bool = False, flush_rows: Optional[int] = None, flush_seconds: float = 0.0):
+    """按格式打开输出 sink；fmt 为空时按扩展名推断。flush_rows 为空时使用各格式的默认值。"""
+    kind = infer_format(path, fmt)
+    if kind == "csv": return CsvSink(path, fieldnames, append=append, flush_rows=flush_rows, flush_seconds=flush_seconds)
+    if kind == "jsonl": return JsonlSink(path, fieldnames, append=append, flush_rows=flush_rows, flush_seconds=flush_seconds)
+    if kind == "parquet": return ParquetSink(path, fieldnames, append=append, flush_rows=flush_rows, flush_seconds=flush_seconds)
+    raise ValueError(f"不支持的输出格式: {kind}")
+
+
+def read_rows(path: str, fmt: Optional[str] = None) -> Iterable[Dict[str, Any]]:
+    """逐行读回 open_sink 写出的文件（parquet 按 row group 读取）。"""
+    kind = infer_format(path, fmt)
+    if kind == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(): yield from batch.to_pylist()
+    elif kind == "jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip(): yield json.loads(line)
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+
+
+def merge_outputs(paths: Sequence[str], output: str, fieldnames: Sequence[str], fmt: Optional[str] = None, flush_rows: Optional[int] = None) -> None:
+    """
+    把列相同的多个输出文件按顺序合并成一个：csv/jsonl 直接拼接字节（csv 只保留第一个表头），
+    parquet 按 flush_rows（一个 row group）分批读出再写入新文件，内存只占一批。缺失的文件视为空。
+    """
+    kind = infer_format(output, fmt)
+    if kind == "parquet":
+        with ParquetSink(output, fieldnames, flush_rows=flush_rows) as sink:
+            for p in paths:
+                if not os.path.exists(p): continue
+                rows = iter(read_rows(p, kind))
+                while batch := list(islice(rows, sink.flush_rows)): sink.write_many(batch)
+        return
+    with open(output, "wb") as out:
+        if kind == "csv":
+            header = io.StringIO(); csv.writer(header).writerow(list(fieldnames))
+            out.write(header.getvalue().encode("utf-8"))
+        for p in paths:
+            if not os.path.exists(p): continue
+            with open(p, "rb") as f:
+                if kind == "csv": f.readline()  # 每个分片自带表头
+                shutil.copyfileobj(f, out)
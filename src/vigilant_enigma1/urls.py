@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+__all__ = ["TRACKING_PARAMS", "normalize_url", "canonical_url"]
+
+# 不影响页面内容的跟踪参数：抓取前去掉，去重时忽略
+TRACKING_PARAMS = frozenset({"fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "igsh", "mc_cid", "mc_eid", "_ga", "_gl", "ref_src"})
+_TRACKING_PREFIXES = ("utm_",)
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _is_tracking(piece: str) -> bool:
+    name = unquote_plus(piece.split("=", 1)[0]).lower()
+    return name in TRACKING_PARAMS or name.startswith(_TRACKING_PREFIXES)
+
+
+def _split(url: str):
+    """拆成 (scheme, netloc, path, [查询参数片段])；不是带主机名的 URL 时返回 None。"""
+    parts = urlsplit(url.strip())
+    if not parts.netloc: return None
+    try: port = parts.port
+    except ValueError: return None
+    host = parts.hostname or ""
+    if ":" in host: host = f"[{host}]"  # IPv6
+    scheme = parts.scheme.lower()
+    userinfo = parts.netloc.rpartition("@")[0]
+    netloc = (userinfo + "@" if userinfo else "") + host + (f":{port}" if port is not None and port != _DEFAULT_PORTS.get(scheme) else "")
+    query = [p for p in parts.query.split("&") if p and not _is_tracking(p)]
+    return scheme, netloc, parts.path or "/", query
+
+
+def normalize_url(url: str) -> str:
+    """
+    抓取时使用的规范化（只做不改变页面内容的改写）：去首尾空白，scheme/host 小写，
+    去默认端口与 #片段，去跟踪参数（utm_*、fbclid、gclid、igshid…），其余参数保持原顺序。
+    """
+    split = _split(url)
+    if split is None: return url.strip()
+    scheme, netloc, path, query = split
+    return urlunsplit((scheme, netloc, path, "&".join(query), ""))
+
+
+def canonical_url(url: str) -> str:
+    """去重用的键：在 normalize_url 基础上忽略路径末尾的 / 与查询参数顺序。"""
+    split = _split(url)
+    if split is None: return url.strip()
+    scheme, netloc, path, query = split
+    if len(path) > 1: path = path.rstrip("/") or "/"
+    return urlunsplit((scheme, netloc, path, "&".join(sorted(query)), ""))
@@ -0,0 +1,21 @@
+import pytest
+
+from vigilant_enigma1 import backends
+
+
+class FakeBackend:
+    """假后端基类：构造签名与真实后端一致（多余参数忽略），支持 async with；子类实现 fetch / fetch_head。"""
+
+    def __init__(self, cfg, limiter=None, cache=None, metrics=None, concurrency=None, cookies=True):
+        self.cfg = cfg; self.limiter = limiter
+
+    async def __aenter__(self): return self
+    async def __aexit__(self, *exc): pass
+
+
+@pytest.fixture
+def use_backend(monkeypatch):
+    """use_backend(name, cls)：测试期间把注册表中的 name 换成 cls（模块顶层的类），结束后恢复。"""
+    def use(name, cls):
+        monkeypatch.setitem(backends.BACKENDS, name, f"{cls.__module__}:{cls.__qualname__}")
+    return use
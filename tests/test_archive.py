@@ -0,0 +1,65 @@
+import asyncio
+import csv
+import gzip
+import threading
+
+from conftest import FakeBackend
+
+from vigilant_enigma1.archive import HtmlArchive
+from vigilant_enigma1.config import Config
+from vigilant_enigma1.reparse import reparse
+from vigilant_enigma1.scraper import scrape_urls
+
+PAGE = '<html><head><title>{name} • Instagram</title><meta name="description" content="{name} bio"></head><body></body></html>'
+
+
+def test_append_dedupes_rolls_segments_and_reads_back(tmp_path):
+    with HtmlArchive(str(tmp_path), segment_bytes=1) as ar:
+        assert ar.append("profile", "alice", "https://www.instagram.com/alice/", PAGE.format(name="A"), ts=1.0)
+        assert not ar.append("profile", "alice", "https://www.instagram.com/alice/", PAGE.format(name="A"), ts=2.0)
+        assert ar.append("profile", "alice", "https://www.instagram.com/alice/", PAGE.format(name="A2"), ts=3.0)
+        assert ar.append("profile", "bob", "https://www.instagram.com/bob/", PAGE.format(name="B"), ts=4.0)
+    ar = HtmlArchive(str(tmp_path))
+    assert len(ar.entries(latest=False)) == 3 and len({e.segment for e in ar.entries(latest=False)}) == 3
+    assert [e.key for e in ar.entries()] == ["alice", "bob"]
+    assert ar.get("alice") == PAGE.format(name="A2")
+    # 段文件是合法的多 member gzip，可直接 zcat
+    seg = tmp_path / ar.entries()[1].segment
+    assert gzip.decompress(seg.read_bytes()).decode("utf-8").endswith(PAGE.format(name="B"))
+
+
+def test_reparse_writes_fresh_csv_in_archive_order(tmp_path):
+    with HtmlArchive(str(tmp_path / "ar")) as ar:
+        for i in range(5): ar.append("url", f"https://x.example/{i}", f"https://x.example/{i}", PAGE.format(name=f"n{i}"))
+    out = tmp_path / "out.csv"
+    assert reparse(str(tmp_path / "ar"), str(out), workers=1, chunk_size=2) == 5
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["title"] for r in rows] == [f"n{i} • Instagram" for i in range(5)]
+    assert rows[0]["url"] == "https://x.example/0" and rows[0]["description"] == "n0 bio"
+
+
+class PageBackend(FakeBackend):
+    async def fetch(self, url):
+        return PAGE.format(name=url[-1])
+
+
+class ThreadRecordingArchive(HtmlArchive):
+    def append(self, *args, **kw):
+        self.threads.append(threading.get_ident())
+        return super().append(*args, **kw)
+
+
+def test_scrape_urls_archives_off_the_event_loop(tmp_path, use_backend):
+    use_backend("httpx-async", PageBackend)
+    archive = ThreadRecordingArchive(str(tmp_path)); archive.threads = []
+    loop_threads = []
+
+    async def run():
+        loop_threads.append(threading.get_ident())
+        return await scrape_urls([f"https://x.example/{i}" for i in range(3)], cfg=Config.for_urls(qps=0), archive=archive)
+
+    with archive: rows = asyncio.run(run())
+    assert [r["title"] for r in rows] == [f"{i} • Instagram" for i in range(3)]
+    assert len(archive.threads) == 3 and loop_threads[0] not in archive.threads
+    assert len(HtmlArchive(str(tmp_path)).entries()) == 3
@@ -0,0 +1,61 @@
+import asyncio
+import subprocess
+import sys
+
+import pytest
+from conftest import FakeBackend as BaseBackend
+from tenacity import Retrying
+
+from vigilant_enigma1 import backends
+from vigilant_enigma1.backends import TransientError, load_backend, register_backend, retry_kwargs
+from vigilant_enigma1.config import Config
+from vigilant_enigma1.metrics import Metrics
+from vigilant_enigma1.scraper import scrape_urls
+
+
+class FakeBackend(BaseBackend):
+    async def fetch(self, url):
+        return f"<html><head><title>{url[-1]}</title></head></html>"
+
+
+def test_cli_imports_do_not_load_backends():
+    code = "import sys, igscraper.cli, vigilant_enigma1.cli, vigilant_enigma1.scraper; print(sorted(m for m in ('playwright', 'tenacity', 'tqdm', 'bs4', 'httpx') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_config_reads_environment_at_call_time(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_QPS", "4"); monkeypatch.setenv("HEADLESS", "0"); monkeypatch.delenv("TIMEOUT_SECONDS", raising=False)
+    cfg = Config()
+    assert cfg.qps == 4 and cfg.headless is False
+    monkeypatch.delenv("RATE_LIMIT_QPS"); monkeypatch.setenv("TIMEOUT", "7")
+    urls_cfg = Config.for_urls()
+    assert urls_cfg.qps == 0 and urls_cfg.timeout == 7
+
+
+def test_registry_resolves_lazily_and_rejects_unknown(use_backend):
+    use_backend("fake", FakeBackend)
+    assert load_backend("fake") is FakeBackend
+    use_backend("fake", BaseBackend)  # 替换注册立即生效，不受已导入的缓存影响
+    assert load_backend("fake") is BaseBackend
+    with pytest.raises(ValueError):
+        load_backend("nope")
+
+
+def test_scrape_urls_uses_registered_backend(monkeypatch):
+    monkeypatch.setitem(backends.BACKENDS, "httpx-async", backends.BACKENDS["httpx-async"])  # 测试结束后恢复
+    register_backend("httpx-async", f"{__name__}:FakeBackend")
+    rows = asyncio.run(scrape_urls(["https://a.example/1", "https://a.example/2"], concurrency=2, cfg=Config.for_urls(qps=0)))
+    assert sorted(r["title"] for r in rows) == ["1", "2"]
+
+
+def test_retry_policy_comes_from_config(tmp_path):
+    m = Metrics(str(tmp_path / "m.json"), interval=0); calls = []
+
+    def flaky():
+        calls.append(1)
+        raise TransientError("boom")
+
+    with pytest.raises(TransientError):
+        Retrying(**retry_kwargs(Config(retry_attempts=4, retry_backoff=0), TransientError, m))(flaky)
+    assert len(calls) == 4 and m.snapshot()["counters"]["retries_total"] == 3
@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from vigilant_enigma1 import browser_pool
+from vigilant_enigma1.browser_pool import AsyncBrowserPool, BrowserPool
+from vigilant_enigma1.config import Config
+
+
+class FakePage:
+    active = peak = 0
+
+    def __init__(self):
+        self.closed = False; self.handlers = {}
+
+    def on(self, event, cb): self.handlers[event] = cb
+    def is_closed(self): return self.closed
+    def close(self): self.closed = True
+    def crash(self): self.handlers["crash"]()
+
+    def goto(self, url, wait_until=None, timeout=None):
+        FakePage.active += 1; FakePage.peak = max(FakePage.peak, FakePage.active)
+        time.sleep(0.01)
+        FakePage.active -= 1
+
+    def content(self): return "<html></html>"
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []; self.cookie_jar = [{"name": "sessionid", "value": "1"}]; self.writes = 0; self.closed = False
+
+    def new_page(self):
+        page = FakePage(); self.pages.append(page)
+        return page
+
+    def cookies(self): return list(self.cookie_jar)
+    def storage_state(self, path): self.writes += 1
+    def close(self): self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self): self.contexts = []
+    def new_context(self, **kw):
+        self.contexts.append(FakeContext())
+        return self.contexts[-1]
+    def is_connected(self): return True
+    def close(self): pass
+
+
+class AsyncFakePage(FakePage):
+    async def close(self): self.closed = True
+
+    async def goto(self, url, wait_until=None, timeout=None):
+        FakePage.active += 1; FakePage.peak = max(FakePage.peak, FakePage.active)
+        await asyncio.sleep(0.01)
+        FakePage.active -= 1
+
+    async def content(self): return "<html></html>"
+
+
+class AsyncFakeContext(FakeContext):
+    async def new_page(self):
+        page = AsyncFakePage(); self.pages.append(page)
+        return page
+
+    async def cookies(self): return list(self.cookie_jar)
+    async def storage_state(self, path): self.writes += 1
+    async def close(self): self.closed = True
+
+
+class AsyncFakeBrowser(FakeBrowser):
+    async def new_context(self, **kw):
+        self.contexts.append(AsyncFakeContext())
+        return self.contexts[-1]
+    async def close(self): pass
+
+
+@pytest.fixture(autouse=True)
+def no_login(monkeypatch):
+    async def no_login_async(*a): return False
+    monkeypatch.setattr(browser_pool, "ensure_logged_in", lambda *a: False)
+    monkeypatch.setattr(browser_pool, "ensure_logged_in_async", no_login_async)
+    FakePage.active = FakePage.peak = 0
+
+
+def _pool(tmp_path, **kw):
+    pool = BrowserPool(Config(block_resources="", block_urls=""), storage_dir=str(tmp_path), **kw)
+    pool._browser = FakeBrowser(); pool._new_context()  # 跳过 Playwright 启动
+    return pool
+
+
+def test_never_lends_more_than_max_pages(tmp_path):
+    pool = _pool(tmp_path, max_pages=2, page_max_uses=100, context_max_uses=1000)
+    threads = [threading.Thread(target=lambda: [pool.fetch("https://a.example/") for _ in range(5)]) for _ in range(6)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert FakePage.peak <= 2 and len(pool._browser.contexts[0].pages) == 2 and pool._in_use == 0
+
+
+def test_crashed_and_worn_out_pages_are_closed_and_not_reused(tmp_path):
+    pool = _pool(tmp_path, max_pages=1, page_max_uses=2, context_max_uses=1000)
+    page = pool.acquire(); page.crash(); pool.release(page)
+    worn = pool.acquire()
+    assert page.closed and worn is not page
+    pool.release(worn); assert not worn.closed
+    pool.release(pool.acquire())  # 第 2 次归还达到 page_max_uses
+    assert worn.closed and pool.acquire() is not worn
+
+
+def test_context_recycled_only_after_all_pages_return(tmp_path):
+    pool = _pool(tmp_path, max_pages=3, page_max_uses=100, context_max_uses=2)
+    first = pool._browser.contexts[0]
+    a = pool.acquire(); b = pool.acquire()
+    pool.release(a); pool.release(pool.acquire())  # context 用满 2 次，b 仍借出
+    got = []
+    t = threading.Thread(target=lambda: got.append(pool.acquire())); t.start()
+    time.sleep(0.05)
+    assert not got and not first.closed and len(pool._browser.contexts) == 1
+    pool.release(b); t.join(1)
+    assert first.closed and len(pool._browser.contexts) == 2 and got[0] in pool._browser.contexts[1].pages
+
+
+def test_state_written_only_when_cookies_change(tmp_path):
+    pool = _pool(tmp_path)
+    ctx = pool._browser.contexts[0]
+    assert not pool.save_state() and ctx.writes == 0
+    pool.fetch("https://a.example/")
+    assert ctx.writes == 0
+    ctx.cookie_jar.append({"name": "csrftoken", "value": "x"})
+    assert pool.save_state() and ctx.writes == 1
+    assert not pool.save_state() and ctx.writes == 1
+
+
+def test_async_pool_bounds_pages_and_evicts_crashed(tmp_path):
+    async def run():
+        pool = AsyncBrowserPool(Config(block_resources="", block_urls=""), storage_dir=str(tmp_path), max_pages=2, page_max_uses=100, context_max_uses=1000)
+        pool._browser = AsyncFakeBrowser(); await pool._new_context()
+        await asyncio.gather(*(pool.fetch(f"https://a.example/{i}") for i in range(20)))
+        assert FakePage.peak <= 2 and len(pool._browser.contexts[0].pages) == 2
+        page = await pool.acquire(); page.crash(); await pool.release(page)
+        assert page.closed and page not in pool._idle and await pool.acquire() is not page
+        assert pool._browser.contexts[0].writes == 0 and not await pool.save_state()
+
+    asyncio.run(run())
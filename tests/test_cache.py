@@ -0,0 +1,125 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from vigilant_enigma1.backend_httpx import _fetch_httpx_once
+from vigilant_enigma1.cache import CacheMiss, ResponseCache, RevalidationMiss
+
+
+def test_fresh_hit_then_conditional_revalidation(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    assert cache.lookup("https://a.example/") == (None, {})
+    resp = httpx.Response(200, text="<html>A</html>", headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+    assert cache.update("https://a.example/", resp) == "<html>A</html>"
+    assert cache.lookup("https://a.example/") == ("<html>A</html>", {})
+
+    cache.ttl = 0
+    body, headers = cache.lookup("https://a.example/")
+    assert body is None and headers == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert cache.update("https://a.example/", httpx.Response(304)) == "<html>A</html>"
+    assert cache.stats["revalidated"] == 1
+
+
+def test_offline_mode_serves_stale_and_raises_on_miss(tmp_path):
+    ResponseCache(str(tmp_path)).store("https://a.example/", "A")
+    cache = ResponseCache(str(tmp_path), ttl=0, offline=True)
+    assert cache.lookup("https://a.example/")[0] == "A"
+    with pytest.raises(CacheMiss):
+        cache.lookup("https://b.example/")
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=250)
+    cache.store("https://old.example/", "o" * 100)
+    cache.store("https://new.example/", "n" * 100)
+    old_meta = cache._meta_path("https://old.example/")
+    os.utime(old_meta, (time.time() - 100, time.time() - 100))
+    cache.store("https://third.example/", "t" * 100)
+    assert cache.lookup("https://old.example/") == (None, {})
+    assert cache.lookup("https://new.example/")[0] == "n" * 100
+    assert cache.lookup("https://third.example/")[0] == "t" * 100
+
+
+def test_304_after_eviction_is_never_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=0)
+    cache.store("https://a.example/", "A", etag='"v1"')
+    assert cache.lookup("https://a.example/")[1] == {"If-None-Match": '"v1"'}
+    cache._meta_path("https://a.example/").unlink()  # 条件请求期间被淘汰
+    with pytest.raises(RevalidationMiss):
+        cache.update("https://a.example/", httpx.Response(304, headers={"ETag": '"v1"'}))
+    assert cache.lookup("https://a.example/") == (None, {})
+
+
+def test_fetch_retries_unconditionally_when_304_entry_is_gone(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=0)
+    cache.store("https://a.example/", "old", etag='"v1"')
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match"):
+            cache._meta_path("https://a.example/").unlink()
+            return httpx.Response(304)
+        return httpx.Response(200, text="new", headers={"ETag": '"v2"'})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await _fetch_httpx_once(client, "https://a.example/", cache=cache)
+
+    assert asyncio.run(run()) == "new" and seen == ['"v1"', None]
+    cache.ttl = 60
+    assert cache.lookup("https://a.example/")[0] == "new"
+
+
+def test_concurrent_writers_of_same_blob(tmp_path):
+    caches = [ResponseCache(str(tmp_path)) for _ in range(4)]
+    with ThreadPoolExecutor(4) as ex:
+        list(ex.map(lambda i: caches[i % 4].store(f"https://a.example/{i}", "same body"), range(40)))
+    assert not list(tmp_path.glob("**/*.tmp"))
+    assert ResponseCache(str(tmp_path)).lookup("https://a.example/7")[0] == "same body"
+
+
+def test_igscrape_offline_requires_httpx_and_cache_dir(tmp_path, monkeypatch):
+    from igscraper import cli
+    calls = []
+    monkeypatch.delenv("CACHE_DIR", raising=False)
+    monkeypatch.setattr(cli, "run_scrape", lambda cfg, *a, **kw: calls.append(cfg.offline))
+    for argv in (["--offline", "--httpx"], ["--offline", "--cache-dir", str(tmp_path)], ["--offline", "--httpx", "--cache-dir", str(tmp_path)]):
+        monkeypatch.setattr("sys.argv", ["igscrape", *argv, "-i", str(tmp_path / "in.csv"), "-o", str(tmp_path / "out.csv")])
+        cli.main()
+    assert calls == [True]  # 只有同时给出 --httpx 与缓存目录时才开始抓取
+
+
+def test_replaced_content_does_not_leak_blobs(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=0, max_bytes=50_000)
+    for i in range(100):
+        cache.store("https://a.example/", f"{i:05d}" + "x" * 10_000)  # 页面每次抓取都不同
+    blobs = [p for p in cache.blob_dir.glob("*/*")]
+    assert len(blobs) == 1 and len(list(cache.meta_dir.glob("*.json"))) == 1
+    assert cache._total == blobs[0].stat().st_size and cache.lookup("https://a.example/") == (None, {})
+    assert cache._read_body(cache._read_meta("https://a.example/")).startswith("00099")
+
+
+def test_eviction_sweeps_orphan_blobs_before_live_entries(tmp_path):
+    orphan = tmp_path / "blobs" / "ab" / ("ab" + "0" * 62)
+    orphan.parent.mkdir(parents=True); orphan.write_bytes(b"o" * 300)  # 旧版本留下、无人引用的正文
+    cache = ResponseCache(str(tmp_path), max_bytes=350)
+    cache.store("https://a.example/", "a" * 100)
+    assert not orphan.exists() and cache._total == 100
+    assert cache.lookup("https://a.example/")[0] == "a" * 100 and cache.stats["evicted"] == 0
+
+
+def test_scrape_offline_rejects_browser_and_reads_env(tmp_path, monkeypatch):
+    from vigilant_enigma1 import cli
+    calls = []
+    monkeypatch.delenv("CACHE_DIR", raising=False); monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cli, "_run", lambda args, parse_pool, cache, *a: calls.append((args.offline, cache is not None and cache.offline)))
+    for env, argv in (("", ["--browser", "--offline", "--cache-dir", "c"]), ("1", ["--browser", "--cache-dir", "c"]), ("1", []), ("1", ["--cache-dir", "c"])):
+        monkeypatch.setenv("OFFLINE", env)
+        monkeypatch.setattr("sys.argv", ["scrape", "--url", "https://a.example/", *argv])
+        cli.main()
+    assert calls == [(True, True)]  # 只有 httpx + 缓存目录时才运行，且 OFFLINE=1 生效
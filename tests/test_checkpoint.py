@@ -0,0 +1,27 @@
+import csv
+
+from vigilant_enigma1.checkpoint import Checkpoint, compact_output, row_failed
+
+
+def test_checkpoint_skips_done_and_duplicates(tmp_path):
+    log = str(tmp_path / "out.csv.done")
+    with Checkpoint(log) as cp:
+        cp.mark("a", True); cp.mark("b", False)
+    with Checkpoint(log) as cp:
+        assert list(cp.filter(["a", "b", "c", "c", "d"])) == ["c", "d"]
+    with Checkpoint(log, retry_errors=True) as cp:
+        assert list(cp.filter(["a", "b", "c"])) == ["b", "c"]
+        cp.mark("b", True)
+    with Checkpoint(log, retry_errors=True) as cp:
+        assert cp.done == {"a", "b"} and not cp.failed
+
+
+def test_seed_from_output_and_compact(tmp_path):
+    out = tmp_path / "out.csv"
+    out.write_text("username,error\na,\nb,TimeoutError: x\nc,\nb,\n", encoding="utf-8")
+    with Checkpoint(str(out) + ".done") as cp:
+        assert cp.seed_from_output(str(out), "username", row_failed) == 4
+        assert cp.done == {"a", "b", "c"}
+    assert compact_output(str(out), "username") == 1
+    with open(out, newline="", encoding="utf-8") as f:
+        assert [(r["username"], r["error"]) for r in csv.DictReader(f)] == [("a", ""), ("b", ""), ("c", "")]
@@ -0,0 +1,100 @@
+import asyncio
+import sys
+from types import SimpleNamespace
+
+from conftest import FakeBackend
+
+from vigilant_enigma1.concurrency import AdaptiveConcurrency
+from vigilant_enigma1.config import Config
+from vigilant_enigma1.metrics import Metrics
+from vigilant_enigma1.scraper import scrape_urls
+
+
+def _round(c, latency=0.1, status=200, n=None):
+    for _ in range(n or max(c.min_samples, c.limit)): c.on_response(latency, status)
+
+
+def test_grows_additively_and_backs_off_multiplicatively(tmp_path):
+    m = Metrics(str(tmp_path / "m.json"), interval=0)
+    c = AdaptiveConcurrency(4, min_limit=2, max_limit=8, metrics=m)
+    for _ in range(3): _round(c)
+    assert c.limit == 7
+    _round(c, n=9); c.on_response(0.1, 503)
+    assert c.limit == 3
+    _round(c, n=9); c.on_error(TimeoutError("read timed out"))
+    assert c.limit == 2  # 不低于下限
+    for _ in range(10): _round(c)
+    assert c.limit == 8  # 不超过上限
+    assert m.snapshot()["counters"]["concurrency_changes_total"] == {"direction=up": 9, "direction=down": 2}
+
+
+def test_backs_off_when_p95_rises_and_ignores_client_errors():
+    c = AdaptiveConcurrency(10, max_limit=20)
+    _round(c, latency=0.1); _round(c, latency=0.1)
+    assert c.limit == 12
+    _round(c, latency=0.5)
+    assert c.limit == 6
+    c.on_error(ValueError("parse failed"))
+    _round(c, n=9)
+    assert c.limit == 7  # 1/10 的普通错误仍算低错误率
+
+
+def test_limit_stays_below_what_the_qps_cap_needs():
+    c = AdaptiveConcurrency(1, max_limit=50, qps=10)
+    for _ in range(20): _round(c, latency=0.2)
+    assert c.limit == 5  # ceil(10 × 0.2 × 2) + 1
+
+
+class SlowBackend(FakeBackend):
+    active = peak = fetched = 0
+
+    async def fetch(self, url):
+        await self.limiter.wait(url)
+        SlowBackend.active += 1; SlowBackend.peak = max(SlowBackend.peak, SlowBackend.active)
+        await asyncio.sleep(0.01)
+        SlowBackend.active -= 1; SlowBackend.fetched += 1
+        self.limiter.observe(url, 503 if SlowBackend.fetched > 40 else 200, {})  # 前 40 个正常，之后服务端过载
+        return "<html><head><title>t</title></head></html>"
+
+
+def test_scrape_urls_uses_controller_as_gate(use_backend):
+    use_backend("httpx-async", SlowBackend)
+    SlowBackend.active = SlowBackend.peak = SlowBackend.fetched = 0
+    c = AdaptiveConcurrency(2, max_limit=4, min_samples=4)
+    urls = [f"https://a.example/{i}" for i in range(48)]
+    rows = asyncio.run(scrape_urls(urls, cfg=Config.for_urls(qps=0), controller=c))
+    assert len(rows) == 48 and SlowBackend.peak <= 4
+    assert max(c.history) == 4 and c.limit < 4
+
+
+class FakeChromium:
+    """替代 playwright.async_api：每次 launch 一个浏览器，goto 返回带状态码的主文档响应。"""
+    gotos = 0
+
+    async def launch(self, **kw): return self
+    async def new_context(self, **kw): return self
+    async def new_page(self): return self
+    async def close(self): pass
+    async def content(self): return "<html><head><title>t</title></head></html>"
+
+    async def goto(self, url, wait_until=None, timeout=None):
+        FakeChromium.gotos += 1
+        await asyncio.sleep(0.005)
+        return SimpleNamespace(status=200, headers={})
+
+
+class FakePlaywright:
+    chromium = FakeChromium()
+    async def __aenter__(self): return self
+    async def __aexit__(self, *exc): pass
+
+
+def test_browser_backend_feeds_controller(monkeypatch):
+    monkeypatch.setitem(sys.modules, "playwright", SimpleNamespace())
+    monkeypatch.setitem(sys.modules, "playwright.async_api", SimpleNamespace(async_playwright=FakePlaywright))
+    monkeypatch.setenv("BLOCK_RESOURCES", ""); monkeypatch.setenv("BLOCK_URLS", ""); monkeypatch.setenv("WAIT_SELECTOR", "")
+    FakeChromium.gotos = 0
+    c = AdaptiveConcurrency(2, max_limit=6, min_samples=4)
+    rows = asyncio.run(scrape_urls([f"https://a.example/{i}" for i in range(24)], use_browser=True, cfg=Config.for_urls(qps=0), controller=c))
+    assert len(rows) == 24 and FakeChromium.gotos == 24 and not any(r["error"] for r in rows)
+    assert c.limit > 2 and len(c.history) > 1  # --browser 同样给控制器提供延迟/状态样本
@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+import pytest
+from conftest import FakeBackend
+
+from vigilant_enigma1.backend_httpx import fetch_head_httpx
+from vigilant_enigma1.config import Config
+from vigilant_enigma1.head import HeadParser, parse_head
+from vigilant_enigma1.parser import parse_html
+from vigilant_enigma1.scraper import scrape_urls
+
+PAGES = [
+    '<html><head><title> A &amp; B </title><meta property="og:description" content=" og "><meta name="description" content="d"></head><body></body></html>',
+    '<title>x</title><meta name="description"><meta property="og:description" content="og">',
+    '<html><head><meta property="og:description" content="og"/><title>t</title></head><body><p>x</p></body></html>',
+    '<html><head></head><body></body></html>',
+    "",
+]
+
+
+@pytest.mark.parametrize("html", PAGES, ids=range(len(PAGES)))
+def test_parse_head_matches_parse_html(html):
+    assert parse_head(html, "u") == parse_html(html, "u")
+
+
+def test_parser_stops_at_head_end_across_chunks():
+    p = HeadParser()
+    for piece in ['<html><head><ti', 'tle>Hi</title><meta prop', 'erty="og:description" content="x">', "</he", "ad><body>"]:
+        assert not p.done
+        p.feed(piece)
+    assert p.done and p.result("u") == {"url": "u", "title": "Hi", "description": "x"}
+
+
+class ChunkStream(httpx.AsyncByteStream):
+    def __init__(self, chunks):
+        self.chunks = chunks; self.sent = 0; self.closed = False
+
+    async def __aiter__(self):
+        for c in self.chunks:
+            self.sent += 1
+            yield c
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_streamed_fetch_stops_after_head():
+    head = '<html><head><title>café</title><meta name="description" content="d">'.encode()
+    # "é" 的两个字节被拆到不同块中，增量解码不应出错
+    chunks = [head[:23], head[23:]] + [b"<body>" + b"x" * 1000 for _ in range(100)]
+    stream = ChunkStream(chunks)
+    transport = httpx.MockTransport(lambda req: httpx.Response(200, headers={"Content-Type": "text/html; charset=utf-8"}, stream=stream))
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await fetch_head_httpx(client, "https://a.example/", cfg=Config.for_urls(retry_attempts=1))
+
+    assert asyncio.run(run()) == {"url": "https://a.example/", "title": "café", "description": "d"}
+    assert stream.sent == 2 and stream.closed
+
+
+class HeadBackend(FakeBackend):
+    async def fetch(self, url):
+        raise AssertionError("head-only 不应抓取完整页面")
+
+    async def fetch_head(self, url):
+        return {"url": url, "title": "T", "description": "D"}
+
+
+class ListArchive:
+    def __init__(self): self.entries = []
+    def append(self, *args): self.entries.append(args)
+
+
+def test_head_only_uses_parsed_result_and_skips_archive(use_backend):
+    use_backend("httpx-async", HeadBackend)
+    archive = ListArchive()
+    rows = asyncio.run(scrape_urls(["https://a.example/1", "https://a.example/2"], cfg=Config.for_urls(qps=0), archive=archive, head_only=True))
+    assert [(r["url"], r["title"], r["description"]) for r in rows] == [("https://a.example/1", "T", "D"), ("https://a.example/2", "T", "D")]
+    assert archive.entries == []
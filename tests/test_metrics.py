@@ -0,0 +1,39 @@
+import json
+
+from vigilant_enigma1.metrics import NULL_METRICS, Histogram, Metrics
+
+
+def test_histogram_percentiles_and_bounded_reservoir():
+    h = Histogram(max_samples=50)
+    for v in range(1, 101): h.observe(v / 1000)
+    snap = h.snapshot()
+    assert snap["count"] == 100 and snap["min"] == 0.001 and snap["max"] == 0.1
+    assert len(h._samples) == 50
+
+    exact = Histogram()
+    for v in range(1, 101): exact.observe(float(v))
+    assert exact.quantile(0.5) == 50 and exact.quantile(0.95) == 95 and exact.quantile(0.99) == 99
+
+
+def test_counters_timers_and_dumps(tmp_path):
+    m = Metrics(str(tmp_path / "m.json"), interval=0)
+    with m.timer("fetch"): pass
+    m.record_response(200, 1000); m.record_response(429)
+    m.inc("cache_total", result="hit"); m.inc("retries_total")
+    snap = m.snapshot()
+    assert snap["stages"]["fetch"]["count"] == 1
+    assert snap["counters"]["responses_total"] == {"status=200": 1, "status=429": 1}
+    assert snap["counters"]["bytes_received_total"] == 1000 and snap["counters"]["retries_total"] == 1
+
+    m.stop()
+    assert json.loads((tmp_path / "m.json").read_text(encoding="utf-8"))["counters"]["cache_total"] == {"result=hit": 1}
+    prom = Metrics(str(tmp_path / "m.prom")); prom.observe("parse", 0.5); prom.record_response(200, 10); prom.dump()
+    text = (tmp_path / "m.prom").read_text(encoding="utf-8")
+    assert 'scrape_stage_seconds{stage="parse",quantile="0.95"} 0.500000' in text
+    assert 'scrape_responses_total{status="200"} 1' in text
+
+
+def test_null_metrics_is_noop():
+    with NULL_METRICS.timer("fetch"): NULL_METRICS.inc("x"); NULL_METRICS.record_response(200, 5)
+    assert NULL_METRICS.httpx_extensions() == {}
+    assert NULL_METRICS.snapshot()["stages"] == {} and NULL_METRICS.snapshot()["counters"] == {}
@@ -0,0 +1,24 @@
+import asyncio
+
+from vigilant_enigma1.parse_pool import ParsePool
+from vigilant_enigma1.parser import parse_html, parse_profile
+
+BIG = "<html><head><title> T </title><meta name='description' content='D'></head><body>" + "<p>x</p>" * 2000 + "</body></html>"
+
+
+def test_small_html_stays_inline():
+    with ParsePool("thread", workers=1, inline_threshold=1 << 20) as pool:
+        fut = pool.submit(parse_html, "<title>a</title>", "u")
+        assert fut.done() and fut.result()["title"] == "a"
+
+
+def test_process_pool_matches_inline():
+    with ParsePool("process", workers=2, inline_threshold=0) as pool:
+        assert pool.submit(parse_profile, BIG, "u").result() == parse_profile(BIG, "u")
+        res = asyncio.run(pool.run(parse_html, BIG, "u"))
+    assert res == {"url": "u", "title": "T", "description": "D"}
+
+
+def test_process_pool_uses_spawn():
+    with ParsePool("process", workers=1) as pool:
+        assert pool._executor._mp_context.get_start_method() == "spawn"
@@ -0,0 +1,165 @@
+"""
+解析引擎一致性测试：新实现（单次解析 + 括号配对扫描）须与旧实现逐字段一致。
+下方 legacy_* 为重构前 parser.py 的原样拷贝，仅作对照，勿修改。
+"""
+import json
+import random
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+from bs4 import BeautifulSoup
+
+from vigilant_enigma1.parser import extract_structured_json, find_json_end, parse_profile
+
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-ZaZ0-9.-]+\.[A-Za-z]{2,}")
+PHONE_RE = re.compile(r"(?:\+?\d[\d\s\-]{7,}\d)")
+LINK_RE = re.compile(r"https?://[^\s\"')]+", re.I)
+
+def legacy_extract_structured_json(html: str) -> Optional[dict]:
+    """
+    优先从 <script type="application/ld+json"> 提取结构化 JSON；
+    次选尝试解析内嵌数据块（页面 props/sharedData 等）。
+    """
+    soup = BeautifulSoup(html, "lxml")
+    for s in soup.find_all("script", type="application/ld+json"):
+        try:
+            txt = s.get_text(strip=True); 
+            if not txt: continue
+            obj = json.loads(txt)
+            # 兼容数组形式
+            if isinstance(obj, list):
+                for it in obj:
+                    if isinstance(it, dict) and it.get("@type") in {"Person","Organization"}: return it
+            elif isinstance(obj, dict) and obj.get("@type") in {"Person","Organization"}: return obj
+        except Exception: continue
+    # 简单兜底：匹配 props/sharedData 片段尝试反序列化
+    for pat in (r"window\._sharedData\s*=\s*(\{.*?\});", r"window\.__additionalDataLoaded\([^,]+,\s*(\{.*?\})\);", r"\"props\":\s*\{.*?\}"):
+        m = re.search(pat, html, re.S)
+        if not m: continue
+        try:
+            chunk = m.group(1) if m.groups() else m.group(0)
+            # 尝试修剪到最外层 {}
+            head, tail = chunk.find("{"), chunk.rfind("}")
+            if head!=-1 and tail!=-1 and head<tail: chunk = chunk[head:tail+1]
+            data = json.loads(chunk); 
+            if isinstance(data, dict): return data
+        except Exception: continue
+    return None
+
+def legacy_parse_profile(html: str, profile_username: str) -> Tuple[Dict[str, Any], str]:
+    """
+    解析 Instagram 公共页 HTML，提取：
+    username、display_name、bio、email、phone、links、gender、age、region、warning_code、error
+    返回 (row, warning_code)
+    """
+    soup = BeautifulSoup(html, "lxml"); warning: List[str] = []
+    # username
+    username = profile_username
+    # display_name
+    display_name = ""
+    h1 = soup.find("h1"); 
+    if h1: display_name = h1.get_text(strip=True) or display_name
+    if not display_name:
+        og = soup.find("meta", property="og:title")
+        if og and og.get("content"): display_name = og["content"].split("•")[0].strip()
+    # bio：挑可见较长段落作为候选
+    bio = ""
+    candidates = [p.get_text(" ", strip=True) for p in soup.select("header ~ div p, header p, section p")]
+    if candidates: bio = max(candidates, key=len)[:500]
+    if not bio:
+        # 兜底：全局 p 文本中取最长的一段（适配极简页面）
+        all_ps = [p.get_text(" ", strip=True) for p in soup.find_all("p")]
+        if all_ps: bio = max(all_ps, key=len)[:500]
+    # 外链：去掉站内与 instagram 链接
+    links: List[str] = []
+    for a in soup.find_all("a", href=True):
+        href = a["href"]
+        if href.startswith("/") or "instagram.com" in href: continue
+        links.append(href)
+    links += LINK_RE.findall(bio or ""); links = sorted(set(links))
+    # email、phone 从 bio 启发式提取
+    email_match = EMAIL_RE.search(bio or ""); email = email_match.group(0) if email_match else ""
+    phone_match = PHONE_RE.search(bio or ""); phone = phone_match.group(0) if phone_match else ""
+    # 性别/年龄/地区：低置信度启发式
+    gender = ""
+    if re.search(r"\b(she|her|he|him|they|them)\b", (bio or "").lower()): gender="unspecified-pronouns"; warning.append("low_conf_gender")
+    age = ""
+    m_age = re.search(r"\b(1[6-9]|[2-9]\d)\b\s*(?:y/o|years?\s*old)", (bio or "").lower())
+    if m_age: age = m_age.group(1); warning.append("low_conf_age")
+    region = ""
+    m_region = re.search(r"(USA|UK|Canada|Australia|China|India|Singapore|Hong Kong|NYC|LA|London|Beijing|Shanghai)", bio or "", re.I)
+    if m_region: region = m_region.group(1)
+    # 结构化 JSON 辅助填充
+    js = legacy_extract_structured_json(html)
+    if isinstance(js, dict):
+        display_name = display_name or js.get("name","") or ""
+        if not links:
+            u = js.get("url")
+            if isinstance(u, str): links=[u]
+    warning_code = ";".join(sorted(set(warning))) if warning else ""
+    row: Dict[str, Any] = {"username":username,"display_name":display_name,"bio":bio,"email":email,"phone":phone,"links":",".join(links),"gender":gender,"age":age,"region":region,"warning_code":warning_code,"error":""}
+    return row, warning_code
+
+
+def _page(head: str = "", body: str = "") -> str:
+    return f"<html><head>{head}</head><body>{body}</body></html>"
+
+_SHARED = json.dumps({"entry_data": {"ProfilePage": [{"graphql": {"user": {"full_name": "Shared Name", "biography": "hi"}}}]}, "name": "Shared", "url": "https://shared.example"})
+_LD_PERSON = json.dumps({"@context": "https://schema.org", "@type": "Person", "name": "LD Person", "url": "https://ld.example"})
+
+CORPUS: List[str] = [
+    _page(body="<h1>Alice</h1><p>Contact: alice@example.com</p>"),
+    _page("<meta property='og:title' content='Bob • Instagram photos and videos'>", "<section><p>NYC based, 25 years old, she/her</p></section>"),
+    _page(f'<script type="application/ld+json">{_LD_PERSON}</script>', "<header><p>short</p></header><p>Call +1 555 123 4567 now</p>"),
+    _page(f'<script type="application/ld+json">[{{"@type": "WebSite"}}, {_LD_PERSON}]</script>'),
+    _page('<script type="application/ld+json">{broken json</script>', f"<script>window._sharedData = {_SHARED};</script>"),
+    _page(body=f"<script>window._sharedData = {_SHARED};</script><a href='https://x.example/a'>x</a>"),
+    # 字符串里包含 "};"：旧正则在此截断，新实现须同样放弃
+    _page(body='<script>window._sharedData = {"name": "evil };", "url": "https://e.example"};</script>'),
+    # 对象后无分号：旧正则继续向后找终止符
+    _page(body='<script>window._sharedData = {"name": "nosemi"}</script><script>var a = {};</script>'),
+    _page(body=f'<script>window.__additionalDataLoaded("/u/",{_SHARED});</script>'),
+    _page(body='<script>window.__additionalDataLoaded("/u/", {"name": "addl", "n": {"x": 1}});</script>'),
+    _page(body='<div data-x=\'{"props": {"name": "Props Name", "url": "https://props.example"}}\'></div>'),
+    _page(body='<div data-x=\'{"props": {"name": "nested", "inner": {"a": 1}}}\'></div>'),
+    _page(body='<script>window._sharedData = {"name": "unterminated"</script>'),
+    _page(body='<script>window._sharedData = {"name": "esc \\" quote", "b": "{"};</script><a href="/local">l</a>'),
+    _page(body="<h1></h1><p>Follow https://link.example/path and http://two.example</p><a href='https://www.instagram.com/x'>i</a>"),
+    _page(body="<p>UK · 19 y/o · they/them</p><p>x</p>"),
+    "",
+    "<p>no html wrapper, window._sharedData = 1;</p>",
+]
+
+
+def _fuzz_corpus(n: int = 60) -> List[str]:
+    rnd = random.Random(20240601)
+    frags = [
+        "<h1>Name</h1>", "<h1></h1>", "<meta property='og:title' content='OG • IG'>",
+        "<header><p>bio one London</p></header>", "<section><p>longer bio 30 years old with he/him</p></section>",
+        "<p>plain paragraph https://p.example</p>", "<a href='https://ext.example'>e</a>", "<a href='/rel'>r</a>",
+        f'<script type="application/ld+json">{_LD_PERSON}</script>', '<script type="application/ld+json"></script>',
+        f"<script>window._sharedData = {_SHARED};</script>", '<script>window._sharedData = {"a": "};"};</script>',
+        '<script>window.__additionalDataLoaded("x", {"name": "A"});</script>', '"props": {"name": "P"}',
+        '"props": {"name": {"deep": 1}}', "<script>window._sharedData = {\"bad\"};</script>", "}", "{", "};", "\"",
+    ]
+    docs = []
+    for _ in range(n):
+        parts = rnd.choices(frags, k=rnd.randint(1, 7))
+        docs.append(_page(body="".join(parts)))
+    return docs
+
+
+@pytest.mark.parametrize("html", CORPUS + _fuzz_corpus())
+def test_parse_profile_matches_legacy(html):
+    assert parse_profile(html, "user") == legacy_parse_profile(html, "user")
+    assert extract_structured_json(html) == legacy_extract_structured_json(html)
+    assert extract_structured_json(html, BeautifulSoup(html, "lxml")) == legacy_extract_structured_json(html)
+
+
+def test_find_json_end_skips_strings():
+    text = 'x = {"a": "}{\\"", "b": {"c": [1, {"d": 2}]}} tail'
+    start = text.index("{")
+    assert text[find_json_end(text, start)] == "}"
+    assert json.loads(text[start:find_json_end(text, start) + 1])["b"]["c"][1]["d"] == 2
+    assert find_json_end('{"open": 1', 0) == -1
@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+
+from vigilant_enigma1.config import Config
+from vigilant_enigma1.metrics import Metrics
+from vigilant_enigma1.playwright_login import ResourceBlocker, wait_ready
+
+
+class FakeRoute:
+    def __init__(self, resource_type, url):
+        self.request = SimpleNamespace(resource_type=resource_type, url=url); self.outcome = None
+
+    def abort(self): self.outcome = "abort"
+    def continue_(self): self.outcome = "continue"
+
+
+class AsyncFakeRoute(FakeRoute):
+    async def abort(self): self.outcome = "abort"
+    async def continue_(self): self.outcome = "continue"
+
+
+def test_blocks_by_resource_type_and_url_pattern(tmp_path):
+    m = Metrics(str(tmp_path / "m.json"), interval=0)
+    blocker = ResourceBlocker(["image", "font"], ["google-analytics.com", "*/logging/*"], metrics=m)
+    routes = [FakeRoute("image", "https://cdn.example/a.jpg"), FakeRoute("script", "https://www.google-analytics.com/analytics.js"),
+              FakeRoute("xhr", "https://i.example/api/logging/x"), FakeRoute("document", "https://www.instagram.com/u/")]
+    for r in routes: blocker.handle(r)
+    assert [r.outcome for r in routes] == ["abort", "abort", "abort", "continue"]
+    assert blocker.blocked == 3 and m.snapshot()["counters"]["blocked_requests_total"] == {"type=image": 1, "type=script": 1, "type=xhr": 1}
+
+    route = AsyncFakeRoute("media", "https://cdn.example/v.mp4")
+    asyncio.run(ResourceBlocker(["media"]).handle_async(route))
+    assert route.outcome == "abort"
+
+
+def test_blocking_configured_from_environment(monkeypatch):
+    monkeypatch.setenv("BLOCK_RESOURCES", "image, stylesheet"); monkeypatch.setenv("BLOCK_URLS", "")
+    blocker = ResourceBlocker.from_config(Config())
+    assert blocker is not None and blocker.types == {"image", "stylesheet"} and not blocker.patterns
+    monkeypatch.setenv("BLOCK_RESOURCES", "")
+    assert ResourceBlocker.from_config(Config()) is None
+
+
+def test_wait_ready_reports_timeout():
+    class Page:
+        def __init__(self, found): self.found = found
+        def wait_for_selector(self, selector, state, timeout):
+            if not self.found: raise TimeoutError(selector)
+
+    assert wait_ready(Page(True), "meta", 100) and not wait_ready(Page(False), "meta", 100)
+    assert wait_ready(Page(False), "", 100)
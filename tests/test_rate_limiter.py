@@ -1,5 +1,7 @@
+import asyncio
 import time
 from igscraper.rate_limiter import RateLimiter
+from vigilant_enigma1.ratelimiter import AsyncHostRateLimiter, TokenBucket, parse_retry_after
 
 def test_rate_limiter_interval():
     rl = RateLimiter(1.0)
@@ -7,3 +9,31 @@ def test_rate_limiter_interval():
     rl.wait()
     rl.wait()
     assert time.time() - t0 >= 1.0
+
+
+def test_token_bucket_burst_then_rate():
+    tb = TokenBucket(10.0, burst=3)
+    delays = [tb.reserve() for _ in range(5)]
+    assert delays[:3] == [0.0, 0.0, 0.0]
+    assert 0.05 < delays[3] <= 0.1 and 0.15 < delays[4] <= 0.2
+
+
+def test_retry_after_pauses_only_that_host():
+    rl = AsyncHostRateLimiter(0, burst=1)
+    assert rl.observe("https://a.example/x", 429, {"retry-after": "0.3"}) == 0.3
+    assert rl.observe("https://b.example/x", 200, {}) is None
+
+    async def timed(url):
+        t = time.monotonic(); await rl.wait(url); return time.monotonic() - t
+
+    async def main():
+        return await asyncio.gather(timed("https://a.example/y"), timed("https://b.example/y"))
+
+    wait_a, wait_b = asyncio.run(main())
+    assert wait_a >= 0.25 and wait_b < 0.05
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None and parse_retry_after(None) is None
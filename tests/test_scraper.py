@@ -0,0 +1,47 @@
+import asyncio
+import csv
+import time
+
+from conftest import FakeBackend
+
+from vigilant_enigma1.config import Config
+from vigilant_enigma1.parse_pool import ParsePool
+from vigilant_enigma1.scraper import scrape_async
+from vigilant_enigma1.sinks import PROFILE_FIELDS
+
+
+class ProfileBackend(FakeBackend):
+    starts = []
+
+    async def fetch(self, url):
+        await self.limiter.wait(url)
+        ProfileBackend.starts.append(time.monotonic())
+        await asyncio.sleep(0.005)
+        user = url.rstrip("/").rsplit("/", 1)[-1]
+        if user == "broken": raise RuntimeError("boom")
+        return f'<html><head><meta property="og:title" content="{user.title()} (@{user})"><meta name="description" content="bio of {user}"></head></html>'
+
+
+def test_scrape_async_pipeline_writes_every_row_under_qps(tmp_path, use_backend):
+    use_backend("playwright-async", ProfileBackend)
+    ProfileBackend.starts = []
+    users = [f"user{i}" for i in range(11)] + ["broken"]
+    src = tmp_path / "in.csv"; out = tmp_path / "out.csv"
+    src.write_text("username\n" + "\n".join(users) + "\n", encoding="utf-8")
+    cfg = Config(qps=20, burst=1, concurrency=4, cache_dir="", archive_dir="")
+    pool = ParsePool("thread", workers=3)  # 3 个解析协程：writer 要数到 3 个 _DONE 才结束
+    try:
+        t = time.monotonic()
+        asyncio.run(scrape_async(cfg, str(src), str(out), parse_pool=pool, batch_size=5))
+        elapsed = time.monotonic() - t
+    finally:
+        pool.close()
+
+    with open(out, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f); rows = list(reader)
+    assert reader.fieldnames == PROFILE_FIELDS
+    assert sorted(r["username"] for r in rows) == sorted(users)
+    errors = {r["username"]: r["error"] for r in rows if r["error"]}
+    assert errors == {"broken": "RuntimeError: boom"}
+    # 12 次请求共享一个 20 QPS 的限速器：首尾间隔至少 11/20 秒
+    assert ProfileBackend.starts[-1] - ProfileBackend.starts[0] >= 11 / cfg.qps - 0.02 and elapsed >= 11 / cfg.qps - 0.02
@@ -0,0 +1,46 @@
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+from vigilant_enigma1.config import Config
+from vigilant_enigma1.session import HttpxSession
+
+
+def _write_state(path, value, mtime):
+    path.write_text(json.dumps({"cookies": [{"name": "sessionid", "value": value, "domain": "a.example", "path": "/"}]}), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def _echo(request):
+    return httpx.Response(200, json={"ua": request.headers["user-agent"], "cookie": request.headers.get("cookie", "")})
+
+
+def test_client_reused_and_cookies_reloaded_on_mtime_change(tmp_path):
+    state = tmp_path / "state.json"; now = time.time()
+    _write_state(state, "v1", now - 10)
+    session = HttpxSession(Config(user_agent="UnitTest/1.0"), storage_dir=str(tmp_path), transport=httpx.MockTransport(_echo))
+    client = session.client
+    assert client.get("https://a.example/").json() == {"ua": "UnitTest/1.0", "cookie": "sessionid=v1"}
+    assert session.client is client
+
+    _write_state(state, "v2", now - 10)  # mtime 未变：不重新加载
+    assert session.client.get("https://a.example/").json()["cookie"] == "sessionid=v1"
+    os.utime(state, (now, now))
+    assert session.client is client and session.client.get("https://a.example/").json()["cookie"] == "sessionid=v2"
+    session.close()
+
+
+def test_async_client_uses_configured_user_agent(tmp_path, monkeypatch):
+    monkeypatch.setenv("USER_AGENT", "FromEnv/2.0")
+
+    async def run():
+        async with HttpxSession(Config(), storage_dir=str(tmp_path), transport=httpx.MockTransport(_echo)) as session:
+            client = session.async_client
+            r = await client.get("https://a.example/")
+            assert session.async_client is client
+            return r.json()
+
+    assert asyncio.run(run()) == {"ua": "FromEnv/2.0", "cookie": ""}
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+
+from vigilant_enigma1.shard import RemoteRateLimiter, TokenServer, shard_of, shard_path
+
+
+def test_shard_assignment_follows_canonical_url():
+    assert shard_of("https://A.example/x/", 4) == shard_of("https://a.example/x?utm_source=y", 4)
+    assert {shard_of(f"https://a.example/{i}", 4) for i in range(50)} == {0, 1, 2, 3}
+    assert shard_path("data/out.csv", 2) == "data/out.shard2.csv"
+
+
+def test_clients_share_one_global_budget():
+    with TokenServer(10.0) as server:
+        clients = [RemoteRateLimiter(server.address, server.authkey) for _ in range(3)]
+
+        async def main():
+            t = time.monotonic()
+            await asyncio.gather(*(c.wait(f"https://h{i}.example/") for c in clients for i in range(2)))
+            return time.monotonic() - t
+
+        elapsed = asyncio.run(main())
+        for c in clients: c.close()
+    assert elapsed >= 0.45  # 6 个令牌、10 QPS、burst=1：至少 0.5s（留出计时误差）
+
+
+def test_retry_after_from_one_client_pauses_host_for_all():
+    with TokenServer(0) as server:
+        a, b = RemoteRateLimiter(server.address, server.authkey), RemoteRateLimiter(server.address, server.authkey)
+        assert a.observe("https://slow.example/x", 429, {"retry-after": "0.3"}) == 0.3
+
+        async def timed(url):
+            t = time.monotonic(); await b.wait(url); return time.monotonic() - t
+
+        assert asyncio.run(timed("https://slow.example/y")) >= 0.25
+        assert asyncio.run(timed("https://fast.example/y")) < 0.2
+        a.close(); b.close()
+
+
+def test_bad_request_raises_on_client_instead_of_hanging():
+    with TokenServer(0) as server:
+        c = RemoteRateLimiter(server.address, server.authkey)
+        errors = []
+
+        def bad():
+            try: c._call("bogus")
+            except RuntimeError as e: errors.append(str(e))
+
+        t = threading.Thread(target=bad, daemon=True); t.start(); t.join(5)
+        assert not t.is_alive() and "bogus" in errors[0]
+        assert c._call("global") == 0.0  # 连接仍可用
+        c.close()
+
+
+def test_observe_on_event_loop_does_not_block_on_round_trip():
+    with TokenServer(0) as server:
+        a, b = RemoteRateLimiter(server.address, server.authkey), RemoteRateLimiter(server.address, server.authkey)
+
+        async def main():
+            a._io.acquire(); threading.Timer(0.2, a._io.release).start()  # 模拟另一个请求正占着连接 0.2s
+            t = time.monotonic()
+            assert a.observe("https://slow.example/x", 429, {"retry-after": "0.3"}) == 0.3
+            blocked = time.monotonic() - t
+            await asyncio.gather(*a._pending)
+            t = time.monotonic(); await b.wait("https://slow.example/y")
+            return blocked, time.monotonic() - t
+
+        blocked, waited = asyncio.run(main())
+        assert blocked < 0.05 and waited >= 0.15
+        a.close(); b.close()
@@ -0,0 +1,98 @@
+import csv
+import json
+
+import pytest
+
+from vigilant_enigma1.sinks import URL_FIELDS, ParquetSink, merge_outputs, open_sink, read_rows
+
+ROWS = [{"url": "https://a.example", "title": "A", "description": "x,y", "error": ""}, {"url": "https://b.example", "title": "B", "description": "", "error": ""}]
+
+
+def test_csv_sink_append_writes_header_once(tmp_path):
+    out = tmp_path / "out.csv"
+    with open_sink(str(out), URL_FIELDS) as sink:
+        sink.write(ROWS[0])
+    with open_sink(str(out), URL_FIELDS, append=True) as sink:
+        sink.write(ROWS[1])
+    with open(out, newline="", encoding="utf-8") as f:
+        assert list(csv.DictReader(f)) == ROWS
+
+
+def test_jsonl_sink_inferred_from_extension(tmp_path):
+    out = tmp_path / "out.jsonl"
+    with open_sink(str(out), URL_FIELDS) as sink:
+        sink.write_many(ROWS)
+    assert [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()] == ROWS
+
+
+def test_batched_flush_and_checkpoint_waits_for_disk(tmp_path):
+    from vigilant_enigma1.checkpoint import Checkpoint, CheckpointSink, row_failed
+
+    out = tmp_path / "out.jsonl"
+    with open_sink(str(out), URL_FIELDS, flush_rows=2) as sink, Checkpoint(str(tmp_path / "done")) as cp:
+        with CheckpointSink(sink, cp, "url", row_failed) as tracked:
+            tracked.write(ROWS[0])
+            assert sink.flushed == 0 and cp.done == set()
+            tracked.write(ROWS[1])
+            assert sink.flushed == 2 and cp.done == {"https://a.example", "https://b.example"}
+            tracked.write({"url": "https://c.example", "title": "", "description": "", "error": "RuntimeError: boom"})
+            assert cp.failed == set()
+        assert cp.failed == {"https://c.example"}
+    assert len(out.read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_url_rows_fail_only_on_error_column(tmp_path):
+    from vigilant_enigma1.checkpoint import Checkpoint, row_failed
+
+    out = tmp_path / "out.csv"
+    rows = [{"url": "https://a.example", "title": "Status", "description": "ERROR: 404 is a classic page", "error": ""}, {"url": "https://b.example", "title": "", "description": "", "error": "TimeoutError: slow"}]
+    with open_sink(str(out), URL_FIELDS) as sink: sink.write_many(rows)
+    assert not row_failed(rows[0]) and row_failed(rows[1])
+    with Checkpoint(str(tmp_path / "done")) as cp:
+        assert cp.seed_from_output(str(out), "url", row_failed) == 2
+        assert cp.done == {"https://a.example"} and cp.failed == {"https://b.example"}
+
+
+def test_parquet_sink_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    out = tmp_path / "out.parquet"
+    with open_sink(str(out), URL_FIELDS, flush_rows=2) as sink:
+        sink.write_many(ROWS * 3)
+    f = pq.ParquetFile(str(out))
+    assert f.metadata.num_rows == 6 and f.metadata.num_row_groups == 3
+    assert f.read().to_pylist() == ROWS * 3
+    with pytest.raises(ValueError):
+        open_sink(str(out), URL_FIELDS, append=True)
+
+
+@pytest.mark.parametrize("ext", ["csv", "jsonl"])
+def test_merge_outputs_concatenates_shards(tmp_path, ext):
+    parts = [str(tmp_path / f"out.shard{i}.{ext}") for i in range(3)]
+    for path, rows in zip(parts, [ROWS[:1], [], ROWS[1:]]):
+        with open_sink(path, URL_FIELDS) as sink: sink.write_many(rows)
+    merge_outputs(parts + [str(tmp_path / "missing.csv")], str(tmp_path / f"out.{ext}"), URL_FIELDS)
+    assert list(read_rows(str(tmp_path / f"out.{ext}"))) == ROWS
+
+
+def test_merge_parquet_streams_in_row_group_batches(tmp_path, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    parts = [str(tmp_path / f"out.shard{i}.parquet") for i in range(2)]
+    for path in parts:
+        with open_sink(path, URL_FIELDS, flush_rows=2) as sink: sink.write_many(ROWS * 3)
+    sizes = []
+    orig = ParquetSink.write_many
+    monkeypatch.setattr(ParquetSink, "write_many", lambda self, rows: (sizes.append(len(rows)), orig(self, rows))[1])
+    merge_outputs(parts, str(tmp_path / "out.parquet"), URL_FIELDS, flush_rows=4)
+    assert max(sizes) <= 4 and sum(sizes) == 12
+    assert pq.ParquetFile(str(tmp_path / "out.parquet")).read().to_pylist() == ROWS * 6
+
+
+def test_incomplete_sink_fails_at_construction():
+    from vigilant_enigma1.sinks import _FileSink
+
+    class NoFlush(_FileSink):
+        def _write(self, rows): pass
+        def _close(self): pass
+
+    with pytest.raises(TypeError):
+        NoFlush()
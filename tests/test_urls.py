@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+import pytest
+from conftest import FakeBackend
+
+from vigilant_enigma1.config import Config
+from vigilant_enigma1.scraper import scrape_urls, scrape_urls_stream
+from vigilant_enigma1.urls import canonical_url, normalize_url
+
+
+class CountingBackend(FakeBackend):
+    fetched = []
+
+    async def fetch(self, url):
+        CountingBackend.fetched.append(url)
+        await asyncio.sleep(0.01)
+        if "broken" in url: raise RuntimeError("boom")
+        return f"<html><head><title>{url}</title></head></html>"
+
+
+class ListSink:
+    def __init__(self): self.rows = []
+    def write(self, row): self.rows.append(row)
+
+
+@pytest.fixture
+def counting_backend(use_backend):
+    use_backend("httpx-async", CountingBackend)
+    CountingBackend.fetched = []
+
+
+def test_normalize_and_canonical_forms():
+    assert normalize_url("  HTTPS://Example.COM:443/a/?utm_source=x&b=2&a=1#top ") == "https://example.com/a/?b=2&a=1"
+    assert canonical_url("https://example.com/a/?b=2&a=1&fbclid=z") == canonical_url("https://EXAMPLE.com/a?a=1&b=2")
+    assert canonical_url("http://example.com") == "http://example.com/"
+    assert canonical_url("http://example.com:8080/x") != canonical_url("http://example.com/x")
+    assert normalize_url("not a url") == "not a url"
+
+
+def test_scrape_urls_fetches_each_page_once_and_maps_rows_back(counting_backend):
+    urls = ["https://a.example/x", "https://A.example/x/", "https://a.example/x?utm_medium=m", "https://a.example/broken", "https://a.example/broken/"]
+    rows = asyncio.run(scrape_urls(urls, concurrency=4, cfg=Config.for_urls(qps=0)))
+    assert sorted(CountingBackend.fetched) == ["https://a.example/broken", "https://a.example/x"]
+    assert [r["url"] for r in rows] == urls
+    assert [r["title"] for r in rows[:3]] == ["https://a.example/x"] * 3
+    assert all(r["error"] == "RuntimeError: boom" and r["description"] == "" for r in rows[3:])
+    assert all(r["error"] == "" for r in rows[:3])
+
+
+def test_stream_coalesces_in_flight_duplicates(counting_backend):
+    sink = ListSink()
+    urls = ["https://a.example/x", "https://a.example/x/", "https://a.example/y"]
+    n = asyncio.run(scrape_urls_stream(iter(urls), sink, concurrency=2, cfg=Config.for_urls(qps=0)))
+    assert n == 3 and len(CountingBackend.fetched) == 2
+    assert sorted(r["url"] for r in sink.rows) == sorted(urls)
+
+
+def test_resume_and_retry_honour_format_flag_over_extension(tmp_path, monkeypatch, counting_backend):
+    from vigilant_enigma1 import cli
+
+    monkeypatch.chdir(tmp_path); monkeypatch.setenv("RATE_LIMIT_QPS", "0")
+    (tmp_path / "urls.txt").write_text("https://a.example/x\nhttps://a.example/broken\n", encoding="utf-8")
+    out = tmp_path / "out.txt"  # 扩展名不是 .jsonl，只靠 --format 指定
+    for flag in ("--resume", "--retry-errors"):
+        monkeypatch.setattr("sys.argv", ["scrape", "--infile", "urls.txt", "--out", str(out), "--format", "jsonl", flag])
+        cli.main()
+    rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert sorted((r["url"], r["error"]) for r in rows) == [("https://a.example/broken", "RuntimeError: boom"), ("https://a.example/x", "")]
+    assert sorted(CountingBackend.fetched[:2]) == ["https://a.example/broken", "https://a.example/x"] and CountingBackend.fetched[2:] == ["https://a.example/broken"]
+    (tmp_path / "out.txt.done").unlink()  # 索引丢失时从输出重建，同样按 --format 读取
+    monkeypatch.setattr("sys.argv", ["scrape", "--infile", "urls.txt", "--out", str(out), "--format", "jsonl", "--resume"])
+    cli.main()
+    assert CountingBackend.fetched[3:] == [] and len(out.read_text(encoding="utf-8").splitlines()) == 2